@@ -5,10 +5,11 @@
 from __future__ import annotations
 
 import functools
+import inspect
 import operator
 from contextlib import suppress
 from heapq import merge
-from itertools import groupby
+from itertools import chain, groupby
 from typing import TYPE_CHECKING, cast
 
 from rosbags.interfaces import MessageDefinition, MessageDefinitionFormat, TopicInfo
@@ -24,7 +25,7 @@ from rosbags.typesys import Stores, get_types_from_idl, get_types_from_msg, get_
 
 if TYPE_CHECKING:
     import sys
-    from collections.abc import Generator, Iterable, Sequence
+    from collections.abc import Generator, Iterable, Mapping, Sequence
     from types import TracebackType
     from typing import Literal
 
@@ -35,6 +36,7 @@ if TYPE_CHECKING:
 
     from rosbags.interfaces import Connection
     from rosbags.interfaces.typing import RPath, Typesdict
+    from rosbags.rosbag1.reader import ReaderOptions as Reader1Options
     from rosbags.typesys.store import Typestore
 
 
@@ -56,18 +58,23 @@ class AnyReader:
         paths: Sequence[RPath],
         *,
         default_typestore: Typestore | None = None,
+        storage_options: Mapping[str, object] | None = None,
     ) -> None:
         """Initialize RosbagReader.
 
         Opens one or multiple rosbag1 recordings or a single rosbag2 recording.
 
+        The ``storage_options`` are passed as keyword arguments to the
+        rosbag1 readers, or to the storage plugins of rosbag2 readers.
+
         Args:
             paths: Paths to multiple rosbag1 files or single rosbag2 directory.
             default_typestore: Typestore to deserialize messages if bag has
                 no embedded message definions.
+            storage_options: Options of readers.
 
         Raises:
-            AnyReaderError: If paths do not exist.
+            AnyReaderError: If paths do not exist or options are invalid.
 
         """
         if not paths:
@@ -85,23 +92,31 @@ class AnyReader:
         self.default_typestore = default_typestore
         self.typestore = get_typestore(Stores.EMPTY)
 
+        options = dict(storage_options or {})
+        if not self.is2:
+            parameters = inspect.signature(Reader1).parameters.values()
+            names = {x.name for x in parameters if x.kind == x.KEYWORD_ONLY}
+            if unknown := sorted(options.keys() - names):
+                msg = f'Invalid storage options {unknown!r} for rosbag1 reader.'
+                raise AnyReaderError(msg)
+
         try:
             if self.is2:
-                self.readers = [Reader2(x) for x in paths]
+                self.readers = [Reader2(x, storage_options=options) for x in paths]
             else:
-                self.readers = [Reader1(x) for x in paths]
+                self.readers = [Reader1(x, **cast('Reader1Options', options)) for x in paths]
         except ReaderErrors as err:
             raise AnyReaderError(*err.args) from err
 
-    def _deser_ros1(self, rawdata: bytes, typ: str) -> object:
+    def _deser_ros1(self, rawdata: bytes | memoryview, typ: str) -> object:
         """Deserialize ROS1 message."""
         return self.typestore.deserialize_ros1(rawdata, typ)
 
-    def _deser_ros2(self, rawdata: bytes, typ: str) -> object:
+    def _deser_ros2(self, rawdata: bytes | memoryview, typ: str) -> object:
         """Deserialize CDR message."""
         return self.typestore.deserialize_cdr(rawdata, typ)
 
-    def deserialize(self, rawdata: bytes, typ: str) -> object:
+    def deserialize(self, rawdata: bytes | memoryview, typ: str) -> object:
         """Deserialize message with appropriate helper."""
         return self._deser_ros2(rawdata, typ) if self.is2 else self._deser_ros1(rawdata, typ)
 
@@ -223,7 +238,9 @@ class AnyReader:
         connections: Iterable[Connection] = (),
         start: int | None = None,
         stop: int | None = None,
-    ) -> Generator[tuple[Connection, int, bytes], None, None]:
+        *,
+        ordered: bool = True,
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
         """Read messages from bags.
 
         Args:
@@ -231,6 +248,8 @@ class AnyReader:
                 iterable disables filtering on connections.
             start: Yield only messages at or after this timestamp (ns).
             stop: Yield only messages before this timestamp (ns).
+            ordered: Yield messages in timestamp order, otherwise bag by bag
+                in file order for faster full scans.
 
         Yields:
             Tuples of connection, timestamp (ns), and rawdata.
@@ -243,11 +262,16 @@ class AnyReader:
 
         if connections:
             generators = [
-                reader.messages(connections=list(conns), start=start, stop=stop)
+                reader.messages(connections=list(conns), start=start, stop=stop, ordered=ordered)
                 for reader, conns in groupby(
                     sorted(connections, key=lambda x: id(get_owner(x))), key=get_owner
                 )
             ]
         else:
-            generators = [reader.messages(start=start, stop=stop) for reader in self.readers]
+            generators = [
+                reader.messages(start=start, stop=stop, ordered=ordered) for reader in self.readers
+            ]
+        if not ordered:
+            yield from chain.from_iterable(generators)
+            return
         yield from merge(*generators, key=lambda x: x[1])
@@ -0,0 +1,97 @@
+# Copyright 2020-2026 Ternaris
+# SPDX-License-Identifier: Apache-2.0
+"""File helpers shared by bag readers."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import mmap
+
+    from rosbags.interfaces.typing import RPath
+
+
+def get_cache_location(path: RPath, directory: Path, suffix: str) -> tuple[Path, bytes]:
+    """Get cache file path and key for bag file.
+
+    The cache file is named after the bag path, the key additionally
+    captures size and modification time to detect changes of the bag.
+
+    Args:
+        path: Bag file path.
+        directory: Cache directory.
+        suffix: Cache file suffix.
+
+    Returns:
+        Path of cache file and key identifying the bag state.
+
+    """
+    name = str(path.resolve()) if isinstance(path, Path) else str(path)
+    stat = path.stat()
+    encoded = name.encode()
+    key = struct.pack('<QQL', stat.st_size, stat.st_mtime_ns, len(encoded)) + encoded
+    return directory / f'{hashlib.sha256(encoded).hexdigest()}{suffix}', key
+
+
+def read_cache(path: Path, head: bytes) -> bytes | None:
+    """Read cache file.
+
+    Args:
+        path: Cache file path.
+        head: Expected magic and key at start of file.
+
+    Returns:
+        Cache file contents, or None if missing or stale.
+
+    """
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+
+    if not data.startswith(head):
+        return None
+    return data
+
+
+def write_cache(path: Path, data: bytes | memoryview) -> None:
+    """Write cache file atomically.
+
+    Failing to write the cache is not an error, the bag stays readable.
+
+    Args:
+        path: Cache file path.
+        data: Cache file contents.
+
+    """
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _ = tmp.write_bytes(data)
+        _ = tmp.replace(path)
+    except OSError:
+        with suppress(OSError):
+            tmp.unlink(missing_ok=True)
+
+
+def close_mmap(mapping: mmap.mmap, view: memoryview | None) -> None:
+    """Release view and close memory-mapping.
+
+    Views handed out to the caller keep the mapping alive until released,
+    closing is then left to garbage collection.
+
+    Args:
+        mapping: Memory-mapping.
+        view: View of whole mapping.
+
+    """
+    if view:
+        view.release()
+    with suppress(BufferError):
+        mapping.close()
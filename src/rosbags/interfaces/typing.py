@@ -68,6 +68,11 @@ class StatResult(Protocol):  # pragma: no cover
         """Proxy."""
         raise NotImplementedError
 
+    @property
+    def st_mtime_ns(self) -> int:
+        """Proxy."""
+        raise NotImplementedError
+
 
 class RPath(Protocol):  # pragma: no cover
     """Reader path protocol."""
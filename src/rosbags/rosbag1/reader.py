@@ -4,13 +4,14 @@
 
 from __future__ import annotations
 
-import heapq
+import mmap
 import os
 import re
 import struct
-import sys
+from bisect import bisect_left
 from bz2 import decompress as bz2_decompress
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, IntEnum
 from functools import reduce
 from io import BytesIO
@@ -18,11 +19,7 @@ from itertools import groupby
 from pathlib import Path
 from typing import TYPE_CHECKING, NamedTuple, cast
 
-if sys.version_info >= (3, 12):  # pragma: no cover
-    from typing import override
-else:  # pragma: no cover
-    from typing_extensions import override
-
+import numpy as np
 from lz4.frame import decompress as lz4_decompress  # type: ignore[import-untyped]
 
 from rosbags.interfaces import (
@@ -32,12 +29,15 @@ from rosbags.interfaces import (
     MessageDefinitionFormat,
     TopicInfo,
 )
+from rosbags.interfaces.fileio import close_mmap, get_cache_location, read_cache, write_cache
 from rosbags.typesys.msg import normalize_msgtype
 
 if TYPE_CHECKING:
+    import sys
     from collections.abc import Callable, Generator, Iterable
+    from concurrent.futures import Future
     from types import TracebackType
-    from typing import BinaryIO, Literal
+    from typing import BinaryIO, Literal, TypedDict
 
     if sys.version_info >= (3, 11):
         from typing import Self
@@ -46,8 +46,22 @@ if TYPE_CHECKING:
 
     from rosbags.interfaces.typing import RPath
 
+    IndexArray = np.ndarray[tuple[int], np.dtype[np.void]]
+
     Unpack = Callable[[bytes], 'tuple[int]']
-    UnpackFrom = Callable[[bytes, int], 'tuple[int]']
+    UnpackFrom = Callable[[bytes | memoryview, int], 'tuple[int]']
+    UnpackTimeFrom = Callable[[bytes | memoryview, int], 'tuple[int, int]']
+
+    class ReaderOptions(TypedDict, total=False):
+        """Keyword options of Reader."""
+
+        use_mmap: bool
+        index_cache: str | Path | None
+        chunk_cache_size: int
+        prefetch: int
+        lazy: bool
+        recover: bool
+        write_index: bool
 
 
 class ReaderError(Exception):
@@ -89,64 +103,25 @@ class Chunk(NamedTuple):
 
     datasize: int
     datapos: int
-    decompressor: Callable[[bytes], bytes]
-
-
-class IndexData(NamedTuple):
-    """Index data."""
-
-    time: int
-    chunk_pos: int
-    offset: int
-
-    @override
-    def __lt__(self, other: tuple[int, ...]) -> bool:
-        """Compare by time only."""
-        return self.time < other[0]
-
-    @override
-    def __le__(self, other: tuple[int, ...]) -> bool:
-        """Compare by time only."""
-        return self.time <= other[0]
+    decompressor: Callable[[bytes | memoryview], bytes | memoryview]
 
-    @override
-    def __eq__(self, other: object) -> bool:
-        """Compare by time only."""
-        if isinstance(other, IndexData):
-            return self.time == other[0]
-        return NotImplemented  # pragma: no cover
 
-    @override
-    def __ge__(self, other: tuple[int, ...]) -> bool:
-        """Compare by time only."""
-        return self.time >= other[0]
-
-    @override
-    def __gt__(self, other: tuple[int, ...]) -> bool:
-        """Compare by time only."""
-        return self.time > other[0]
-
-    @override
-    def __ne__(self, other: object) -> bool:
-        """Compare by time only."""
-        if isinstance(other, IndexData):
-            return self.time != other[0]
-        return NotImplemented  # pragma: no cover
-
-    def __hash__(self) -> int:
-        """Use normal tuple hash."""
-        return hash(tuple(self))  # pragma: no cover
-
-
-decompressors: dict[str, Callable[[bytes], bytes]] = {
+decompressors: dict[str, Callable[[bytes | memoryview], bytes | memoryview]] = {
     Compression.NONE.value: lambda x: x,
     Compression.BZ2.value: bz2_decompress,
-    Compression.LZ4.value: cast('Callable[[bytes], bytes]', lz4_decompress),
+    Compression.LZ4.value: cast('Callable[[bytes | memoryview], bytes]', lz4_decompress),
 }
 
 deserialize_uint8: Unpack = struct.Struct('<B').unpack
 deserialize_uint32: UnpackFrom = struct.Struct('<L').unpack_from
 deserialize_uint64: Unpack = struct.Struct('<Q').unpack
+deserialize_time_from: UnpackTimeFrom = struct.Struct('<LL').unpack_from
+
+INDEX_DTYPE = np.dtype([('time', '<u8'), ('chunk_pos', '<u8'), ('offset', '<u4')])
+IDXDATA_DTYPE = np.dtype([('sec', '<u4'), ('nsec', '<u4'), ('offset', '<u4')])
+
+INDEX_CACHE_MAGIC = b'#ROSBAGS INDEX V2\n'
+INDEX_CACHE_NONE = 2**32 - 1
 
 
 def deserialize_time(val: bytes) -> int:
@@ -285,6 +260,55 @@ class Header(dict[str, bytes]):
             msg = 'Header could not be read from file.'
             raise ReaderError(msg) from err
 
+        return cls.deserialize(binary, expect)
+
+    @classmethod
+    def unpack_from(
+        cls: type[Header],
+        buf: bytes | memoryview,
+        pos: int,
+        expect: RecordType | None = None,
+    ) -> tuple[Header, int]:
+        """Read header from buffer.
+
+        Args:
+            buf: Buffer.
+            pos: Position of header in buffer.
+            expect: Expected record op.
+
+        Returns:
+            Header object and position after header.
+
+        Raises:
+            ReaderError: Header could not parsed.
+
+        """
+        try:
+            (size,) = deserialize_uint32(buf, pos)
+        except struct.error as err:
+            msg = 'Header could not be read from buffer.'
+            raise ReaderError(msg) from err
+        pos += 4
+        if pos + size > len(buf):
+            msg = 'Header could not be read from buffer.'
+            raise ReaderError(msg)
+        return cls.deserialize(bytes(buf[pos : pos + size]), expect), pos + size
+
+    @classmethod
+    def deserialize(cls: type[Header], binary: bytes, expect: RecordType | None = None) -> Header:
+        """Deserialize header from bytes.
+
+        Args:
+            binary: Serialized header without size prefix.
+            expect: Expected record op.
+
+        Returns:
+            Header object.
+
+        Raises:
+            ReaderError: Header could not parsed.
+
+        """
         header = cls()
         pos = 0
         length = len(binary)
@@ -358,6 +382,37 @@ def read_bytes(src: BinaryIO, size: int) -> bytes:
     return data
 
 
+def get_msgdata_header_offsets(buf: bytes | memoryview, pos: int) -> tuple[int, int, int, int]:
+    """Get layout of MSGDATA record header.
+
+    Writers emit all message records of a bag with identical header layout,
+    knowing the layout allows reading the fields without generic parsing.
+
+    Args:
+        buf: Buffer.
+        pos: Position of MSGDATA record in buffer.
+
+    Returns:
+        Header size and offsets of op, conn, and time values from record start.
+
+    Raises:
+        ReaderError: Header could not be parsed.
+
+    """
+    header, end = Header.unpack_from(buf, pos, RecordType.MSGDATA)
+    _ = header.get_uint32('conn')
+    _ = header.get_time('time')
+
+    offsets: dict[bytes, int] = {}
+    idx = pos + 4
+    while idx < end:
+        (size,) = deserialize_uint32(buf, idx)
+        name = bytes(buf[idx + 4 : idx + 4 + size]).partition(b'=')[0]
+        offsets[name] = idx + 4 + len(name) + 1 - pos
+        idx += 4 + size
+    return end - pos - 4, offsets[b'op'], offsets[b'conn'], offsets[b'time']
+
+
 def normalize(name: str) -> str:
     """Normalize topic name.
 
@@ -371,6 +426,141 @@ def normalize(name: str) -> str:
     return f'{"/" * (name[0] == "/")}{"/".join(x for x in name.split("/") if x)}'
 
 
+class ChunkCache:
+    """Byte-budgeted LRU cache of decompressed chunks.
+
+    The most recently used chunk is always kept, even if it exceeds the
+    budget on its own.
+
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        """Initialize.
+
+        Args:
+            maxsize: Budget in bytes of decompressed chunk data.
+
+        """
+        self.maxsize = maxsize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[int, bytes | memoryview] = OrderedDict()
+
+    def get(self, pos: int) -> bytes | memoryview | None:
+        """Get chunk data and mark as recently used.
+
+        Args:
+            pos: Chunk position.
+
+        Returns:
+            Chunk data if cached.
+
+        """
+        if (data := self.entries.get(pos)) is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(pos)
+        return data
+
+    def put(self, pos: int, data: bytes | memoryview) -> None:
+        """Add chunk data and evict least recently used chunks over budget.
+
+        Args:
+            pos: Chunk position.
+            data: Decompressed chunk data.
+
+        """
+        self.entries[pos] = data
+        self.size += len(data)
+        while self.size > self.maxsize and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        """Drop all cached chunks."""
+        self.entries.clear()
+        self.size = 0
+
+
+def decompress_chunk(chunk: Chunk, data: bytes | memoryview) -> bytes | memoryview:
+    """Decompress chunk data.
+
+    Args:
+        chunk: Chunk metadata.
+        data: Compressed chunk data.
+
+    Returns:
+        Decompressed chunk data, a memoryview if data is a memoryview.
+
+    """
+    if isinstance(data, memoryview):
+        return memoryview(chunk.decompressor(data))
+    return chunk.decompressor(data)
+
+
+def merge_indexes(indexes: list[IndexArray]) -> IndexArray:
+    """Merge index arrays into one array sorted by time.
+
+    Entries with identical timestamps keep the order of the input arrays.
+
+    Args:
+        indexes: Index arrays.
+
+    Returns:
+        Merged index array.
+
+    """
+    if not indexes:
+        return np.empty(0, dtype=INDEX_DTYPE)
+    if len(indexes) == 1:
+        index = indexes[0]
+        if bool(np.all(index['time'][1:] >= index['time'][:-1])):
+            return index
+    else:
+        index = np.concatenate(indexes)
+    return index[np.argsort(index['time'], kind='stable')]
+
+
+def slice_index(index: IndexArray, start: int | None, stop: int | None) -> IndexArray:
+    """Slice sorted index array to time window.
+
+    The bounds are found by bisection, which is logarithmic in the index size
+    and avoids the array copies involved in NumPy searchsorted.
+
+    Args:
+        index: Index array sorted by time.
+        start: Time window start (ns).
+        stop: Time window stop (ns).
+
+    Returns:
+        View of index entries inside time window.
+
+    """
+    times = index['time']
+    lower = bisect_left(times, start) if start else 0
+    upper = bisect_left(times, stop) if stop else len(index)
+    return index[lower:upper]
+
+
+def iter_index(
+    index: IndexArray, batchsize: int = 2**14
+) -> Generator[tuple[int, int, int], None, None]:
+    """Iterate over index entries as Python ints.
+
+    Args:
+        index: Index array.
+        batchsize: Number of entries to convert at once.
+
+    Yields:
+        Tuples of timestamp, chunk position, and offset in chunk.
+
+    """
+    for idx in range(0, len(index), batchsize):
+        yield from cast('list[tuple[int, int, int]]', index[idx : idx + batchsize].tolist())
+
+
 class Reader:
     """Rosbag 1 version 2.0 reader.
 
@@ -379,11 +569,29 @@ class Reader:
 
     """
 
-    def __init__(self, path: str | RPath) -> None:
+    def __init__(
+        self,
+        path: str | RPath,
+        *,
+        use_mmap: bool = False,
+        index_cache: str | Path | None = None,
+        chunk_cache_size: int = 0,
+        prefetch: int = 0,
+        lazy: bool = False,
+        recover: bool = False,
+        write_index: bool = False,
+    ) -> None:
         """Initialize.
 
         Args:
             path: Filesystem path to bag.
+            use_mmap: Read messages from a memory-mapped file.
+            index_cache: Directory for persisted index caches.
+            chunk_cache_size: Budget in bytes for cached decompressed chunks.
+            prefetch: Number of chunks to decompress ahead in parallel.
+            lazy: Defer reading of message indexes until messages are read.
+            recover: Rebuild index of unindexed bags by scanning chunks.
+            write_index: Write rebuilt index back to unindexed bags.
 
         Raises:
             ReaderError: Path does not exist.
@@ -394,13 +602,25 @@ class Reader:
             msg = f'File {str(self.path)!r} does not exist.'
             raise FileNotFoundError(msg)
 
+        self.use_mmap = use_mmap
+        self.index_cache = Path(index_cache) if index_cache is not None else None
+        self.lazy = lazy
+        self.recover = recover
+        self.write_index = write_index
         self.bio: BinaryIO | None = None
+        self.mmap: mmap.mmap | None = None
+        self.view: memoryview | None = None
         self.connections: list[Connection] = []
-        self.indexes: dict[int, list[IndexData]] = {}
+        self.indexes: dict[int, IndexArray] = {}
         self.index_data_header_offsets: tuple[int, int] | None = None
+        # Header size -1 never matches before the actual layout is known.
+        self.msgdata_header_offsets: tuple[int, int, int, int] = (-1, 0, 0, 0)
         self.chunk_infos: list[ChunkInfo] = []
         self.chunks: dict[int, Chunk] = {}
-        self.current_chunk: tuple[int, BinaryIO] = (-1, BytesIO())
+        self.chunk_indexes: dict[int, dict[int, IndexArray]] = {}
+        self.chunk_cache = ChunkCache(chunk_cache_size)
+        self.prefetch = prefetch
+        self.executor: ThreadPoolExecutor | None = None
 
     def open(self) -> None:
         """Open rosbag and read metadata."""
@@ -440,13 +660,37 @@ class Reader:
                 msg = f'Bag encryption {encryptor!r} is not supported.'
                 raise ReaderError(msg) from None  # noqa: TRY301
 
-            if index_pos == 0:
-                msg = 'Bag is not indexed, reindex before reading.'
+            if index_pos == 0 and not self.recover:
+                msg = 'Bag is not indexed, reindex or open with recover=True.'
                 raise ReaderError(msg)  # noqa: TRY301
 
-            if chunk_count == 0:
+            if index_pos and chunk_count == 0:
+                return
+
+            if index_pos == 0:
+                end, unindexed = self.scan_records()
+                if self.write_index:
+                    self.write_recovered_index(end, unindexed)
+
+            if self.use_mmap:
+                try:
+                    self.mmap = mmap.mmap(self.bio.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError) as err:
+                    msg = f'Could not memory-map file {str(self.path)!r}: {err}.'
+                    raise ReaderError(msg) from err
+                self.view = memoryview(self.mmap)
+
+            if self.prefetch > 0:
+                self.executor = ThreadPoolExecutor(self.prefetch)
+
+            if index_pos == 0:
                 return
 
+            if self.index_cache:
+                cache_path, cache_key = get_cache_location(self.path, self.index_cache, '.idx')
+                if self.read_index_cache(cache_path, cache_key):
+                    return
+
             _ = self.bio.seek(index_pos)
             try:
                 self.connections = [self.read_connection() for _ in range(conn_count)]
@@ -455,8 +699,18 @@ class Reader:
                 msg = f'Bag index looks damaged: {err.args}'
                 raise ReaderError(msg) from None
 
+            if self.lazy:
+                counts: dict[int, int] = defaultdict(int)
+                for chunk_info in self.chunk_infos:
+                    for cid, count in chunk_info.connection_counts.items():
+                        counts[cid] += count
+                self.connections = [
+                    Connection(*x[0:5], counts[x.id], *x[6:]) for x in self.connections
+                ]
+                return
+
             self.chunks = {}
-            indexes: dict[int, list[IndexData]] = defaultdict(list)
+            indexes: dict[int, list[IndexArray]] = defaultdict(list)
             for chunk_info in self.chunk_infos:
                 _ = self.bio.seek(chunk_info.pos)
                 self.chunks[chunk_info.pos] = self.read_chunk()
@@ -464,11 +718,14 @@ class Reader:
                 for _ in range(len(chunk_info.connection_counts)):
                     self.read_index_data(chunk_info.pos, indexes)
 
-            self.indexes = {x.id: sorted(indexes[x.id]) for x in self.connections}
+            self.indexes = {x.id: merge_indexes(indexes[x.id]) for x in self.connections}
 
             self.connections = [
                 Connection(*x[0:5], len(self.indexes[x.id]), *x[6:]) for x in self.connections
             ]
+
+            if self.index_cache:
+                self.write_index_cache(cache_path, cache_key)
         except ReaderError:
             self.close()
             raise
@@ -476,6 +733,14 @@ class Reader:
     def close(self) -> None:
         """Close rosbag."""
         assert self.bio
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        self.chunk_cache.clear()
+        if self.mmap:
+            close_mmap(self.mmap, self.view)
+            self.mmap = None
+            self.view = None
         self.bio.close()
         self.bio = None
 
@@ -529,19 +794,31 @@ class Reader:
         """Read connection record from current position."""
         assert self.bio
         header = Header.read(self.bio, RecordType.CONNECTION)
+        return self.parse_connection(header, Header.read(self.bio))
+
+    def parse_connection(self, header: Header, fields: Header) -> Connection:
+        """Parse connection from record header and data.
+
+        Args:
+            header: Connection record header.
+            fields: Connection record data.
+
+        Returns:
+            Connection.
+
+        """
         conn = header.get_uint32('conn')
         topic = normalize(header.get_string('topic'))
 
-        header = Header.read(self.bio)
-        typ = header.get_string('type')
-        md5sum = header.get_string('md5sum')
+        typ = fields.get_string('type')
+        md5sum = fields.get_string('md5sum')
         msgdef = MessageDefinition(
             MessageDefinitionFormat.MSG,
-            header.get_string('message_definition'),
+            fields.get_string('message_definition'),
         )
 
-        callerid = header.get_string('callerid') if 'callerid' in header else None
-        latching = int(header.get_string('latching')) if 'latching' in header else None
+        callerid = fields.get_string('callerid') if 'callerid' in fields else None
+        latching = int(fields.get_string('latching')) if 'latching' in fields else None
 
         return Connection(
             conn,
@@ -594,7 +871,7 @@ class Reader:
 
         return Chunk(datasize, datapos, decompressor)
 
-    def read_index_data(self, pos: int, indexes: dict[int, list[IndexData]]) -> None:
+    def read_index_data(self, pos: int, indexes: dict[int, list[IndexArray]]) -> None:
         """Read index data from position.
 
         The implementation purposely avoids the generic Header class and
@@ -642,21 +919,548 @@ class Reader:
         (size,) = deserialize_uint32(buf, 51)
         assert size == count * 12
 
-        index = indexes[conn]
-        buf = self.bio.read(size)
-        idx = 0
-        while idx < size:
-            time = deserialize_uint32(buf, idx)[0] * 10**9 + deserialize_uint32(buf, idx + 4)[0]
-            (offset,) = deserialize_uint32(buf, idx + 8)
-            idx += 12
-            index.append(IndexData(time, pos, offset))
+        raw = np.frombuffer(read_bytes(self.bio, size), dtype=IDXDATA_DTYPE)
+        index = np.empty(count, dtype=INDEX_DTYPE)
+        index['time'] = raw['sec'].astype(np.uint64) * 10**9 + raw['nsec']
+        index['chunk_pos'] = pos
+        index['offset'] = raw['offset']
+        indexes[conn].append(index)
+
+    def read_chunk_indexes(self, chunk_info: ChunkInfo) -> dict[int, IndexArray]:
+        """Read chunk header and message indexes of a single chunk.
+
+        Args:
+            chunk_info: Chunk information.
+
+        Returns:
+            Index arrays by connection id.
+
+        """
+        if (cached := self.chunk_indexes.get(chunk_info.pos)) is not None:
+            return cached
+
+        assert self.bio
+        _ = self.bio.seek(chunk_info.pos)
+        self.chunks[chunk_info.pos] = self.read_chunk()
+
+        indexes: dict[int, list[IndexArray]] = defaultdict(list)
+        for _ in range(len(chunk_info.connection_counts)):
+            self.read_index_data(chunk_info.pos, indexes)
+
+        res = self.chunk_indexes[chunk_info.pos] = {
+            cid: merge_indexes(arrays) for cid, arrays in indexes.items()
+        }
+        return res
+
+    def get_lazy_indexes(
+        self,
+        connections: Iterable[Connection],
+        start: int | None = None,
+        stop: int | None = None,
+    ) -> list[IndexArray]:
+        """Get message indexes from chunks relevant to a query.
+
+        Args:
+            connections: Connections to get indexes for.
+            start: Time window start (ns).
+            stop: Time window stop (ns).
+
+        Returns:
+            Index arrays, one or more per connection.
+
+        """
+        cids = [x.id for x in connections]
+        chunk_indexes = [
+            self.read_chunk_indexes(x)
+            for x in self.chunk_infos
+            if (not start or start < x.end_time)
+            and (not stop or x.start_time < stop)
+            and any(cid in x.connection_counts for cid in cids)
+        ]
+        return [x[cid] for cid in cids for x in chunk_indexes if cid in x]
+
+    def scan_chunk(
+        self,
+        pos: int,
+        chunk: Chunk,
+        connections: dict[int, Connection],
+    ) -> ChunkInfo:
+        """Scan records of a single chunk and index its messages.
+
+        Args:
+            pos: Chunk position.
+            chunk: Chunk metadata.
+            connections: Accumulated connections by id.
+
+        Returns:
+            Chunk information.
+
+        Raises:
+            ReaderError: Chunk data incomplete or corrupt.
+
+        """
+        data = self.read_chunk_data(chunk)
+        entries: dict[int, list[tuple[int, int, int]]] = defaultdict(list)
+        offset = 0
+        size = len(data)
+        while offset < size:
+            header, datapos = Header.unpack_from(data, offset)
+            try:
+                (datasize,) = deserialize_uint32(data, datapos)
+            except struct.error as err:
+                msg = 'Could not read uint32.'
+                raise ReaderError(msg) from err
+
+            op = header.get_uint8('op')
+            if op == RecordType.MSGDATA:
+                entries[header.get_uint32('conn')].append((header.get_time('time'), pos, offset))
+            elif op == RecordType.CONNECTION and header.get_uint32('conn') not in connections:
+                fields, _ = Header.unpack_from(data, datapos)
+                connection = self.parse_connection(header, fields)
+                connections[connection.id] = connection
+            offset = datapos + 4 + datasize
+
+        if offset != size:
+            msg = 'Chunk data is incomplete.'
+            raise ReaderError(msg)
+
+        self.chunks[pos] = chunk
+        self.chunk_indexes[pos] = {
+            cid: merge_indexes([np.array(items, dtype=INDEX_DTYPE)])
+            for cid, items in entries.items()
+        }
+        times = [x[0] for items in entries.values() for x in items]
+        return ChunkInfo(
+            pos,
+            min(times, default=2**63 - 1),
+            max(times) + 1 if times else 0,
+            {cid: len(items) for cid, items in entries.items()},
+        )
+
+    def scan_records(self) -> tuple[int, list[int]]:
+        """Rebuild connections and indexes by scanning chunk records.
+
+        Scanning stops at the first incomplete record or at the first record
+        that does not belong to the chunk section, like the partial index of
+        an interrupted close.
+
+        Returns:
+            Position after the last complete record and positions of chunks
+            whose index data records are incomplete.
+
+        """
+        assert self.bio
+        # The bag header record is padded to 4096 bytes.
+        _ = self.bio.seek(13 + 4096)
+
+        connections: dict[int, Connection] = {}
+        unindexed: list[int] = []
+        pending: set[int] = set()
+        end = chunk_end = self.bio.tell()
+        while True:
+            pos = self.bio.tell()
+            try:
+                header = Header.read(self.bio)
+                op = header.get_uint8('op')
+                if op == RecordType.CHUNK:
+                    _ = self.bio.seek(pos)
+                    chunk = self.read_chunk()
+                    chunk_info = self.scan_chunk(pos, chunk, connections)
+                    _ = self.bio.seek(chunk.datapos + chunk.datasize)
+                    if pending:
+                        unindexed.append(self.chunk_infos[-1].pos)
+                    self.chunk_infos.append(chunk_info)
+                    pending = set(chunk_info.connection_counts)
+                    chunk_end = self.bio.tell()
+                elif op == RecordType.IDXDATA and self.chunk_infos:
+                    conn = header.get_uint32('conn')
+                    _ = read_bytes(self.bio, read_uint32(self.bio))
+                    pending.discard(conn)
+                else:
+                    break
+            except ReaderError:
+                break
+            end = self.bio.tell()
+
+        if pending:
+            unindexed.append(self.chunk_infos[-1].pos)
+            end = chunk_end
+
+        self.connections = list(connections.values())
+        self.indexes = {
+            x.id: merge_indexes(
+                [
+                    y[x.id]
+                    for y in (self.chunk_indexes[z.pos] for z in self.chunk_infos)
+                    if x.id in y
+                ],
+            )
+            for x in self.connections
+        }
+        self.connections = [
+            Connection(*x[0:5], len(self.indexes[x.id]), *x[6:]) for x in self.connections
+        ]
+        return end, unindexed
+
+    def write_recovered_index(self, end: int, unindexed: list[int]) -> None:
+        """Write index rebuilt by scanning back to bag.
+
+        Everything after the last complete record is discarded, index data
+        records are written for the last chunk if it lacks them.
+
+        Args:
+            end: Position after the last complete record.
+            unindexed: Positions of chunks without complete index data.
+
+        Raises:
+            ReaderError: Index cannot be written in place.
+
+        """
+        # The writer module depends on this module.
+        from .writer import Writer  # noqa: PLC0415
+
+        if unindexed[:-1] or (unindexed and unindexed[-1] != self.chunk_infos[-1].pos):
+            msg = 'Bag has chunks without index data, cannot write index in place.'
+            raise ReaderError(msg)
+
+        try:
+            with self.path.open('r+b') as bio:
+                _ = bio.seek(end)
+                _ = bio.truncate()
+
+                for pos in unindexed:
+                    for cid, index in self.chunk_indexes[pos].items():
+                        items = cast('list[tuple[int, int]]', index[['time', 'offset']].tolist())
+                        Writer.write_index_data(cid, items, bio)
+
+                index_pos = bio.tell()
+                for connection in self.connections:
+                    Writer.write_connection(connection, bio)
+                for info in self.chunk_infos:
+                    count = bool(info.connection_counts)
+                    Writer.write_chunk_info(
+                        info.pos,
+                        info.start_time if count else 0,
+                        info.end_time - 1 if count else 0,
+                        info.connection_counts,
+                        bio,
+                    )
+
+                _ = bio.seek(13)
+                Writer.write_bag_header(
+                    index_pos,
+                    len(self.connections),
+                    len(self.chunk_infos),
+                    bio,
+                )
+        except OSError as err:
+            msg = f'Could not write index to {str(self.path)!r}: {err.strerror}.'
+            raise ReaderError(msg) from err
+
+    def read_index_cache(self, path: Path, key: bytes) -> bool:
+        """Read index from cache file.
+
+        Args:
+            path: Cache file path.
+            key: Key identifying the bag state.
+
+        Returns:
+            True if a valid cache for the bag was read.
+
+        """
+        head = INDEX_CACHE_MAGIC + key
+        if (data := read_cache(path, head)) is None:
+            return False
+
+        pos = len(head)
+
+        def unpack(fmt: str) -> tuple[int, ...]:
+            nonlocal pos
+            values = struct.unpack_from(fmt, data, pos)
+            pos += struct.calcsize(fmt)
+            return cast('tuple[int, ...]', values)
+
+        def unpack_string() -> str | None:
+            nonlocal pos
+            (size,) = unpack('<L')
+            if size == INDEX_CACHE_NONE:
+                return None
+            if pos + size > len(data):
+                raise ValueError
+            pos += size
+            return data[pos - size : pos].decode()
+
+        try:
+            connections: list[Connection] = []
+            for _ in range(unpack('<L')[0]):
+                (cid,) = unpack('<L')
+                topic, msgtype, msgdef, md5sum, callerid, latching = (
+                    unpack_string() for _ in range(6)
+                )
+                if topic is None or msgtype is None or msgdef is None or md5sum is None:
+                    return False
+                connections.append(
+                    Connection(
+                        cid,
+                        topic,
+                        msgtype,
+                        MessageDefinition(MessageDefinitionFormat.MSG, msgdef),
+                        md5sum,
+                        0,
+                        ConnectionExtRosbag1(
+                            callerid,
+                            int(latching) if latching is not None else None,
+                        ),
+                        self,
+                    ),
+                )
+
+            chunk_infos: list[ChunkInfo] = []
+            chunks: dict[int, Chunk] = {}
+            for _ in range(unpack('<L')[0]):
+                chunk_pos, start_time, end_time, count = unpack('<QQQL')
+                counts = dict(cast('list[tuple[int, int]]', [unpack('<LL') for _ in range(count)]))
+                chunk_infos.append(ChunkInfo(chunk_pos, start_time, end_time, counts))
+                datasize, datapos = unpack('<QQ')
+                compression = unpack_string()
+                if compression is None:
+                    return False
+                chunks[chunk_pos] = Chunk(datasize, datapos, decompressors[compression])
+
+            indexes: dict[int, IndexArray] = {}
+            for conn in connections:
+                (count,) = unpack('<Q')
+                indexes[conn.id] = np.frombuffer(data, dtype=INDEX_DTYPE, count=count, offset=pos)
+                pos += count * INDEX_DTYPE.itemsize
+        except (KeyError, UnicodeDecodeError, ValueError, struct.error):
+            return False
+
+        if pos != len(data):
+            return False
+
+        self.chunk_infos = chunk_infos
+        self.chunks = chunks
+        self.indexes = indexes
+        self.connections = [
+            Connection(*x[0:5], len(self.indexes[x.id]), *x[6:]) for x in connections
+        ]
+        return True
+
+    def write_index_cache(self, path: Path, key: bytes) -> None:
+        """Write index to cache file.
+
+        Failing to write the cache is not an error, the bag stays readable.
+
+        Args:
+            path: Cache file path.
+            key: Key identifying the bag state.
+
+        """
+        compressions = {v: k for k, v in decompressors.items()}
+
+        bio = BytesIO()
+
+        def pack_string(value: str | None) -> None:
+            if value is None:
+                _ = bio.write(struct.pack('<L', INDEX_CACHE_NONE))
+                return
+            encoded = value.encode()
+            _ = bio.write(struct.pack('<L', len(encoded)))
+            _ = bio.write(encoded)
+
+        _ = bio.write(INDEX_CACHE_MAGIC + key)
+
+        _ = bio.write(struct.pack('<L', len(self.connections)))
+        for conn in self.connections:
+            assert isinstance(conn.ext, ConnectionExtRosbag1)
+            latching = conn.ext.latching
+            _ = bio.write(struct.pack('<L', conn.id))
+            pack_string(conn.topic)
+            pack_string(conn.msgtype)
+            pack_string(conn.msgdef.data)
+            pack_string(conn.digest)
+            pack_string(conn.ext.callerid)
+            pack_string(str(latching) if latching is not None else None)
+
+        _ = bio.write(struct.pack('<L', len(self.chunk_infos)))
+        for info in self.chunk_infos:
+            counts = info.connection_counts
+            _ = bio.write(
+                struct.pack('<QQQL', info.pos, info.start_time, info.end_time, len(counts))
+            )
+            for item in counts.items():
+                _ = bio.write(struct.pack('<LL', *item))
+            chunk = self.chunks[info.pos]
+            _ = bio.write(struct.pack('<QQ', chunk.datasize, chunk.datapos))
+            pack_string(compressions[chunk.decompressor])
+
+        for conn in self.connections:
+            index = self.indexes[conn.id]
+            _ = bio.write(struct.pack('<Q', len(index)))
+            _ = bio.write(index.tobytes())
+
+        write_cache(path, bio.getbuffer())
+
+    def read_chunk_raw(self, chunk: Chunk) -> bytes | memoryview:
+        """Read compressed chunk data.
+
+        Args:
+            chunk: Chunk metadata.
+
+        Returns:
+            Compressed chunk data, a memoryview if bag is memory-mapped.
+
+        Raises:
+            ReaderError: Chunk data incomplete.
+
+        """
+        if self.view:
+            data = self.view[chunk.datapos : chunk.datapos + chunk.datasize]
+            if len(data) != chunk.datasize:
+                msg = f'Got only {len(data)} of requested {chunk.datasize} bytes.'
+                raise ReaderError(msg)
+            return data
+
+        assert self.bio
+        _ = self.bio.seek(chunk.datapos)
+        return read_bytes(self.bio, chunk.datasize)
+
+    def read_chunk_data(self, chunk: Chunk) -> bytes | memoryview:
+        """Read and decompress chunk data.
+
+        Args:
+            chunk: Chunk metadata.
+
+        Returns:
+            Decompressed chunk data, a memoryview if bag is memory-mapped.
+
+        """
+        return decompress_chunk(chunk, self.read_chunk_raw(chunk))
+
+    def iter_chunk_data(self, plan: list[int]) -> Generator[bytes | memoryview, None, None]:
+        """Iterate over decompressed chunks in planned order.
+
+        Chunks are served from the chunk cache if possible. With prefetching
+        enabled, the compressed data of upcoming chunks is read ahead on the
+        calling thread and decompressed on the thread pool.
+
+        Args:
+            plan: Chunk positions in order of use.
+
+        Yields:
+            Decompressed chunk data.
+
+        """
+        pending: dict[int, Future[bytes | memoryview]] = {}
+        for idx, pos in enumerate(plan):
+            if self.executor:
+                for ahead in plan[idx : idx + 1 + self.prefetch]:
+                    if ahead not in pending and ahead not in self.chunk_cache.entries:
+                        chunk = self.chunks[ahead]
+                        pending[ahead] = self.executor.submit(
+                            decompress_chunk,
+                            chunk,
+                            self.read_chunk_raw(chunk),
+                        )
+
+            if (data := self.chunk_cache.get(pos)) is None:
+                if future := pending.pop(pos, None):
+                    data = future.result()
+                else:
+                    data = self.read_chunk_data(self.chunks[pos])
+                self.chunk_cache.put(pos, data)
+            yield data
+
+    def messages_file_order(
+        self,
+        connections: Iterable[Connection],
+        start: int | None = None,
+        stop: int | None = None,
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
+        """Read messages by walking relevant chunks in file order.
+
+        Args:
+            connections: Iterable with connections to filter for.
+            start: Yield only messages at or after this timestamp (ns).
+            stop: Yield only messages before this timestamp (ns).
+
+        Yields:
+            Tuples of connection, timestamp (ns), and rawdata.
+
+        Raises:
+            ReaderError: Data corrupt.
+
+        """
+        connmap = {x.id: x for x in connections}
+        if start is None:
+            start = 0
+        if stop is None:
+            stop = 2**63 - 1
+
+        plan = [
+            x.pos
+            for x in sorted(self.chunk_infos, key=lambda x: x.pos)
+            if start < x.end_time
+            and x.start_time < stop
+            and any(cid in connmap for cid in x.connection_counts)
+        ]
+
+        if self.lazy:
+            assert self.bio
+            wanted = set(plan)
+            for chunk_info in self.chunk_infos:
+                if chunk_info.pos in wanted and chunk_info.pos not in self.chunks:
+                    _ = self.bio.seek(chunk_info.pos)
+                    self.chunks[chunk_info.pos] = self.read_chunk()
+
+        offsets = self.msgdata_header_offsets
+        for chunk in self.iter_chunk_data(plan):
+            pos = 0
+            size = len(chunk)
+            while pos < size:
+                try:
+                    (hsize,) = deserialize_uint32(chunk, pos)
+                    if (
+                        hsize == offsets[0]
+                        and chunk[pos + offsets[1]] == RecordType.MSGDATA
+                        and chunk[pos + offsets[1] - 3 : pos + offsets[1]] == b'op='
+                    ):
+                        (conn,) = deserialize_uint32(chunk, pos + offsets[2])
+                        sec, nsec = deserialize_time_from(chunk, pos + offsets[3])
+                        pos += 4 + hsize
+                    else:
+                        header, pos = Header.unpack_from(chunk, pos)
+                        conn = -1
+                        if header.get_uint8('op') == RecordType.MSGDATA:
+                            offsets = self.msgdata_header_offsets = get_msgdata_header_offsets(
+                                chunk,
+                                pos - hsize - 4,
+                            )
+                            conn = header.get_uint32('conn')
+                            sec, nsec = divmod(header.get_time('time'), 10**9)
+                    (datasize,) = deserialize_uint32(chunk, pos)
+                except (IndexError, struct.error) as err:
+                    msg = 'Could not read uint32.'
+                    raise ReaderError(msg) from err
+                pos += 4
+                if (connection := connmap.get(conn)) and start <= (
+                    time := sec * 10**9 + nsec
+                ) < stop:
+                    data = chunk[pos : pos + datasize]
+                    if len(data) != datasize:
+                        msg = f'Got only {len(data)} of requested {datasize} bytes.'
+                        raise ReaderError(msg)
+                    yield connection, time, data
+                pos += datasize
 
     def messages(
         self,
         connections: Iterable[Connection] = (),
         start: int | None = None,
         stop: int | None = None,
-    ) -> Generator[tuple[Connection, int, bytes], None, None]:
+        *,
+        ordered: bool = True,
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
         """Read messages from bag.
 
         Args:
@@ -664,6 +1468,8 @@ class Reader:
                 iterable disables filtering on connections.
             start: Yield only messages at or after this timestamp (ns).
             stop: Yield only messages before this timestamp (ns).
+            ordered: Yield messages in timestamp order, otherwise in file
+                order, which avoids merging the indexes.
 
         Yields:
             Tuples of connection, timestamp (ns), and rawdata.
@@ -679,41 +1485,70 @@ class Reader:
         if not connections:
             connections = self.connections
 
+        if not ordered:
+            yield from self.messages_file_order(connections, start, stop)
+            return
+
         connmap = {x.id: x for x in self.connections}
 
-        indexes = [self.indexes[x.id] for x in connections]
-        for entry in heapq.merge(*indexes):
-            if start and entry.time < start:
-                continue
-            if stop and entry.time >= stop:
-                return
+        # A lazy reader might still have received full indexes from the index cache.
+        if self.lazy and not self.indexes:
+            indexes = self.get_lazy_indexes(connections, start, stop)
+        else:
+            indexes = [self.indexes[x.id] for x in connections]
+        index = merge_indexes([slice_index(x, start, stop) for x in indexes])
 
-            if self.current_chunk[0] != entry.chunk_pos:
-                self.current_chunk[1].close()
+        positions = index['chunk_pos']
+        switches = np.ones(len(positions), dtype=np.bool_)
+        switches[1:] = positions[1:] != positions[:-1]
+        chunks = self.iter_chunk_data(cast('list[int]', positions[switches].tolist()))
 
-                chunk_header = self.chunks[entry.chunk_pos]
-                _ = self.bio.seek(chunk_header.datapos)
-                rawbytes = chunk_header.decompressor(read_bytes(self.bio, chunk_header.datasize))
-                self.current_chunk = (entry.chunk_pos, BytesIO(rawbytes))
+        offsets = self.msgdata_header_offsets
+        chunk: bytes | memoryview = b''
+        last_chunk_pos = -1
+        for time, chunk_pos, offset in iter_index(index):
+            if chunk_pos != last_chunk_pos:
+                chunk = next(chunks)
+                last_chunk_pos = chunk_pos
 
-            chunk = self.current_chunk[1]
-            _ = chunk.seek(entry.offset)
+            pos = offset
 
-            while True:
-                header = Header.read(chunk)
-                have = header.get_uint8('op')
-                if have != RecordType.CONNECTION:
-                    break
-                _ = chunk.seek(read_uint32(chunk), os.SEEK_CUR)
+            try:
+                while True:
+                    (size,) = deserialize_uint32(chunk, pos)
+                    if size == offsets[0] and chunk[pos + offsets[1]] == RecordType.MSGDATA:
+                        (conn,) = deserialize_uint32(chunk, pos + offsets[2])
+                        sec, nsec = deserialize_time_from(chunk, pos + offsets[3])
+                        if conn in connmap and sec * 10**9 + nsec == time:
+                            break
+                    header, datapos = Header.unpack_from(chunk, pos)
+                    have = header.get_uint8('op')
+                    if have == RecordType.MSGDATA:
+                        conn = header.get_uint32('conn')
+                        if conn not in connmap or header.get_time('time') != time:
+                            msg = 'Message data does not match index.'
+                            raise ReaderError(msg)
+                        offsets = self.msgdata_header_offsets = get_msgdata_header_offsets(
+                            chunk,
+                            pos,
+                        )
+                        break
+                    if have != RecordType.CONNECTION:
+                        msg = 'Expected to find message data.'
+                        raise ReaderError(msg)
+                    pos = datapos + 4 + deserialize_uint32(chunk, datapos)[0]
 
-            if have != RecordType.MSGDATA:
-                msg = 'Expected to find message data.'
-                raise ReaderError(msg)
+                pos += 4 + size
+                (size,) = deserialize_uint32(chunk, pos)
+            except (IndexError, struct.error) as err:
+                msg = 'Could not read uint32.'
+                raise ReaderError(msg) from err
 
-            data = read_bytes(chunk, read_uint32(chunk))
-            connection = connmap[header.get_uint32('conn')]
-            assert entry.time == header.get_time('time')
-            yield connection, entry.time, data
+            data = chunk[pos + 4 : pos + 4 + size]
+            if len(data) != size:
+                msg = f'Got only {len(data)} of requested {size} bytes.'
+                raise ReaderError(msg)
+            yield connmap[conn], time, data
 
     def __enter__(self) -> Self:
         """Open rosbag1 when entering contextmanager."""
@@ -7,7 +7,8 @@ from __future__ import annotations
 import struct
 import warnings
 from bz2 import compress as bz2_compress
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import IntEnum, auto
 from io import BytesIO
@@ -25,11 +26,17 @@ from rosbags.interfaces import (
 from rosbags.typesys import Stores, get_typestore
 from rosbags.typesys.msg import denormalize_msgtype
 
-from .reader import RecordType
+from .reader import (
+    Header as RecordHeader,
+    Reader,
+    ReaderError,
+    RecordType,
+)
 
 if TYPE_CHECKING:
     import sys
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterable, Mapping
+    from concurrent.futures import Future
     from types import TracebackType
     from typing import BinaryIO, Literal
 
@@ -40,6 +47,8 @@ if TYPE_CHECKING:
 
     from rosbags.typesys.store import Typestore
 
+    from .reader import ChunkInfo
+
 
 class WriterError(Exception):
     """Writer Error."""
@@ -61,6 +70,7 @@ MAXSIZE: int = 2**63 - 1
 serialize_uint8 = struct.Struct('<B').pack
 serialize_uint32 = struct.Struct('<L').pack
 serialize_uint64 = struct.Struct('<Q').pack
+serialize_time_size = struct.Struct('<LLL').pack
 
 
 def serialize_time(val: int) -> bytes:
@@ -146,6 +156,24 @@ class Header(dict[str, bytes]):
         return size + 4
 
 
+def get_msgdata_header_prefix(cid: int) -> bytes:
+    """Get serialized MSGDATA record header up to the time value.
+
+    Args:
+        cid: Connection id.
+
+    Returns:
+        Header bytes preceding the serialized time.
+
+    """
+    header = Header()
+    header.set_uint32('conn', cid)
+    header.set_time('time', 0)
+    bio = BytesIO()
+    _ = header.write(bio, RecordType.MSGDATA)
+    return bio.getvalue()[:-8]
+
+
 class Writer:
     """Rosbag1 writer.
 
@@ -160,71 +188,139 @@ class Writer:
         BZ2 = auto()
         LZ4 = auto()
 
-    def __init__(self, path: Path | str) -> None:
+    COMPRESSION_LEVELS: Mapping[str, range] = {
+        'bz2': range(1, 10),
+        'lz4': range(17),
+    }
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        chunk_threshold: int = 1 << 20,
+        workers: int = 0,
+        append: bool = False,
+    ) -> None:
         """Initialize writer.
 
         Args:
             path: Filesystem path to bag.
+            chunk_threshold: Uncompressed size in bytes after which a chunk is closed.
+            workers: Number of threads compressing chunks in the background.
+            append: Append to existing bag.
 
         Raises:
-            WriterError: Target path exists already, Writer can only create new rosbags.
+            WriterError: Target path exists already, or does not exist in append mode.
 
         """
         path = Path(path)
         self.path = path
-        if path.exists():
+        if append and not path.exists():
+            msg = f'{path} does not exist, cannot append.'
+            raise WriterError(msg)
+        if not append and path.exists():
             msg = f'{path} exists already, not overwriting.'
             raise WriterError(msg)
+        self.append = append
         self.bio: BinaryIO | None = None
         self.compressor: Callable[[bytes], bytes] = lambda x: x
         self.compression_format = 'none'
         self.connections: list[Connection] = []
+        self.msgdata_headers: dict[int, tuple[Connection, bytes]] = {}
+        self.chunk_infos: list[ChunkInfo] = []
         self.chunks: list[WriteChunk] = [WriteChunk(BytesIO(), -1, MAXSIZE, 0, defaultdict(list))]
-        self.chunk_threshold = 1 * (1 << 20)
+        self.chunk_threshold = chunk_threshold
+        self.workers = workers
+        self.executor: ThreadPoolExecutor | None = None
+        self.pending: deque[tuple[WriteChunk, int, Future[bytes]]] = deque()
 
-    def set_compression(self, fmt: Writer.CompressionFormat) -> None:
+    def set_compression(self, fmt: Writer.CompressionFormat, level: int | None = None) -> None:
         """Enable compression on rosbag1.
 
         This function has to be called before opening.
 
         Args:
             fmt: Compressor to use, bz2 or lz4
+            level: Compression level, 1 to 9 for bz2, defaulting to 9, and 0 to
+                16 for lz4, defaulting to 0.
 
         Raises:
-            WriterError: Bag already open.
+            WriterError: Bag already open or level out of range.
 
         """
         if self.bio:
             msg = f'Cannot set compression, bag {self.path} already open.'
             raise WriterError(msg)
 
-        self.compression_format = fmt.name.lower()
+        name = fmt.name.lower()
+        if level is not None and level not in self.COMPRESSION_LEVELS[name]:
+            levels = self.COMPRESSION_LEVELS[name]
+            msg = f'Compression level {level!r} of {name} is not in {levels[0]}..{levels[-1]}.'
+            raise WriterError(msg)
+
+        self.compression_format = name
 
         def bz2(x: bytes) -> bytes:
-            return bz2_compress(x, 9)
+            return bz2_compress(x, 9 if level is None else level)
 
         def lz4(x: bytes) -> bytes:
-            return lz4_compress(x, 0)  # type: ignore[no-any-return,unused-ignore]
+            return lz4_compress(x, level or 0)  # type: ignore[no-any-return,unused-ignore]
 
         self.compressor = {'bz2': bz2, 'lz4': lz4}[self.compression_format]
 
     def open(self) -> None:
-        """Open rosbag1 for writing."""
-        try:
-            self.bio = self.path.open('xb')
-        except FileExistsError:
-            msg = f'{self.path} exists already, not overwriting.'
-            raise WriterError(msg) from None
+        """Open rosbag1 for writing.
 
-        assert self.bio
-        _ = self.bio.write(b'#ROSBAG V2.0\n')
-        header = Header()
-        header.set_uint64('index_pos', 0)
-        header.set_uint32('conn_count', 0)
-        header.set_uint32('chunk_count', 0)
-        size = header.write(self.bio, RecordType.BAGHEADER)
-        padsize = 4096 - 4 - size
-        _ = self.bio.write(serialize_uint32(padsize) + b' ' * padsize)
+        Raises:
+            WriterError: Target exists already, or is not appendable.
+
+        """
+        if self.append:
+            self.open_append()
+        else:
+            try:
+                self.bio = self.path.open('xb')
+            except FileExistsError:
+                msg = f'{self.path} exists already, not overwriting.'
+                raise WriterError(msg) from None
+
+            assert self.bio
+            _ = self.bio.write(b'#ROSBAG V2.0\n')
+            self.write_bag_header(0, 0, 0, self.bio)
+
+        if self.workers > 0:
+            self.executor = ThreadPoolExecutor(self.workers)
+
+    def open_append(self) -> None:
+        """Open existing rosbag1 for appending.
+
+        Raises:
+            WriterError: Bag could not be read or is not indexed.
+
+        """
+        try:
+            with Reader(self.path, lazy=True) as reader:
+                connections = reader.connections
+                self.chunk_infos = reader.chunk_infos
+                assert reader.bio
+                _ = reader.bio.seek(13)
+                index_pos = RecordHeader.read(reader.bio).get_uint64('index_pos')
+        except ReaderError as err:
+            msg = f'Cannot append to {self.path}: {err.args[0]}'
+            raise WriterError(msg) from err
+
+        self.connections = [
+            Connection(*x[0:5], -1, x.ext, self) for x in sorted(connections, key=lambda x: x.id)
+        ]
+        self.msgdata_headers = {
+            x.id: (x, get_msgdata_header_prefix(x.id)) for x in self.connections
+        }
+
+        self.bio = self.path.open('r+b')
+        _ = self.bio.seek(13)
+        self.write_bag_header(0, 0, 0, self.bio)
+        _ = self.bio.seek(index_pos)
+        _ = self.bio.truncate()
 
     def add_connection(
         self,
@@ -274,7 +370,7 @@ class Writer:
         assert md5sum
 
         connection = Connection(
-            len(self.connections),
+            max((x.id for x in self.connections), default=-1) + 1,
             topic,
             msgtype,
             MessageDefinition(MessageDefinitionFormat.MSG, msgdef),
@@ -292,6 +388,7 @@ class Writer:
         self.write_connection(connection, bio)
 
         self.connections.append(connection)
+        self.msgdata_headers[connection.id] = (connection, get_msgdata_header_prefix(connection.id))
         return connection
 
     def write(self, connection: Connection, timestamp: int, data: bytes | memoryview) -> None:
@@ -305,29 +402,46 @@ class Writer:
         Raises:
             WriterError: Bag not open or connection not registered.
 
+        """
+        self.write_many(((connection, timestamp, data),))
+
+    def write_many(self, messages: Iterable[tuple[Connection, int, bytes | memoryview]]) -> None:
+        """Write messages to rosbag1.
+
+        Message records are assembled from per connection header templates
+        and written straight into the open chunk.
+
+        Args:
+            messages: Iterable of connection, timestamp (ns), and serialized data.
+
+        Raises:
+            WriterError: Bag not open or connection not registered.
+
         """
         if not self.bio:
             msg = 'Bag was not opened.'
             raise WriterError(msg)
 
-        if connection not in self.connections:
-            msg = f'There is no connection {connection!r}.'
-            raise WriterError(msg) from None
-
+        headers = self.msgdata_headers
         chunk = self.chunks[-1]
-        chunk.connections[connection.id].append((timestamp, chunk.data.tell()))
-        chunk.start = min(timestamp, chunk.start)
-        chunk.end = max(timestamp, chunk.end)
-
-        header = Header()
-        header.set_uint32('conn', connection.id)
-        header.set_time('time', timestamp)
-
-        _ = header.write(chunk.data, RecordType.MSGDATA)
-        _ = chunk.data.write(serialize_uint32(len(data)))
-        _ = chunk.data.write(data)
-        if chunk.data.tell() > self.chunk_threshold:
-            self.write_chunk(chunk)
+        for connection, timestamp, data in messages:
+            item = headers.get(connection.id)
+            if not item or (item[0] is not connection and item[0] != connection):
+                msg = f'There is no connection {connection!r}.'
+                raise WriterError(msg)
+
+            bio = chunk.data
+            chunk.connections[connection.id].append((timestamp, bio.tell()))
+            chunk.start = min(timestamp, chunk.start)
+            chunk.end = max(timestamp, chunk.end)
+
+            _ = bio.write(
+                item[1] + serialize_time_size(timestamp // 10**9, timestamp % 10**9, len(data))
+            )
+            _ = bio.write(data)
+            if bio.tell() > self.chunk_threshold:
+                self.write_chunk(chunk)
+                chunk = self.chunks[-1]
 
     @staticmethod
     def write_connection(connection: Connection, bio: BinaryIO) -> None:
@@ -349,34 +463,124 @@ class Writer:
             header.set_string('latching', str(connection.ext.latching))
         _ = header.write(bio)
 
+    @staticmethod
+    def write_index_data(cid: int, items: list[tuple[int, int]], bio: BinaryIO) -> None:
+        """Write index data record.
+
+        Args:
+            cid: Connection id.
+            items: Timestamps and chunk offsets of messages.
+            bio: File handle.
+
+        """
+        header = Header()
+        header.set_uint32('ver', 1)
+        header.set_uint32('conn', cid)
+        header.set_uint32('count', len(items))
+        _ = header.write(bio, RecordType.IDXDATA)
+        _ = bio.write(serialize_uint32(len(items) * 12))
+        for time, offset in items:
+            _ = bio.write(serialize_time(time) + serialize_uint32(offset))
+
+    @staticmethod
+    def write_chunk_info(
+        pos: int,
+        start: int,
+        end: int,
+        counts: dict[int, int],
+        bio: BinaryIO,
+    ) -> None:
+        """Write chunk info record.
+
+        Args:
+            pos: Chunk position.
+            start: Timestamp of earliest message in chunk.
+            end: Timestamp of latest message in chunk.
+            counts: Message counts per connection id.
+            bio: File handle.
+
+        """
+        header = Header()
+        header.set_uint32('ver', 1)
+        header.set_uint64('chunk_pos', pos)
+        header.set_time('start_time', start)
+        header.set_time('end_time', end)
+        header.set_uint32('count', len(counts))
+        _ = header.write(bio, RecordType.CHUNK_INFO)
+        _ = bio.write(serialize_uint32(len(counts) * 8))
+        for cid, count in counts.items():
+            _ = bio.write(serialize_uint32(cid) + serialize_uint32(count))
+
+    @staticmethod
+    def write_bag_header(index_pos: int, conn_count: int, chunk_count: int, bio: BinaryIO) -> None:
+        """Write bag header record padded to 4096 bytes.
+
+        Args:
+            index_pos: Position of index section.
+            conn_count: Number of connections.
+            chunk_count: Number of chunks.
+            bio: File handle.
+
+        """
+        header = Header()
+        header.set_uint64('index_pos', index_pos)
+        header.set_uint32('conn_count', conn_count)
+        header.set_uint32('chunk_count', chunk_count)
+        size = header.write(bio, RecordType.BAGHEADER)
+        padsize = 4096 - 4 - size
+        _ = bio.write(serialize_uint32(padsize) + b' ' * padsize)
+
     def write_chunk(self, chunk: WriteChunk) -> None:
-        """Write open chunk to file."""
-        assert self.bio
+        """Close open chunk and write it to file.
 
-        if (size := chunk.data.tell()) > 0:
-            chunk.pos = self.bio.tell()
-
-            header = Header()
-            header.set_string('compression', self.compression_format)
-            header.set_uint32('size', size)
-            _ = header.write(self.bio, RecordType.CHUNK)
-            data = self.compressor(chunk.data.getvalue())
-            _ = self.bio.write(serialize_uint32(len(data)))
-            _ = self.bio.write(data)
-
-            for cid, items in chunk.connections.items():
-                header = Header()
-                header.set_uint32('ver', 1)
-                header.set_uint32('conn', cid)
-                header.set_uint32('count', len(items))
-                _ = header.write(self.bio, RecordType.IDXDATA)
-                _ = self.bio.write(serialize_uint32(len(items) * 12))
-                for time, offset in items:
-                    _ = self.bio.write(serialize_time(time) + serialize_uint32(offset))
+        With background compression the chunk is queued for compression and
+        written once all preceding chunks are written.
 
+        """
+        if (size := chunk.data.tell()) > 0:
+            raw = chunk.data.getvalue()
             chunk.data.close()
             self.chunks.append(WriteChunk(BytesIO(), -1, MAXSIZE, 0, defaultdict(list)))
 
+            if self.executor:
+                self.pending.append((chunk, size, self.executor.submit(self.compressor, raw)))
+                self.commit_pending(2 * self.workers)
+            else:
+                self.commit_chunk(chunk, size, self.compressor(raw))
+
+    def commit_pending(self, limit: int = 0) -> None:
+        """Write oldest pending chunks until at most limit are pending.
+
+        Args:
+            limit: Number of chunks allowed to stay pending.
+
+        """
+        while len(self.pending) > limit:
+            chunk, size, future = self.pending.popleft()
+            self.commit_chunk(chunk, size, future.result())
+
+    def commit_chunk(self, chunk: WriteChunk, size: int, data: bytes) -> None:
+        """Write compressed chunk and its index data to file.
+
+        Args:
+            chunk: Chunk.
+            size: Uncompressed size of chunk data.
+            data: Compressed chunk data.
+
+        """
+        assert self.bio
+        chunk.pos = self.bio.tell()
+
+        header = Header()
+        header.set_string('compression', self.compression_format)
+        header.set_uint32('size', size)
+        _ = header.write(self.bio, RecordType.CHUNK)
+        _ = self.bio.write(serialize_uint32(len(data)))
+        _ = self.bio.write(data)
+
+        for cid, items in chunk.connections.items():
+            self.write_index_data(cid, items, self.bio)
+
     def close(self) -> None:
         """Close rosbag1 after writing.
 
@@ -384,37 +588,44 @@ class Writer:
 
         """
         assert self.bio
-        for chunk in self.chunks:
-            if chunk.pos == -1:
-                self.write_chunk(chunk)
+        self.write_chunk(self.chunks[-1])
+        self.commit_pending()
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
 
         index_pos = self.bio.tell()
 
         for connection in self.connections:
             self.write_connection(connection, self.bio)
 
-        for chunk in self.chunks:
-            if chunk.pos == -1:
-                continue
-            header = Header()
-            header.set_uint32('ver', 1)
-            header.set_uint64('chunk_pos', chunk.pos)
-            header.set_time('start_time', 0 if chunk.start == MAXSIZE else chunk.start)
-            header.set_time('end_time', chunk.end)
-            header.set_uint32('count', len(chunk.connections))
-            _ = header.write(self.bio, RecordType.CHUNK_INFO)
-            _ = self.bio.write(serialize_uint32(len(chunk.connections) * 8))
-            for cid, items in chunk.connections.items():
-                _ = self.bio.write(serialize_uint32(cid) + serialize_uint32(len(items)))
+        for info in self.chunk_infos:
+            count = bool(info.connection_counts)
+            self.write_chunk_info(
+                info.pos,
+                info.start_time if count else 0,
+                info.end_time - 1 if count else 0,
+                info.connection_counts,
+                self.bio,
+            )
+
+        chunks = [x for x in self.chunks if x.pos != -1]
+        for chunk in chunks:
+            self.write_chunk_info(
+                chunk.pos,
+                0 if chunk.start == MAXSIZE else chunk.start,
+                chunk.end,
+                {cid: len(items) for cid, items in chunk.connections.items()},
+                self.bio,
+            )
 
         _ = self.bio.seek(13)
-        header = Header()
-        header.set_uint64('index_pos', index_pos)
-        header.set_uint32('conn_count', len(self.connections))
-        header.set_uint32('chunk_count', len([x for x in self.chunks if x.pos != -1]))
-        size = header.write(self.bio, RecordType.BAGHEADER)
-        padsize = 4096 - 4 - size
-        _ = self.bio.write(serialize_uint32(padsize) + b' ' * padsize)
+        self.write_bag_header(
+            index_pos,
+            len(self.connections),
+            len(self.chunk_infos) + len(chunks),
+            self.bio,
+        )
 
         self.bio.close()
 
@@ -4,8 +4,9 @@
 
 from __future__ import annotations
 
+import shutil
 from pathlib import Path, PurePath
-from tempfile import TemporaryDirectory
+from tempfile import TemporaryDirectory, mkdtemp
 from typing import TYPE_CHECKING, Protocol, cast
 
 import zstandard
@@ -46,7 +47,7 @@ if TYPE_CHECKING:
         connections: list[Connection]
         metadata: ReaderMetadata
 
-        def __init__(self, path: RPath) -> None:
+        def __init__(self, path: RPath, **kwargs: object) -> None:
             """Initialize."""
             raise NotImplementedError  # pragma: no cover
 
@@ -63,7 +64,9 @@ if TYPE_CHECKING:
             connections: Iterable[Connection],
             start: int | None = None,
             stop: int | None = None,
-        ) -> Generator[tuple[Connection, int, bytes], None, None]:
+            *,
+            ordered: bool = True,
+        ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
             """Get messages from file."""
             raise NotImplementedError  # pragma: no cover
 
@@ -93,17 +96,33 @@ class DirectoryReader:
         'sqlite3': Sqlite3Reader,
     }
 
-    def __init__(self, path: RPath) -> None:
+    # Message counts are taken from metadata.yaml, storages need not count.
+    STORAGE_DEFAULTS: Mapping[str, Mapping[str, object]] = {
+        'sqlite3': {'lazy': True},
+    }
+
+    # Caches keyed on decompressed temporary copies could never be hit again.
+    STORAGE_CACHE_OPTIONS: Mapping[str, str] = {
+        'mcap': 'summary_cache',
+    }
+
+    def __init__(self, path: RPath, **storage_options: object) -> None:
         """Open rosbag and check metadata.
 
+        The ``storage_options`` are passed as keyword arguments to the
+        storage plugin reading the split files, see McapReader and
+        Sqlite3Reader for the options they support.
+
         Args:
             path: Filesystem path to bag.
+            storage_options: Options of storage plugin.
 
         Raises:
             ReaderError: Bag not readable or bag metadata.
 
         """
         self.path = path
+        self.storage_options = storage_options
         if not (path / 'metadata.yaml').exists():
             msg = f'Expected metadata file {str(self.path)!r} does not exist.'
             raise FileNotFoundError(msg)
@@ -112,6 +131,8 @@ class DirectoryReader:
         self.connections: list[Connection] = []
         self.metadata = ReaderMetadata(0, 2**63 - 1, 0, 0, None, None, None, None)
         self.files: list[FileInformation] = []
+        self.paths: list[RPath] = []
+        self.storage_identifier = ''
         self.storages: list[ReaderProtocol] = []
 
     def open(self) -> None:
@@ -202,45 +223,147 @@ class DirectoryReader:
 
         self.files = metadata.get('files', [])[:]
 
-        storage_paths: list[RPath] = []
-        if compression_mode == 'file':
-            self.tmpdir = TemporaryDirectory()
-            tmpdir = self.tmpdir.name
-            decomp = zstandard.ZstdDecompressor()
-            for path in paths:
-                storage_file = Path(tmpdir, path.stem)
-                with path.open('rb') as infile, storage_file.open('wb') as outfile:
-                    _ = decomp.copy_stream(infile, outfile)
-                storage_paths.append(storage_file)
-        else:
-            storage_paths = paths[:]
+        self.paths = paths
+        self.storage_identifier = metadata['storage_identifier']
 
-        plugin = self.STORAGE_PLUGINS[metadata['storage_identifier']]
+        # Compressed splits are decompressed on demand, at open only as many
+        # as needed to find the message definitions of all connections.
         try:
-            for path in storage_paths:
-                storage = plugin(path)
-                storage.open()
-                self.storages.append(storage)
+            if compression_mode == 'file':
+                self.tmpdir = TemporaryDirectory()
+                for path in paths:
+                    storage, tmppath = self.open_split(path)
+                    try:
+                        found = self.add_msgdefs([storage])
+                    finally:
+                        self.close_split(storage, tmppath)
+                    if not found or all(
+                        x.msgdef.format != MessageDefinitionFormat.NONE for x in self.connections
+                    ):
+                        break
+            else:
+                for path in paths:
+                    storage = self.make_storage(path)
+                    storage.open()
+                    self.storages.append(storage)
+                _ = self.add_msgdefs(self.storages)
         except:
             self.close()
             raise
 
+    def add_msgdefs(self, storages: Iterable[ReaderProtocol]) -> bool:
+        """Add message definitions from storages to connections.
+
+        Args:
+            storages: Storages to take message definitions from.
+
+        Returns:
+            True if storages contain any message definitions.
+
+        """
+        msgdefs: dict[str, MessageDefinition] = {}
+        for storage in storages:
+            for conn in storage.connections:
+                if conn.msgdef.format != MessageDefinitionFormat.NONE:
+                    _ = msgdefs.setdefault(conn.msgtype, conn.msgdef)
         for idx, conn in enumerate(self.connections):
-            if msgdef := next(
-                (
-                    y.msgdef
-                    for x in self.storages
-                    for y in x.connections
-                    if y.msgtype == conn.msgtype and y.msgdef.format != MessageDefinitionFormat.NONE
-                ),
-                None,
+            if conn.msgdef.format == MessageDefinitionFormat.NONE and (
+                msgdef := msgdefs.get(conn.msgtype)
             ):
                 self.connections[idx] = conn._replace(msgdef=msgdef)
+        return bool(msgdefs)
+
+    def make_storage(self, path: RPath, *, cache: bool = True) -> ReaderProtocol:
+        """Create storage plugin for split file.
+
+        Args:
+            path: Path of split file.
+            cache: Pass cache option of plugin.
+
+        Returns:
+            Storage plugin, not yet opened.
+
+        Raises:
+            ReaderError: Storage options not supported by plugin.
+
+        """
+        plugin = self.STORAGE_PLUGINS[self.storage_identifier]
+        defaults = self.STORAGE_DEFAULTS.get(self.storage_identifier, {})
+        options = {**defaults, **self.storage_options}
+        if not cache:
+            _ = options.pop(self.STORAGE_CACHE_OPTIONS.get(self.storage_identifier, ''), None)
+        try:
+            return plugin(path, **options)
+        except TypeError as err:
+            msg = f'Invalid storage options {self.storage_options!r}: {err}'
+            raise ReaderError(msg) from err
+
+    def open_split(self, path: RPath) -> tuple[ReaderProtocol, Path]:
+        """Decompress and open compressed split file.
+
+        Args:
+            path: Path of compressed split file.
+
+        Returns:
+            Opened storage and its temporary directory.
+
+        """
+        assert self.tmpdir
+        tmppath = Path(mkdtemp(dir=self.tmpdir.name))
+        try:
+            storage_file = tmppath / path.stem
+            with path.open('rb') as infile, storage_file.open('wb') as outfile:
+                _ = zstandard.ZstdDecompressor().copy_stream(infile, outfile)
+            storage = self.make_storage(storage_file, cache=False)
+            storage.open()
+        except:
+            shutil.rmtree(tmppath)
+            raise
+        return storage, tmppath
+
+    def close_split(self, storage: ReaderProtocol, tmppath: Path) -> None:
+        """Close split file and remove its decompressed copy.
+
+        Args:
+            storage: Storage returned by open_split.
+            tmppath: Temporary directory returned by open_split.
+
+        """
+        try:
+            storage.close()
+        finally:
+            shutil.rmtree(tmppath)
+
+    def overlaps(self, path: RPath, start: int | None, stop: int | None) -> bool:
+        """Check if split file may contain messages in time range.
+
+        Args:
+            path: Path of split file.
+            start: Start of time range (ns).
+            stop: End of time range (ns).
+
+        Returns:
+            False if per file metadata rules out messages in range.
+
+        """
+        info = next(
+            (x for x in self.files if PurePath(x['path']).name == f'{path.stem}{path.suffix}'), None
+        )
+        if info is None:
+            return True
+        first = info['starting_time']['nanoseconds_since_epoch']
+        last = first + info['duration']['nanoseconds']
+        return bool(
+            info['message_count']
+            and (start is None or start <= last)
+            and (stop is None or first < stop),
+        )
 
     def close(self) -> None:
         """Close rosbag2."""
         while self.storages:
             self.storages.pop().close()
+        self.paths = []
         if self.tmpdir:
             self.tmpdir.cleanup()
             self.tmpdir = None
@@ -250,7 +373,9 @@ class DirectoryReader:
         connections: Iterable[Connection],
         start: int | None = None,
         stop: int | None = None,
-    ) -> Generator[tuple[Connection, int, bytes], None, None]:
+        *,
+        ordered: bool = True,
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
         """Read messages from bag.
 
         Args:
@@ -258,6 +383,8 @@ class DirectoryReader:
                 iterable disables filtering on connections.
             start: Yield only messages at or after this timestamp (ns).
             stop: Yield only messages before this timestamp (ns).
+            ordered: Yield messages in timestamp order, otherwise in file
+                order for faster full scans.
 
         Yields:
             tuples of connection, timestamp (ns), and rawdata.
@@ -267,18 +394,35 @@ class DirectoryReader:
 
         """
         topics = [x.topic for x in connections]
-        for storage in self.storages:
-            storage_conns = [x for x in storage.connections if x.topic in topics]
-            connmap = {
-                x.id: next(y for y in connections if x.topic == y.topic) for x in storage_conns
-            }
-            if self.metadata.compression_mode == 'message':
-                decomp = zstandard.ZstdDecompressor().decompress
-                for storage_conn, timestamp, data in storage.messages(storage_conns, start, stop):
-                    yield connmap[storage_conn.id], timestamp, decomp(data)
+        compressed = self.metadata.compression_mode == 'file'
+        for idx, path in enumerate(self.paths):
+            if not self.overlaps(path, start, stop):
+                continue
+
+            if compressed:
+                storage, tmppath = self.open_split(path)
             else:
-                for storage_conn, timestamp, data in storage.messages(storage_conns, start, stop):
-                    yield connmap[storage_conn.id], timestamp, data
+                storage = self.storages[idx]
+
+            try:
+                storage_conns = [x for x in storage.connections if x.topic in topics]
+                connmap = {
+                    x.id: next(y for y in connections if x.topic == y.topic) for x in storage_conns
+                }
+                if self.metadata.compression_mode == 'message':
+                    decomp = zstandard.ZstdDecompressor().decompress
+                    for storage_conn, timestamp, data in storage.messages(
+                        storage_conns, start, stop, ordered=ordered
+                    ):
+                        yield connmap[storage_conn.id], timestamp, decomp(data)
+                else:
+                    for storage_conn, timestamp, data in storage.messages(
+                        storage_conns, start, stop, ordered=ordered
+                    ):
+                        yield connmap[storage_conn.id], timestamp, data
+            finally:
+                if compressed:
+                    self.close_split(storage, tmppath)
 
 
 class Reader:
@@ -294,14 +438,24 @@ class Reader:
         '.db3': Sqlite3Reader,
     }
 
-    def __init__(self, path: str | RPath) -> None:
+    def __init__(
+        self,
+        path: str | RPath,
+        *,
+        storage_options: Mapping[str, object] | None = None,
+    ) -> None:
         """Initialize.
 
+        The ``storage_options`` are passed as keyword arguments to the
+        storage plugins, the McapReader or Sqlite3Reader reading the bag or
+        its split files, like ``prefetch`` or ``use_mmap`` for MCAP.
+
         Args:
             path: Filesystem path to bag.
+            storage_options: Options of storage plugin.
 
         Raises:
-            ReaderError: Path does not exist.
+            ReaderError: Path does not exist or invalid storage options.
 
         """
         self.path: RPath = Path(path) if isinstance(path, str) else path
@@ -314,7 +468,12 @@ class Reader:
         self.storage: ReaderProtocol
         plugin_key = 'dir' if self.path.is_dir() else self.path.suffix
         if plugin := self.STORAGE_PLUGINS.get(plugin_key):
-            self.storage = plugin(self.path)
+            options = dict(storage_options or {})
+            try:
+                self.storage = plugin(self.path, **options)
+            except TypeError as err:
+                msg = f'Invalid storage options {options!r}: {err}'
+                raise ReaderError(msg) from err
         else:
             msg = f'Unrecognized storage format {self.path.suffix!r}'
             raise ReaderError(msg)
@@ -397,7 +556,9 @@ class Reader:
         connections: Iterable[Connection] = (),
         start: int | None = None,
         stop: int | None = None,
-    ) -> Generator[tuple[Connection, int, bytes], None, None]:
+        *,
+        ordered: bool = True,
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
         """Read messages from bag.
 
         Args:
@@ -405,6 +566,8 @@ class Reader:
                 iterable disables filtering on connections.
             start: Yield only messages at or after this timestamp (ns).
             stop: Yield only messages before this timestamp (ns).
+            ordered: Yield messages in timestamp order, otherwise in file
+                order for faster full scans.
 
         Yields:
             tuples of connection, timestamp (ns), and rawdata.
@@ -414,7 +577,12 @@ class Reader:
 
         """
         self._check_open()
-        return self.storage.messages(connections or self.storage.connections, start, stop)
+        return self.storage.messages(
+            connections or self.storage.connections,
+            start,
+            stop,
+            ordered=ordered,
+        )
 
     def __enter__(self) -> Self:
         """Open rosbag2 when entering contextmanager."""
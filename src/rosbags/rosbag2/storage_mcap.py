@@ -5,16 +5,23 @@
 from __future__ import annotations
 
 import heapq
+import mmap
 import struct
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from importlib.metadata import version
 from io import BytesIO
+from itertools import chain
+from pathlib import Path
 from struct import iter_unpack, unpack_from
 from typing import TYPE_CHECKING, NamedTuple, cast
 
 import zstandard
-from lz4.frame import decompress as lz4_decompress  # type: ignore[import-untyped]
+from lz4.frame import (  # type: ignore[import-untyped]
+    compress as lz4_compress,
+    decompress as lz4_decompress,
+)
 
 from rosbags.interfaces import (
     Connection,
@@ -23,14 +30,15 @@ from rosbags.interfaces import (
     MessageDefinitionFormat,
     Qos,
 )
+from rosbags.interfaces.fileio import close_mmap, get_cache_location, read_cache, write_cache
 
 from .enums import CompressionMode
-from .errors import ReaderError
+from .errors import ReaderError, WriterError
 from .metadata import ReaderMetadata, parse_qos
 
 if TYPE_CHECKING:
     from collections.abc import Callable, Generator, Iterable
-    from pathlib import Path
+    from concurrent.futures import Future
     from typing import BinaryIO
 
     from rosbags.interfaces.typing import RPath
@@ -39,6 +47,9 @@ if TYPE_CHECKING:
     Unpack2 = Callable[[bytes], 'tuple[int, int]']
     Unpack4 = Callable[[bytes], 'tuple[int, int, int, int]']
     Unpack5 = Callable[[bytes], 'tuple[int, int, int, int, int]']
+    UnpackFrom = Callable[[bytes | memoryview, int], 'tuple[int]']
+    UnpackFrom4 = Callable[[bytes | memoryview, int], 'tuple[int, int, int, int]']
+    PackMessageHeader = Callable[[int, int, int, int, int, int], bytes]
 
 
 class Schema(NamedTuple):
@@ -106,11 +117,13 @@ class Msg(NamedTuple):
     timestamp: int
     offset: int
     connection: Connection | None
-    data: bytes | None
+    data: bytes | memoryview | None
 
 
 MAXSIZE: int = 2**63 - 1
 
+SUMMARY_CACHE_MAGIC = b'#ROSBAGS MCAP SUMMARY V1\n'
+
 deserialize_uint16: Unpack = struct.Struct('<H').unpack
 deserialize_uint32: Unpack = struct.Struct('<I').unpack
 deserialize_uint64: Unpack = struct.Struct('<Q').unpack
@@ -122,6 +135,12 @@ deserialize_qqqq: Unpack4 = struct.Struct('<QQQQ').unpack
 deserialize_hiqq: Unpack4 = struct.Struct('<HIQQ').unpack
 deserialize_qhiqq: Unpack5 = struct.Struct('<QHIQQ').unpack
 
+deserialize_uint64_from: UnpackFrom = struct.Struct('<Q').unpack_from
+deserialize_hiqq_from: UnpackFrom4 = struct.Struct('<HIQQ').unpack_from
+
+# Opcode, record length, channel id, sequence, log time, and publish time.
+serialize_message_header: PackMessageHeader = struct.Struct('<BQHIQQ').pack
+
 
 def read_sized(bio: BinaryIO) -> bytes:
     """Read one record."""
@@ -143,54 +162,290 @@ def read_string(bio: BinaryIO) -> str:
     return bio.read(deserialize_uint32(bio.read(4))[0]).decode()
 
 
-DECOMPRESSORS: dict[str, Callable[[bytes, int], bytes]] = {
+DECOMPRESSORS: dict[str, Callable[[bytes | memoryview, int], bytes | memoryview]] = {
     '': lambda x, _: x,
     'lz4': lambda x, _: lz4_decompress(x),
-    'zstd': zstandard.ZstdDecompressor().decompress,
+    # Decompressor instances must not be shared between threads.
+    'zstd': lambda x, size: zstandard.ZstdDecompressor().decompress(x, size),
 }
 
 
-def msgsrc(
-    chunk: ChunkInfo,
+def read_chunk_info(bio: BinaryIO, offset: int, size: int) -> ChunkInfo:
+    """Read chunk information from chunk record header.
+
+    The stream is expected after the record length and is left at the start
+    of the compressed records.
+
+    Args:
+        bio: Stream to read from.
+        offset: Offset of chunk record.
+        size: Length of chunk record.
+
+    Returns:
+        Chunk information without message index and channel counts.
+
+    """
+    start_time, end_time, uncompressed_size, _ = deserialize_qqqi(bio.read(28))
+    compression = read_string(bio)
+    (compressed_size,) = deserialize_uint64(bio.read(8))
+    return ChunkInfo(
+        start_time,
+        end_time,
+        offset,
+        9 + size,
+        {},
+        0,
+        compression,
+        compressed_size,
+        uncompressed_size,
+        {},
+    )
+
+
+def decompress_chunk(chunk: ChunkInfo, data: bytes | memoryview) -> memoryview:
+    """Decompress records of chunk into a view for zero-copy slicing."""
+    return memoryview(DECOMPRESSORS[chunk.compression](data, chunk.uncompressed_size))
+
+
+class ChunkPrefetcher:
+    """Decompress chunks ahead of use on a thread pool.
+
+    Compressed data is read on the calling thread, decompression runs on the
+    pool. Chunks are submitted in order of use as long as the decompressed
+    size of submitted but unused chunks stays within budget.
+
+    """
+
+    def __init__(
+        self,
+        chunks: list[ChunkInfo],
+        read: Callable[[ChunkInfo], bytes | memoryview],
+        executor: ThreadPoolExecutor | None,
+        budget: int,
+    ) -> None:
+        """Initialize.
+
+        Args:
+            chunks: Chunks in order of use.
+            read: Function reading compressed chunk records.
+            executor: Thread pool, disables prefetching if None.
+            budget: Budget in bytes of decompressed data ahead of use.
+
+        """
+        self.chunks = chunks
+        self.read = read
+        self.executor = executor
+        self.budget = budget
+        self.size = 0
+        self.next = 0
+        self.used: set[int] = set()
+        self.pending: dict[int, Future[bytes | memoryview]] = {}
+
+    def fill(self) -> None:
+        """Submit upcoming chunks until budget is exhausted."""
+        assert self.executor
+        while self.next < len(self.chunks):
+            chunk = self.chunks[self.next]
+            if chunk.chunk_start_offset not in self.used:
+                if self.pending and self.size + chunk.uncompressed_size > self.budget:
+                    break
+                self.pending[chunk.chunk_start_offset] = self.executor.submit(
+                    decompress_chunk,
+                    chunk,
+                    self.read(chunk),
+                )
+                self.size += chunk.uncompressed_size
+            self.next += 1
+
+    def get(self, chunk: ChunkInfo) -> bytes | memoryview:
+        """Get decompressed records of chunk.
+
+        Args:
+            chunk: Chunk to get.
+
+        Returns:
+            Decompressed chunk records.
+
+        """
+        if not self.executor:
+            return decompress_chunk(chunk, self.read(chunk))
+
+        self.used.add(chunk.chunk_start_offset)
+        self.fill()
+        if future := self.pending.pop(chunk.chunk_start_offset, None):
+            self.size -= chunk.uncompressed_size
+            data = future.result()
+        else:
+            data = decompress_chunk(chunk, self.read(chunk))
+        self.fill()
+        return data
+
+    def skip(self, chunk: ChunkInfo) -> None:
+        """Skip chunk that turned out to be unneeded.
+
+        Args:
+            chunk: Chunk to skip.
+
+        """
+        if not self.executor:
+            return
+
+        self.used.add(chunk.chunk_start_offset)
+        if future := self.pending.pop(chunk.chunk_start_offset, None):
+            _ = future.cancel()
+            self.size -= chunk.uncompressed_size
+        self.fill()
+
+
+def chunk_messages(
+    chunk_offset: int,
     channel_map: dict[int, Connection],
     start: int,
     stop: int,
+    data: bytes | memoryview,
+) -> Generator[Msg, None, None]:
+    """Walk records of chunk and yield matching messages in file order.
+
+    Args:
+        chunk_offset: File offset of chunk.
+        channel_map: Requested channels.
+        start: Yield only messages at or after this timestamp (ns).
+        stop: Yield only messages before this timestamp (ns).
+        data: Decompressed chunk records.
+
+    Yields:
+        Messages with payload slices of data.
+
+    """
+    pos = 0
+    size = len(data)
+    while pos < size:
+        (rsize,) = deserialize_uint64_from(data, pos + 1)
+        if data[pos] == 0x05:
+            channel_id, _, log_time, _ = deserialize_hiqq_from(data, pos + 9)
+            if start <= log_time < stop and (connection := channel_map.get(channel_id)):
+                yield Msg(
+                    log_time,
+                    chunk_offset + pos,
+                    connection,
+                    data[pos + 31 : pos + 9 + rsize],
+                )
+        pos += 9 + rsize
+
+
+def get_indexed_channels(chunk: ChunkInfo, channel_map: dict[int, Connection]) -> list[int] | None:
+    """Get channels to read through message index.
+
+    Args:
+        chunk: Chunk information.
+        channel_map: Requested channels.
+
+    Returns:
+        Requested channel ids of chunk, None if the chunk has no message
+        index or all its channels are requested.
+
+    """
+    if not chunk.message_index_offsets:
+        return None
+    wanted = [x for x in chunk.message_index_offsets if x in channel_map]
+    return wanted if len(wanted) < len(chunk.message_index_offsets) else None
+
+
+def read_message_index(
+    chunk: ChunkInfo,
+    channel_ids: list[int],
+    start: int,
+    stop: int,
     bio: BinaryIO,
+) -> list[tuple[int, int, int]]:
+    """Read message index entries of channels in chunk.
+
+    Args:
+        chunk: Chunk information.
+        channel_ids: Channels to read index for.
+        start: Skip entries before this timestamp (ns).
+        stop: Skip entries at or after this timestamp (ns).
+        bio: File handle.
+
+    Returns:
+        Record offsets, timestamps, and channel ids sorted by offset.
+
+    """
+    entries: list[tuple[int, int, int]] = []
+    for cid in channel_ids:
+        _ = bio.seek(chunk.message_index_offsets[cid] + 11)
+        (size,) = deserialize_uint32(bio.read(4))
+        entries.extend(
+            (offset, log_time, cid)
+            for log_time, offset in cast(
+                'Iterable[tuple[int, int]]',
+                iter_unpack('<QQ', bio.read(size)),
+            )
+            if start <= log_time < stop
+        )
+    entries.sort()
+    return entries
+
+
+def indexed_messages(
+    chunk: ChunkInfo,
+    channel_map: dict[int, Connection],
+    entries: list[tuple[int, int, int]],
+    data: bytes | memoryview,
 ) -> Generator[Msg, None, None]:
-    """Yield messages from chunk in time order."""
-    yield Msg(chunk.message_start_time, 0, None, None)
+    """Yield messages at known offsets from decompressed chunk."""
+    for offset, log_time, cid in entries:
+        (size,) = deserialize_uint64_from(data, offset + 1)
+        yield Msg(
+            log_time,
+            chunk.chunk_start_offset + offset,
+            channel_map[cid],
+            data[offset + 31 : offset + 9 + size],
+        )
 
-    _ = bio.seek(chunk.chunk_start_offset + 9 + 40 + len(chunk.compression))
-    compressed_data = bio.read(chunk.compressed_size)
-    subio = BytesIO(DECOMPRESSORS[chunk.compression](compressed_data, chunk.uncompressed_size))
-
-    messages: list[Msg] = []
-    while (offset := subio.tell()) < chunk.uncompressed_size:
-        op_ = ord(subio.read(1))
-        if op_ == 0x05:
-            recio = BytesIO(read_sized(subio))
-            channel_id, _, log_time, _ = deserialize_hiqq(recio.read(22))
-            if start <= log_time < stop and channel_id in channel_map:
-                messages.append(
-                    Msg(
-                        log_time,
-                        chunk.chunk_start_offset + offset,
-                        channel_map[channel_id],
-                        recio.read(),
-                    ),
-                )
-        else:
-            skip_sized(subio)
 
-    yield from sorted(messages, key=lambda x: x.timestamp)
+def msgsrc(
+    chunk: ChunkInfo,
+    read: Callable[[ChunkInfo], Iterable[Msg]],
+) -> Generator[Msg, None, None]:
+    """Yield messages from chunk in time order."""
+    yield Msg(chunk.message_start_time, 0, None, None)
+    yield from sorted(read(chunk), key=lambda x: x.timestamp)
 
 
 class McapReader:
     """Mcap format reader."""
 
-    def __init__(self, path: RPath) -> None:
-        """Initialize."""
+    def __init__(
+        self,
+        path: RPath,
+        *,
+        use_mmap: bool = False,
+        summary_cache: str | Path | None = None,
+        recover: bool = False,
+        prefetch: int = 0,
+        prefetch_budget: int = 1 << 28,
+    ) -> None:
+        """Initialize.
+
+        Args:
+            path: Filesystem path to bag.
+            use_mmap: Read messages from a memory-mapped file.
+            summary_cache: Directory for persisted scan results.
+            recover: Open files with truncated end by scanning.
+            prefetch: Number of threads decompressing chunks ahead.
+            prefetch_budget: Budget in bytes for prefetched chunk data.
+
+        """
         self.path = path
+        self.use_mmap = use_mmap
+        self.mmap: mmap.mmap | None = None
+        self.view: memoryview | None = None
+        self.summary_cache = Path(summary_cache) if summary_cache is not None else None
+        self.recover = recover
+        self.prefetch = prefetch
+        self.prefetch_budget = prefetch_budget
+        self.executor: ThreadPoolExecutor | None = None
         self.bio: BinaryIO | None = None
         self.data_start = 0
         self.data_end = 0
@@ -230,49 +485,53 @@ class McapReader:
             raise ReaderError(msg)
         self.data_start = self.bio.tell()
 
-        _ = self.bio.seek(-37, 2)
+        size = self.bio.seek(0, 2)
+        _ = self.bio.seek(max(size - 37, self.data_start))
         footer_start = self.bio.tell()
         data = self.bio.read()
         magic = data[-8:]
         if magic != b'\x89MCAP0\r\n':
-            msg = 'File end magic is invalid.'
-            raise ReaderError(msg)
-
-        assert len(data) == 37
-        assert data[0:9] == b'\x02\x14\x00\x00\x00\x00\x00\x00\x00', data[0:9]
-
-        (summary_start,) = deserialize_uint64(data[9:17])
-        if summary_start:
-            self.data_end = summary_start
-            self.read_index()
-            if self.statistics:
-                if not self.schemas:
+            if not self.recover:
+                msg = 'File end magic is invalid.'
+                raise ReaderError(msg)
+            self.data_end = size
+            self.meta_scan()
+        else:
+            assert len(data) == 37
+            assert data[0:9] == b'\x02\x14\x00\x00\x00\x00\x00\x00\x00', data[0:9]
+
+            (summary_start,) = deserialize_uint64(data[9:17])
+            if summary_start:
+                self.data_end = summary_start
+                self.read_index()
+                if self.statistics:
+                    if not self.schemas:
+                        self.meta_scan()
+                elif self.chunks:
+                    message_count = sum(sum(x.channel_count.values()) for x in self.chunks)
+                    start_time = min(x.message_start_time for x in self.chunks)
+                    end_time = max(x.message_end_time for x in self.chunks)
+                    duration = end_time - start_time
+                    cstats: dict[int, int] = defaultdict(int)
+                    for chunk in self.chunks:
+                        for cid, count in chunk.channel_count.items():
+                            cstats[cid] += count
+                    self.statistics = Statistics(
+                        message_count,
+                        len(self.schemas),
+                        len(self.channels),
+                        0,
+                        0,
+                        len(self.chunks),
+                        start_time,
+                        end_time,
+                        cstats,
+                    )
+                else:
                     self.meta_scan()
-            elif self.chunks:
-                message_count = sum(sum(x.channel_count.values()) for x in self.chunks)
-                start_time = min(x.message_start_time for x in self.chunks)
-                end_time = max(x.message_end_time for x in self.chunks)
-                duration = end_time - start_time
-                cstats: dict[int, int] = defaultdict(int)
-                for chunk in self.chunks:
-                    for cid, count in chunk.channel_count.items():
-                        cstats[cid] += count
-                self.statistics = Statistics(
-                    message_count,
-                    len(self.schemas),
-                    len(self.channels),
-                    0,
-                    0,
-                    len(self.chunks),
-                    start_time,
-                    end_time,
-                    cstats,
-                )
             else:
+                self.data_end = footer_start
                 self.meta_scan()
-        else:
-            self.data_end = footer_start
-            self.meta_scan()
 
         def get_msgdef(name: str) -> MessageDefinition:
             """Get message definition for name."""
@@ -325,6 +584,18 @@ class McapReader:
             message_count=message_count,
         )
 
+        if self.use_mmap:
+            try:
+                self.mmap = mmap.mmap(self.bio.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as err:
+                self.close()
+                msg = f'Could not memory-map file {str(self.path)!r}: {err}.'
+                raise ReaderError(msg) from err
+            self.view = memoryview(self.mmap)
+
+        if self.prefetch > 0 and self.chunks:
+            self.executor = ThreadPoolExecutor(self.prefetch)
+
     def read_index(self) -> None:
         """Read index from file."""
         bio = self.bio
@@ -416,12 +687,32 @@ class McapReader:
     def close(self) -> None:
         """Close MCAP."""
         assert self.bio
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        if self.mmap:
+            close_mmap(self.mmap, self.view)
+            self.mmap = None
+            self.view = None
         self.bio.close()
         self.bio = None
 
     def meta_scan(self) -> None:
-        """Generate metadata by scanning through file."""
+        """Generate metadata by scanning through file.
+
+        Besides schemas, channels, and statistics the scan rebuilds the chunk
+        index, including the message index offsets of chunks followed by
+        message index records. When recovering, the scan stops at the first
+        incomplete record, which marks the end of the data section.
+
+        """
         assert self.bio
+
+        if self.summary_cache:
+            cache_path, cache_key = get_cache_location(self.path, self.summary_cache, '.summary')
+            if self.read_summary_cache(cache_path, cache_key):
+                return
+
         bio = self.bio
         bio_size = self.data_end
         _ = bio.seek(self.data_start)
@@ -429,13 +720,23 @@ class McapReader:
         msgcount = 0
         start_time = 2**63 - 1
         end_time = 0
-        nchunks = 0
         cstats: dict[int, int] = defaultdict(int)
 
         schemas = self.schemas
         channels = self.channels
+        chunks: list[ChunkInfo] = []
+        chunk_counts: dict[int, int] = {}
+        index_end = 0
 
         while bio.tell() < bio_size:
+            if self.recover and bio is self.bio:
+                pos = bio.tell()
+                head = bio.read(9)
+                if len(head) < 9 or pos + 9 + deserialize_uint64(head[1:])[0] > bio_size:
+                    self.data_end = pos
+                    break
+                _ = bio.seek(pos)
+
             op_ = ord(bio.read(1))
 
             if op_ == 0x03:
@@ -465,17 +766,34 @@ class McapReader:
                 start_time = min(timestamp, start_time)
                 end_time = max(timestamp, end_time)
                 cstats[cid] += 1
+                if bio is not self.bio:
+                    chunk_counts[cid] = chunk_counts.get(cid, 0) + 1
                 _ = bio.seek(size - 14, 1)
             elif op_ == 0x06:
-                _ = bio.seek(8, 1)
-                _, _, uncompressed_size, _ = deserialize_qqqi(bio.read(28))
-                compression = read_string(bio)
-                (compressed_size,) = deserialize_uint64(bio.read(8))
+                pos = bio.tell() - 1
+                (size,) = deserialize_uint64(bio.read(8))
+                chunk = read_chunk_info(bio, pos, size)
+                chunk_counts = chunk.channel_count
+                chunks.append(chunk)
+                index_end = pos + 9 + size
                 bio = BytesIO(
-                    DECOMPRESSORS[compression](bio.read(compressed_size), uncompressed_size),
+                    DECOMPRESSORS[chunk.compression](
+                        bio.read(chunk.compressed_size),
+                        chunk.uncompressed_size,
+                    ),
                 )
-                bio_size = uncompressed_size
-                nchunks += 1
+                bio_size = chunk.uncompressed_size
+            elif op_ == 0x07 and bio is self.bio and bio.tell() - 1 == index_end:
+                (size,) = deserialize_uint64(bio.read(8))
+                (cid,) = deserialize_uint16(bio.read(2))
+                chunks[-1].message_index_offsets[cid] = index_end
+                index_end += 9 + size
+                chunks[-1] = chunks[-1]._replace(
+                    message_index_length=index_end
+                    - chunks[-1].chunk_start_offset
+                    - chunks[-1].chunk_length,
+                )
+                _ = bio.seek(index_end)
             else:
                 skip_sized(bio)
 
@@ -483,28 +801,345 @@ class McapReader:
                 bio = self.bio
                 bio_size = self.data_end
 
+        for idx, chunk in enumerate(chunks):
+            # Message indexes are only usable if they cover all channels of the chunk.
+            if chunk.message_index_offsets.keys() != chunk.channel_count.keys():
+                chunk.message_index_offsets.clear()
+                chunks[idx] = chunk._replace(message_index_length=0)
+
+        if not self.chunks:
+            self.chunks = chunks
+
         self.statistics = Statistics(
             msgcount,
             len(schemas),
             len(channels),
             0,
             0,
-            nchunks,
+            len(chunks),
             start_time,
             end_time,
             cstats,
         )
 
+        if self.summary_cache:
+            self.write_summary_cache(cache_path, cache_key)
+
+    def read_summary_cache(self, path: Path, key: bytes) -> bool:
+        """Read scan results from cache file.
+
+        Args:
+            path: Cache file path.
+            key: Key identifying the file state.
+
+        Returns:
+            True if a valid cache for the file was read.
+
+        """
+        head = SUMMARY_CACHE_MAGIC + key
+        if (data := read_cache(path, head)) is None:
+            return False
+
+        pos = len(head)
+
+        def unpack(fmt: str) -> tuple[int, ...]:
+            nonlocal pos
+            values = unpack_from(fmt, data, pos)
+            pos += struct.calcsize(fmt)
+            return cast('tuple[int, ...]', values)
+
+        def unpack_bytes() -> bytes:
+            nonlocal pos
+            (size,) = unpack('<I')
+            if pos + size > len(data):
+                raise ValueError
+            pos += size
+            return data[pos - size : pos]
+
+        def unpack_string() -> str:
+            return unpack_bytes().decode()
+
+        def unpack_counts() -> dict[int, int]:
+            return dict(
+                cast('list[tuple[int, int]]', [unpack('<HQ') for _ in range(unpack('<I')[0])])
+            )
+
+        try:
+            (data_end,) = unpack('<Q')
+            schemas: dict[int, Schema] = {}
+            for _ in range(unpack('<I')[0]):
+                (sid,) = unpack('<H')
+                schemas[sid] = Schema(sid, unpack_string(), unpack_string(), unpack_string())
+
+            channels: dict[int, Channel] = {}
+            for _ in range(unpack('<I')[0]):
+                (cid,) = unpack('<H')
+                channels[cid] = Channel(
+                    cid,
+                    unpack_string(),
+                    unpack_string(),
+                    unpack_string(),
+                    unpack_bytes(),
+                )
+
+            chunks: list[ChunkInfo] = []
+            for _ in range(unpack('<I')[0]):
+                chunk_start, chunk_end, offset, length = unpack('<QQQQ')
+                offsets = unpack_counts()
+                (index_length,) = unpack('<Q')
+                compression = unpack_string()
+                compressed_size, uncompressed_size = unpack('<QQ')
+                chunks.append(
+                    ChunkInfo(
+                        chunk_start,
+                        chunk_end,
+                        offset,
+                        length,
+                        offsets,
+                        index_length,
+                        compression,
+                        compressed_size,
+                        uncompressed_size,
+                        unpack_counts(),
+                    ),
+                )
+
+            statistics = Statistics(
+                *cast('tuple[int, int, int, int, int, int, int, int]', unpack('<QHIIIIQQ')),
+                unpack_counts(),
+            )
+        except (UnicodeDecodeError, ValueError, struct.error):
+            return False
+
+        if pos != len(data):
+            return False
+
+        self.data_end = data_end
+        self.schemas.update(schemas)
+        self.channels.update(channels)
+        if not self.chunks:
+            self.chunks = chunks
+        self.statistics = statistics
+        return True
+
+    def write_summary_cache(self, path: Path, key: bytes) -> None:
+        """Write scan results to cache file.
+
+        Failing to write the cache is not an error, the file stays readable.
+
+        Args:
+            path: Cache file path.
+            key: Key identifying the file state.
+
+        """
+        assert self.statistics
+
+        bio = BytesIO()
+
+        def pack_counts(counts: dict[int, int]) -> None:
+            write_uint32(bio, len(counts))
+            for item in counts.items():
+                _ = bio.write(struct.pack('<HQ', *item))
+
+        _ = bio.write(SUMMARY_CACHE_MAGIC + key)
+        write_uint64(bio, self.data_end)
+
+        write_uint32(bio, len(self.schemas))
+        for schema in self.schemas.values():
+            write_uint16(bio, schema.id)
+            write_string(bio, schema.name)
+            write_string(bio, schema.encoding)
+            write_string(bio, schema.data)
+
+        write_uint32(bio, len(self.channels))
+        for channel in self.channels.values():
+            write_uint16(bio, channel.id)
+            write_string(bio, channel.schema)
+            write_string(bio, channel.topic)
+            write_string(bio, channel.message_encoding)
+            write_uint32(bio, len(channel.metadata))
+            _ = bio.write(channel.metadata)
+
+        write_uint32(bio, len(self.chunks))
+        for chunk in self.chunks:
+            _ = bio.write(
+                struct.pack(
+                    '<QQQQ',
+                    chunk.message_start_time,
+                    chunk.message_end_time,
+                    chunk.chunk_start_offset,
+                    chunk.chunk_length,
+                ),
+            )
+            pack_counts(chunk.message_index_offsets)
+            write_uint64(bio, chunk.message_index_length)
+            write_string(bio, chunk.compression)
+            write_uint64(bio, chunk.compressed_size)
+            write_uint64(bio, chunk.uncompressed_size)
+            pack_counts(chunk.channel_count)
+
+        _ = bio.write(struct.pack('<QHIIIIQQ', *self.statistics[:8]))
+        pack_counts(self.statistics.channel_message_counts)
+
+        write_cache(path, bio.getbuffer())
+
+    def write_summary(self, path: Path | None = None) -> None:
+        """Write summary section for file.
+
+        Without path the summary is written to the file in place, replacing
+        any existing summary section and truncating incomplete trailing
+        records of recovered files. Missing message indexes of the last chunk
+        are regenerated, those of earlier chunks can not be inserted in place.
+
+        With path the data section is copied to a new file, message indexes
+        are regenerated for all chunks, and the summary is appended to the
+        copy.
+
+        Args:
+            path: Path of copy to write.
+
+        Raises:
+            ReaderError: Summary could not be written.
+
+        """
+        assert self.bio
+        assert self.statistics
+        bio = self.bio
+        dstpath = path or self.path
+
+        try:
+            dst = dstpath.open('xb' if path else 'r+b')
+        except OSError as err:
+            msg = f'Could not write summary to {str(dstpath)!r}: {err.strerror}.'
+            raise ReaderError(msg) from err
+
+        channel_map = {x.id: x for x in self.connections}
+        chunk_map = {x.chunk_start_offset: x for x in self.chunks}
+        chunks: list[ChunkInfo] = []
+        indexes: list[tuple[int, BytesIO]] = []
+        last = 0
+        tail = 0
+
+        def get_chunk(pos: int, size: int) -> ChunkInfo:
+            """Get chunk from chunk index or record header."""
+            if chunk := chunk_map.get(pos):
+                return chunk
+            _ = bio.seek(pos + 9)
+            return read_chunk_info(bio, pos, size)
+
+        def index_chunk(chunk: ChunkInfo, offset: int) -> ChunkInfo:
+            """Write message indexes of chunk at current position of dst."""
+            msgs: dict[int, list[tuple[int, int]]] = defaultdict(list)
+            records = decompress_chunk(chunk, self.read_chunk(chunk))
+            for item in chunk_messages(0, channel_map, 0, MAXSIZE, records):
+                assert item.connection
+                msgs[item.connection.id].append((item.timestamp, item.offset))
+            index_start = dst.tell()
+            offsets: dict[int, int] = {}
+            for cid, entries in msgs.items():
+                offsets[cid] = dst.tell()
+                write_message_index(dst, cid, entries)
+            return chunk._replace(
+                chunk_start_offset=offset,
+                message_index_offsets=offsets,
+                message_index_length=dst.tell() - index_start,
+                channel_count={cid: len(x) for cid, x in msgs.items()},
+            )
+
+        with dst:
+            try:
+                if path:
+                    _ = bio.seek(0)
+                    _ = dst.write(bio.read(self.data_start))
+
+                pos = self.data_start
+                while pos < self.data_end:
+                    _ = bio.seek(pos)
+                    op_ = ord(bio.read(1))
+                    (size,) = deserialize_uint64(bio.read(8))
+                    if op_ == 0x07 and path:
+                        pos += 9 + size
+                        continue
+
+                    offset = dst.tell() if path else pos
+                    if op_ == 0x09:
+                        log_time, create_time = deserialize_qq(bio.read(16))
+                        name = read_string(bio)
+                        media_type = read_string(bio)
+                        rec = BytesIO()
+                        write_uint64(rec, offset)
+                        write_uint64(rec, 9 + size)
+                        write_uint64(rec, log_time)
+                        write_uint64(rec, create_time)
+                        write_uint64(rec, deserialize_uint64(bio.read(8))[0])
+                        write_string(rec, name)
+                        write_string(rec, media_type)
+                        indexes.append((0x0A, rec))
+                    elif op_ == 0x0C:
+                        rec = BytesIO()
+                        write_uint64(rec, offset)
+                        write_uint64(rec, 9 + size)
+                        write_string(rec, read_string(bio))
+                        indexes.append((0x0D, rec))
+
+                    if op_ == 0x06 and path:
+                        _ = bio.seek(pos)
+                        _ = dst.write(bio.read(9 + size))
+                        chunks.append(index_chunk(get_chunk(pos, size), offset))
+                    elif op_ == 0x06:
+                        chunks.append(get_chunk(pos, size))
+                        tail = 0 if chunks[-1].message_index_offsets else pos + 9 + size
+                    elif path:
+                        _ = bio.seek(pos)
+                        _ = dst.write(bio.read(9 + size))
+
+                    if op_ != 0x07:
+                        last = op_
+                        if op_ != 0x06:
+                            tail = 0
+                    pos += 9 + size
+
+                if not path:
+                    _ = dst.seek(tail or self.data_end)
+                    _ = dst.truncate()
+                    if tail:
+                        chunks[-1] = index_chunk(chunks[-1], chunks[-1].chunk_start_offset)
+
+                if last != 0x0F:
+                    rec = BytesIO()
+                    write_uint32(rec, 0)
+                    write_record(dst, 0x0F, rec)
+
+                write_summary(
+                    dst,
+                    schemas=self.schemas.values(),
+                    channels=self.channels.values(),
+                    chunks=chunks,
+                    indexes=indexes,
+                    statistics=self.statistics._replace(
+                        schema_count=len(self.schemas),
+                        channel_count=len(self.channels),
+                        attachement_count=sum(1 for x in indexes if x[0] == 0x0A),
+                        metadata_count=sum(1 for x in indexes if x[0] == 0x0D),
+                        chunk_count=len(chunks),
+                    ),
+                )
+            except OSError as err:
+                msg = f'Could not write summary to {str(dstpath)!r}: {err.strerror}.'
+                raise ReaderError(msg) from err
+            except KeyError as err:
+                msg = f'Could not write summary to {str(dstpath)!r}, unknown reference {err}.'
+                raise ReaderError(msg) from err
+
     def messages_scan(
         self,
         connections: Iterable[Connection],
         start: int | None = None,
         stop: int | None = None,
-    ) -> Generator[tuple[Connection, int, bytes], None, None]:
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
         """Read messages by scanning whole bag."""
         assert self.bio
         bio = self.bio
-        bio_size = self.data_end
         _ = bio.seek(self.data_start)
 
         cmap = {x.id: x for x in connections}
@@ -514,45 +1149,141 @@ class McapReader:
         if stop is None:
             stop = MAXSIZE
 
-        while bio.tell() < bio_size:
+        while bio.tell() < self.data_end:
             op_ = ord(bio.read(1))
 
             if op_ == 0x05:
                 size, channel_id, _, timestamp, _ = deserialize_qhiqq(bio.read(30))
-                data = bio.read(size - 22)
+                data = self.read_bytes(bio.tell(), size - 22)
                 if start <= timestamp < stop and channel_id in cmap:
                     yield cmap[channel_id], timestamp, data
             elif op_ == 0x06:
                 (size,) = deserialize_uint64(bio.read(8))
                 start_time, end_time, uncompressed_size, _ = deserialize_qqqi(bio.read(28))
-                if start < end_time and start_time < stop:
+                if start <= end_time and start_time < stop:
                     compression = read_string(bio)
                     (compressed_size,) = deserialize_uint64(bio.read(8))
-                    bio = BytesIO(
-                        DECOMPRESSORS[compression](bio.read(compressed_size), uncompressed_size),
-                    )
-                    bio_size = uncompressed_size
+                    raw = self.read_bytes(bio.tell(), compressed_size)
+                    records = DECOMPRESSORS[compression](raw, uncompressed_size)
+                    if isinstance(raw, memoryview):
+                        records = memoryview(records)
+                    for msg in chunk_messages(0, cmap, start, stop, records):
+                        assert msg.connection
+                        assert msg.data is not None
+                        yield msg.connection, msg.timestamp, msg.data
                 else:
                     _ = bio.seek(size - 28, 1)
             else:
                 skip_sized(bio)
 
-            if bio.tell() == bio_size and bio != self.bio:
-                bio = self.bio
-                bio_size = self.data_end
+    def read_bytes(self, pos: int, size: int) -> bytes | memoryview:
+        """Read bytes at position and seek past them.
+
+        Args:
+            pos: Position in file.
+            size: Number of bytes.
+
+        Returns:
+            Bytes read, a memoryview if file is memory-mapped.
+
+        """
+        assert self.bio
+        _ = self.bio.seek(pos)
+        if self.view:
+            _ = self.bio.seek(size, 1)
+            return self.view[pos : pos + size]
+        return self.bio.read(size)
+
+    def read_chunk(self, chunk: ChunkInfo) -> bytes | memoryview:
+        """Read compressed records of chunk.
+
+        Args:
+            chunk: Chunk information.
+
+        Returns:
+            Compressed records, a memoryview if file is memory-mapped.
+
+        """
+        return self.read_bytes(
+            chunk.chunk_start_offset + 9 + 40 + len(chunk.compression),
+            chunk.compressed_size,
+        )
+
+    def read_chunk_messages(
+        self,
+        chunk: ChunkInfo,
+        channel_map: dict[int, Connection],
+        start: int | None,
+        stop: int | None,
+        prefetcher: ChunkPrefetcher,
+    ) -> Generator[Msg, None, None]:
+        """Yield messages from chunk.
+
+        If only some channels of the chunk are requested, the message index
+        is used to locate their records. Records of uncompressed chunks are
+        then read directly from file, compressed chunks are decompressed but
+        not walked.
+
+        Args:
+            chunk: Chunk information.
+            channel_map: Requested channels.
+            start: Yield only messages at or after this timestamp (ns).
+            stop: Yield only messages before this timestamp (ns).
+            prefetcher: Source of decompressed chunk data.
+
+        Yields:
+            Messages in file order.
+
+        """
+        assert self.bio
+        if start is None:
+            start = chunk.message_start_time
+        if stop is None:
+            stop = chunk.message_end_time + 1
+
+        if (channel_ids := get_indexed_channels(chunk, channel_map)) is None:
+            yield from chunk_messages(
+                chunk.chunk_start_offset,
+                channel_map,
+                start,
+                stop,
+                prefetcher.get(chunk),
+            )
+            return
+
+        entries = read_message_index(chunk, channel_ids, start, stop, self.bio)
+        if not chunk.compression:
+            records_start = chunk.chunk_start_offset + 9 + 40
+            for offset, log_time, cid in entries:
+                _ = self.bio.seek(records_start + offset + 1)
+                (size,) = deserialize_uint64(self.bio.read(8))
+                yield Msg(
+                    log_time,
+                    chunk.chunk_start_offset + offset,
+                    channel_map[cid],
+                    self.read_bytes(records_start + offset + 31, size - 22),
+                )
+        elif entries:
+            yield from indexed_messages(chunk, channel_map, entries, prefetcher.get(chunk))
+        else:
+            prefetcher.skip(chunk)
 
     def messages(
         self,
         connections: Iterable[Connection],
         start: int | None = None,
         stop: int | None = None,
-    ) -> Generator[tuple[Connection, int, bytes], None, None]:
+        *,
+        ordered: bool = True,
+    ) -> Generator[tuple[Connection, int, bytes | memoryview], None, None]:
         """Read messages from bag.
 
         Args:
             connections: Iterable with connections to filter for.
             start: Yield only messages at or after this timestamp (ns).
             stop: Yield only messages before this timestamp (ns).
+            ordered: Yield messages in timestamp order, otherwise in file
+                order, which avoids sorting and merging chunks.
 
         Yields:
             tuples of connection, timestamp (ns), and rawdata.
@@ -579,25 +1310,48 @@ class McapReader:
             )
         }
 
-        chunks = [
-            msgsrc(
-                x,
-                channel_map,
-                start or x.message_start_time,
-                stop or x.message_end_time + 1,
-                self.bio,
-            )
+        selected = [
+            x
             for x in self.chunks
-            if (start is None or start < x.message_end_time)
+            if (start is None or start <= x.message_end_time)
             and (stop is None or x.message_start_time < stop)
-            and (any(x.channel_count.get(cid, 0) for cid in channel_map))
+            # Channels of chunks without message index are unknown.
+            and (not x.channel_count or any(x.channel_count.get(cid, 0) for cid in channel_map))
         ]
 
+        # Chunks read directly through the message index need no prefetching.
+        prefetched = [
+            x for x in selected if x.compression or get_indexed_channels(x, channel_map) is None
+        ]
+
+        if not ordered:
+            prefetched.sort(key=lambda x: x.chunk_start_offset)
+            prefetcher = ChunkPrefetcher(
+                prefetched, self.read_chunk, self.executor, self.prefetch_budget
+            )
+            for chunk in sorted(selected, key=lambda x: x.chunk_start_offset):
+                for msg in self.read_chunk_messages(chunk, channel_map, start, stop, prefetcher):
+                    assert msg.connection
+                    assert msg.data is not None
+                    yield msg.connection, msg.timestamp, msg.data
+            return
+
+        # Merging pulls chunks in order of their first message time.
+        prefetched.sort(key=lambda x: x.message_start_time)
+        prefetcher = ChunkPrefetcher(
+            prefetched, self.read_chunk, self.executor, self.prefetch_budget
+        )
+
+        def read(chunk: ChunkInfo) -> Iterable[Msg]:
+            return self.read_chunk_messages(chunk, channel_map, start, stop, prefetcher)
+
+        chunks = [msgsrc(x, read) for x in selected]
+
         for timestamp, offset, connection, data in heapq.merge(*chunks):
             if not offset:
                 continue
             assert connection
-            assert data
+            assert data is not None
             yield connection, timestamp, data
 
 
@@ -637,7 +1391,7 @@ def write_channel(bio: BinaryIO, channel: Channel, schemas: Iterable[Schema]) ->
     """Write schema."""
     rec = BytesIO()
     write_uint16(rec, channel.id)
-    write_uint16(rec, next(x.id for x in schemas if x.name == channel.schema))
+    write_uint16(rec, next((x.id for x in schemas if x.name == channel.schema), 0))
     write_string(rec, channel.topic)
     write_string(rec, channel.message_encoding)
     write_uint32(rec, len(channel.metadata))
@@ -652,6 +1406,122 @@ def write_record(bio: BinaryIO, op_: int, record: BytesIO) -> None:
     bio.write(record.getbuffer())
 
 
+def write_message_index(bio: BinaryIO, cid: int, msgs: list[tuple[int, int]]) -> None:
+    """Write message index."""
+    rec = BytesIO()
+    write_uint16(rec, cid)
+    write_uint32(rec, len(msgs) * 16)
+    rec.write(struct.pack(f'<{len(msgs) * 2}Q', *chain.from_iterable(msgs)))
+    write_record(bio, 0x07, rec)
+
+
+def write_chunk_index(bio: BinaryIO, chunk: ChunkInfo) -> None:
+    """Write chunk index."""
+    rec = BytesIO()
+    write_uint64(rec, chunk.message_start_time)
+    write_uint64(rec, chunk.message_end_time)
+    write_uint64(rec, chunk.chunk_start_offset)
+    write_uint64(rec, chunk.chunk_length)
+    write_uint32(rec, len(chunk.message_index_offsets) * 10)
+    for cid, offset in chunk.message_index_offsets.items():
+        write_uint16(rec, cid)
+        write_uint64(rec, offset)
+    write_uint64(rec, chunk.message_index_length)
+    write_string(rec, chunk.compression)
+    write_uint64(rec, chunk.compressed_size)
+    write_uint64(rec, chunk.uncompressed_size)
+    write_record(bio, 0x08, rec)
+
+
+def write_statistics(bio: BinaryIO, statistics: Statistics) -> None:
+    """Write statistics."""
+    rec = BytesIO()
+    write_uint64(rec, statistics.message_count)
+    write_uint16(rec, statistics.schema_count)
+    write_uint32(rec, statistics.channel_count)
+    write_uint32(rec, statistics.attachement_count)
+    write_uint32(rec, statistics.metadata_count)
+    write_uint32(rec, statistics.chunk_count)
+    write_uint64(rec, statistics.start_time)
+    write_uint64(rec, statistics.end_time)
+    write_uint32(rec, len(statistics.channel_message_counts) * 10)
+    for cid, count in sorted(statistics.channel_message_counts.items()):
+        write_uint16(rec, cid)
+        write_uint64(rec, count)
+    write_record(bio, 0x0B, rec)
+
+
+def write_summary(
+    bio: BinaryIO,
+    *,
+    schemas: Iterable[Schema],
+    channels: Iterable[Channel],
+    chunks: Iterable[ChunkInfo],
+    indexes: Iterable[tuple[int, BytesIO]],
+    statistics: Statistics,
+) -> None:
+    """Write summary section, summary offsets, and footer.
+
+    Args:
+        bio: File handle positioned at end of data section.
+        schemas: Schemas.
+        channels: Channels.
+        chunks: Chunk indexes.
+        indexes: Attachment and metadata index records by opcode.
+        statistics: Statistics.
+
+    """
+    schemas = list(schemas)
+    summary_start = bio.tell()
+    groups: list[tuple[int, int]] = []
+
+    def add_group(opcode: int, start: int) -> None:
+        if bio.tell() != start:
+            groups.append((opcode, start))
+
+    start = bio.tell()
+    for schema in schemas:
+        write_schema(bio, schema)
+    add_group(0x03, start)
+
+    start = bio.tell()
+    for channel in channels:
+        write_channel(bio, channel, schemas)
+    add_group(0x04, start)
+
+    start = bio.tell()
+    for chunk in chunks:
+        write_chunk_index(bio, chunk)
+    add_group(0x08, start)
+
+    records = list(indexes)
+    for opcode in (0x0A, 0x0D):
+        start = bio.tell()
+        for _, rec in (x for x in records if x[0] == opcode):
+            write_record(bio, opcode, rec)
+        add_group(opcode, start)
+
+    start = bio.tell()
+    write_statistics(bio, statistics)
+    add_group(0x0B, start)
+
+    summary_offset_start = bio.tell()
+    ends = [*[x[1] for x in groups[1:]], summary_offset_start]
+    for (opcode, start), end in zip(groups, ends, strict=True):
+        rec = BytesIO()
+        rec.write(opcode.to_bytes(1, byteorder='little'))
+        write_uint64(rec, start)
+        write_uint64(rec, end - start)
+        write_record(bio, 0x0E, rec)
+
+    rec = BytesIO()
+    write_uint64(rec, summary_start)
+    write_uint64(rec, summary_offset_start)
+    write_uint32(rec, 0)
+    write_record(bio, 0x02, rec)
+    _ = bio.write(b'\x89MCAP\x30\r\n')
+
+
 @dataclass
 class PendingChunk:
     """Chunk."""
@@ -662,11 +1532,48 @@ class PendingChunk:
     msgs: dict[int, list[tuple[int, int]]]
 
 
+COMPRESSORS: dict[str, Callable[[bytes, int | None], bytes]] = {
+    '': lambda x, _: x,
+    'lz4': lambda x, level: lz4_compress(x, compression_level=level or 0),
+    # Compressor instances must not be shared between threads.
+    'zstd': lambda x, level: zstandard.ZstdCompressor(
+        level=3 if level is None else level,
+    ).compress(x),
+}
+
+
 class McapWriter:
     """Mcap Storage Writer."""
 
-    def __init__(self, path: Path, compression: CompressionMode) -> None:
-        """Initialize sqlite3 storage."""
+    def __init__(
+        self,
+        path: Path,
+        compression: CompressionMode,
+        *,
+        chunk_size: int = 1 << 20,
+        compression_format: str = 'zstd',
+        compression_level: int | None = None,
+        workers: int = 0,
+    ) -> None:
+        """Initialize MCAP storage.
+
+        Args:
+            path: Bag directory.
+            compression: Compression mode.
+            chunk_size: Uncompressed size in bytes after which a chunk is closed.
+            compression_format: Chunk compression format, zstd, lz4, or none.
+            compression_level: Chunk compression level.
+            workers: Number of threads compressing chunks in the background.
+
+        Raises:
+            WriterError: Unknown compression format.
+
+        """
+        fmt = '' if compression_format == 'none' else compression_format
+        if fmt not in COMPRESSORS:
+            msg = f'Unknown compression format {compression_format!r}.'
+            raise WriterError(msg)
+
         self.path = path / f'{path.name}.mcap'
         self.bio = self.path.open('xb')
 
@@ -678,16 +1585,15 @@ class McapWriter:
 
         self.schemas: list[Schema] = []
         self.channels: list[Channel] = []
-        self.chunks: list[BytesIO] = []
+        self.chunks: list[ChunkInfo] = []
         self.chunk = PendingChunk(2**63 - 1, 0, BytesIO(), defaultdict(list))
+        self.chunk_size = chunk_size
 
-        self.compressor: Callable[[bytes], bytes]
-        if compression == CompressionMode.STORAGE:
-            self.compression = 'zstd'
-            self.compressor = zstandard.ZstdCompressor().compress
-        else:
-            self.compression = ''
-            self.compressor = lambda x: x
+        self.compression = fmt if compression == CompressionMode.STORAGE else ''
+        self.compression_level = compression_level
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(workers) if workers > 0 else None
+        self.pending: deque[tuple[PendingChunk, Future[bytes]]] = deque()
 
         self.message_start_time = 2**63 - 1
         self.message_end_time = 0
@@ -735,49 +1641,81 @@ class McapWriter:
         write_channel(self.chunk.bio, self.channels[-1], self.schemas)
 
     def close_chunk(self) -> None:
-        """Close pending chunk."""
-        rec = BytesIO()
-        write_uint64(rec, self.chunk.message_start_time)
-        write_uint64(rec, self.chunk.message_end_time)
-        write_uint64(rec, self.chunk.bio.tell())
-        write_uint32(rec, 0)
+        """Close pending chunk.
 
-        compressed = self.compressor(self.chunk.bio.getvalue())
-        write_string(rec, self.compression)
-        write_uint64(rec, len(compressed))
-        rec.write(compressed)
+        With background compression the chunk is queued for compression and
+        written once all preceding chunks are written.
 
-        chunk_start = self.bio.tell()
-        write_record(self.bio, 0x06, rec)
-        chunk_end = self.bio.tell()
+        """
+        chunk = self.chunk
+        self.chunk = PendingChunk(2**63 - 1, 0, BytesIO(), defaultdict(list))
+        self.message_start_time = min(chunk.message_start_time, self.message_start_time)
+        self.message_end_time = max(chunk.message_end_time, self.message_end_time)
+
+        raw = chunk.bio.getvalue()
+        compress = COMPRESSORS[self.compression]
+        if self.executor:
+            self.pending.append(
+                (chunk, self.executor.submit(compress, raw, self.compression_level)),
+            )
+            self.commit_pending(2 * self.workers)
+        else:
+            self.commit_chunk(chunk, compress(raw, self.compression_level))
 
-        offsets: list[tuple[int, int]] = []
-        for cid, msgs in self.chunk.msgs.items():
-            offsets.append((cid, self.bio.tell()))
-            rec = BytesIO()
-            write_uint16(rec, cid)
-            write_uint32(rec, len(msgs) * 16)
-            for ts, offset in msgs:
-                write_uint64(rec, ts)
-                write_uint64(rec, offset)
-            write_record(self.bio, 0x07, rec)
+    def commit_pending(self, limit: int = 0) -> None:
+        """Write oldest pending chunks until at most limit are pending.
+
+        Args:
+            limit: Number of chunks allowed to stay pending.
+
+        """
+        while len(self.pending) > limit:
+            chunk, future = self.pending.popleft()
+            self.commit_chunk(chunk, future.result())
 
+    def commit_chunk(self, chunk: PendingChunk, compressed: bytes) -> None:
+        """Write compressed chunk and its message indexes to file.
+
+        Args:
+            chunk: Chunk.
+            compressed: Compressed chunk records.
+
+        """
+        size = chunk.bio.tell()
         rec = BytesIO()
-        write_uint64(rec, self.chunk.message_start_time)
-        write_uint64(rec, self.chunk.message_end_time)
-        write_uint64(rec, chunk_start)
-        write_uint64(rec, chunk_end - chunk_start)
-        write_uint32(rec, len(offsets) * 10)
-        for cid, offset in offsets:
-            write_uint16(rec, cid)
-            write_uint64(rec, offset)
-        write_uint64(rec, self.bio.tell() - chunk_end)
+        write_uint64(rec, chunk.message_start_time)
+        write_uint64(rec, chunk.message_end_time)
+        write_uint64(rec, size)
+        write_uint32(rec, 0)
         write_string(rec, self.compression)
         write_uint64(rec, len(compressed))
-        write_uint64(rec, self.chunk.bio.tell())
-        self.chunks.append(rec)
 
-        self.chunk = PendingChunk(2**63 - 1, 0, BytesIO(), defaultdict(list))
+        chunk_start = self.bio.tell()
+        _ = self.bio.write(b'\x06')
+        write_uint64(self.bio, rec.tell() + len(compressed))
+        _ = self.bio.write(rec.getbuffer())
+        _ = self.bio.write(compressed)
+        chunk_end = self.bio.tell()
+
+        offsets: dict[int, int] = {}
+        for cid, msgs in chunk.msgs.items():
+            offsets[cid] = self.bio.tell()
+            write_message_index(self.bio, cid, msgs)
+
+        self.chunks.append(
+            ChunkInfo(
+                chunk.message_start_time,
+                chunk.message_end_time,
+                chunk_start,
+                chunk_end - chunk_start,
+                offsets,
+                self.bio.tell() - chunk_end,
+                self.compression,
+                len(compressed),
+                size,
+                {cid: len(msgs) for cid, msgs in chunk.msgs.items()},
+            ),
+        )
 
     def write(self, connection: Connection, timestamp: int, data: bytes | memoryview) -> None:
         """Write message to rosbag2.
@@ -788,23 +1726,36 @@ class McapWriter:
             data: Serialized message data.
 
         """
-        self.message_start_time = min(timestamp, self.message_start_time)
-        self.message_end_time = max(timestamp, self.message_end_time)
-        self.channel_stats[connection.id] += 1
-        self.chunk.message_start_time = min(timestamp, self.chunk.message_start_time)
-        self.chunk.message_end_time = max(timestamp, self.chunk.message_end_time)
-        self.chunk.msgs[connection.id].append((timestamp, self.chunk.bio.tell()))
+        self.write_many(((connection, timestamp, data),))
 
-        rec = BytesIO()
-        write_uint16(rec, connection.id)
-        write_uint32(rec, 0)
-        write_uint64(rec, timestamp)
-        write_uint64(rec, timestamp)
-        rec.write(data)
-        write_record(self.chunk.bio, 0x05, rec)
+    def write_many(self, messages: Iterable[tuple[Connection, int, bytes | memoryview]]) -> None:
+        """Write messages to rosbag2.
 
-        if self.chunk.bio.tell() > 2**20:
-            self.close_chunk()
+        Message record headers are packed straight into the open chunk.
+
+        Args:
+            messages: Iterable of connection, timestamp (ns), and serialized data.
+
+        """
+        channel_stats = self.channel_stats
+        chunk = self.chunk
+        bio = chunk.bio
+        for connection, timestamp, data in messages:
+            cid = connection.id
+            channel_stats[cid] += 1
+            chunk.message_start_time = min(timestamp, chunk.message_start_time)
+            chunk.message_end_time = max(timestamp, chunk.message_end_time)
+            chunk.msgs[cid].append((timestamp, bio.tell()))
+
+            _ = bio.write(
+                serialize_message_header(0x05, 22 + len(data), cid, 0, timestamp, timestamp),
+            )
+            _ = bio.write(data)
+
+            if bio.tell() > self.chunk_size:
+                self.close_chunk()
+                chunk = self.chunk
+                bio = chunk.bio
 
     def close(self, version: int, metadata: str) -> None:
         """Close rosbag2 after writing.
@@ -815,6 +1766,10 @@ class McapWriter:
         _ = version
         if self.chunk.bio.tell():
             self.close_chunk()
+        self.commit_pending()
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
 
         metadata_start = self.bio.tell()
         rec = BytesIO()
@@ -831,81 +1786,28 @@ class McapWriter:
         write_uint32(rec, 0)
         write_record(self.bio, 0x0F, rec)
 
-        schema_start = self.bio.tell()
-        for schema in self.schemas:
-            write_schema(self.bio, schema)
-
-        channel_start = self.bio.tell()
-        for channel in self.channels:
-            write_channel(self.bio, channel, self.schemas)
-
-        chunk_start = self.bio.tell()
-        for chunk in self.chunks:
-            write_record(self.bio, 0x08, chunk)
-
-        metadata_index_start = self.bio.tell()
         rec = BytesIO()
         write_uint64(rec, metadata_start)
         write_uint64(rec, metadata_end - metadata_start)
         write_string(rec, 'rosbag2')
-        write_record(self.bio, 0x0D, rec)
-
-        statistics_offset_start = self.bio.tell()
-        rec = BytesIO()
-        write_uint64(rec, sum(self.channel_stats.values()))
-        write_uint16(rec, len(self.schemas))
-        write_uint32(rec, len(self.channels))
-        write_uint32(rec, 0)  # attachments
-        write_uint32(rec, 1)  # metadata
-        write_uint32(rec, len(self.chunks))
-        write_uint64(rec, self.message_start_time)
-        write_uint64(rec, self.message_end_time)
-        write_uint32(rec, len(self.channel_stats) * 10)
-        for cid, count in sorted(self.channel_stats.items()):
-            write_uint16(rec, cid)
-            write_uint64(rec, count)
-        write_record(self.bio, 0x0B, rec)
-
-        summary_offset_start = self.bio.tell()
-
-        if schema_start != channel_start:
-            rec = BytesIO()
-            rec.write(b'\x03')
-            write_uint64(rec, schema_start)
-            write_uint64(rec, channel_start - schema_start)
-            write_record(self.bio, 0x0E, rec)
-
-        if channel_start != chunk_start:
-            rec = BytesIO()
-            rec.write(b'\x04')
-            write_uint64(rec, channel_start)
-            write_uint64(rec, chunk_start - channel_start)
-            write_record(self.bio, 0x0E, rec)
-
-        if chunk_start != metadata_index_start:
-            rec = BytesIO()
-            rec.write(b'\x08')
-            write_uint64(rec, chunk_start)
-            write_uint64(rec, metadata_index_start - chunk_start)
-            write_record(self.bio, 0x0E, rec)
 
-        rec = BytesIO()
-        rec.write(b'\x0d')
-        write_uint64(rec, metadata_index_start)
-        write_uint64(rec, statistics_offset_start - metadata_index_start)
-        write_record(self.bio, 0x0E, rec)
-
-        rec = BytesIO()
-        rec.write(b'\x0b')
-        write_uint64(rec, statistics_offset_start)
-        write_uint64(rec, summary_offset_start - statistics_offset_start)
-        write_record(self.bio, 0x0E, rec)
-
-        rec = BytesIO()
-        write_uint64(rec, schema_start)
-        write_uint64(rec, summary_offset_start)
-        write_uint32(rec, 0)
-        write_record(self.bio, 0x02, rec)
-        _ = self.bio.write(b'\x89MCAP\x30\r\n')
+        write_summary(
+            self.bio,
+            schemas=self.schemas,
+            channels=self.channels,
+            chunks=self.chunks,
+            indexes=[(0x0D, rec)],
+            statistics=Statistics(
+                sum(self.channel_stats.values()),
+                len(self.schemas),
+                len(self.channels),
+                0,
+                1,
+                len(self.chunks),
+                self.message_start_time,
+                self.message_end_time,
+                self.channel_stats,
+            ),
+        )
 
         self.bio.close()
@@ -4,8 +4,11 @@
 
 from __future__ import annotations
 
+import heapq
 import sqlite3
 import sys
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from typing import TYPE_CHECKING, cast
 
@@ -106,18 +109,67 @@ def make_vfs(rpath: RPath) -> apsw.VFS:  # pragma: no cover
     return VFS()
 
 
+@lru_cache(maxsize=4096)
+def get_msgdef_digest(name: str, msgdef: str) -> str:
+    """Compute RIHS01 digest of message definition.
+
+    Results are memoized by definition text, as the split files of a bag
+    and subsequent opens repeat the same definitions.
+
+    Args:
+        name: Message type name.
+        msgdef: Message definition in msg format.
+
+    Returns:
+        RIHS01 digest.
+
+    """
+    store = Typestore()
+    store.register(get_types_from_msg(msgdef, name))
+    return store.hash_rihs01(name)
+
+
 class Sqlite3Reader:
     """Sqlite3 storage reader."""
 
-    def __init__(self, path: RPath) -> None:
+    def __init__(
+        self,
+        path: RPath,
+        *,
+        lazy: bool = False,
+        verify: bool = True,
+        create_index: bool = False,
+    ) -> None:
         """Set up storage reader.
 
+        Counting messages per topic requires a full scan of the messages
+        table. With ``lazy`` opening skips the count, connections and
+        metadata report zero messages until ``count_messages()`` is called.
+        This suits callers that know the counts already, like the rosbag2
+        reader taking them from metadata.yaml.
+
+        Message definitions stored in the database are verified against
+        their type description hashes on open, results are memoized by
+        definition text. With ``verify`` disabled the check is skipped.
+
+        Reading a subset of topics is fastest with an index on ``(topic_id,
+        timestamp)``, which rosbag2 does not create. If present it is used
+        automatically, with ``create_index`` it is added to the database on
+        open, which requires write access to a local file.
+
         Args:
             path: Paths of storage files.
+            lazy: Defer counting of messages.
+            verify: Verify message definitions against their hashes.
+            create_index: Create topic index if missing.
 
         """
         self.path = path
+        self.lazy = lazy
+        self.verify = verify
+        self.create_index = create_index
         self.dbconn: apsw.Connection | None = None
+        self.topic_index: str | None = None
         self.schema = 0
         self.msgtypes: list[dict[str, str]] = []
         self.connections: list[Connection] = []
@@ -131,6 +183,9 @@ class Sqlite3Reader:
             vfs = 'rpathvfs'
             _vfs = make_vfs(self.path)
 
+        if self.create_index:
+            self.add_topic_index()
+
         conn = apsw.Connection(
             f'file:{self.path}?immutable=1',
             flags=apsw.SQLITE_OPEN_READONLY | apsw.SQLITE_OPEN_URI,
@@ -181,16 +236,13 @@ class Sqlite3Reader:
                     ),
                 )
             ]
-            for typ in msgtypes:
-                assert typ['encoding'] == 'ros2msg'
-                types = get_types_from_msg(typ['msgdef'], typ['name'])
-
-                store = Typestore()
-                store.register(types)
-
-                assert typ['digest'] == store.hash_rihs01(
-                    typ['name'],
-                ), f'Failed to parse {typ["name"]}'
+            if self.verify:
+                for typ in msgtypes:
+                    assert typ['encoding'] == 'ros2msg'
+                    assert typ['digest'] == get_msgdef_digest(
+                        typ['name'],
+                        typ['msgdef'],
+                    ), f'Failed to parse {typ["name"]}'
         else:
             msgtypes = []
 
@@ -205,120 +257,141 @@ class Sqlite3Reader:
             return MessageDefinition(MessageDefinitionFormat.NONE, '')
 
         if schema >= 4:
-            connections = [
-                Connection(
-                    cid,
-                    topic,
-                    msgtype,
-                    get_msgdef(msgtype),
-                    digest,
-                    msgcount,
-                    ConnectionExtRosbag2(serialization_format, parse_qos(offered_qos_profiles)),
-                    self,
-                )
-                for (
-                    cid,
-                    topic,
-                    msgtype,
-                    msgcount,
-                    serialization_format,
-                    offered_qos_profiles,
-                    digest,
-                ) in cast(
-                    'Iterable[tuple[int, str, str, int, str, str, str]]',
-                    cur.execute(
-                        (
-                            'SELECT topics.id, name, type, count(messages.id), '
-                            'serialization_format, offered_qos_profiles, type_description_hash '
-                            'FROM topics LEFT JOIN messages ON topics.id == messages.topic_id '
-                            'GROUP BY topics.id ORDER BY topics.id'
-                        ),
-                    ),
-                )
-            ]
+            query = (
+                'SELECT id, name, type, serialization_format, offered_qos_profiles, '
+                'type_description_hash FROM topics ORDER BY id'
+            )
         elif schema >= 2:
-            connections = [
-                Connection(
-                    cid,
-                    topic,
-                    msgtype,
-                    get_msgdef(msgtype),
-                    '',
-                    msgcount,
-                    ConnectionExtRosbag2(serialization_format, parse_qos(offered_qos_profiles)),
-                    self,
-                )
-                for (
-                    cid,
-                    topic,
-                    msgtype,
-                    msgcount,
-                    serialization_format,
-                    offered_qos_profiles,
-                ) in cast(
-                    'Iterable[tuple[int, str, str, int, str, str]]',
-                    cur.execute(
-                        (
-                            'SELECT topics.id, name, type, count(*), '
-                            'serialization_format, offered_qos_profiles '
-                            'FROM topics JOIN messages ON topics.id == messages.topic_id '
-                            'GROUP BY topics.id ORDER BY topics.id'
-                        ),
-                    ),
-                )
-            ]
+            query = (
+                "SELECT id, name, type, serialization_format, offered_qos_profiles, '' "
+                'FROM topics ORDER BY id'
+            )
         else:
-            connections = [
-                Connection(
-                    cid,
-                    topic,
-                    msgtype,
-                    get_msgdef(msgtype),
-                    '',
-                    msgcount,
-                    ConnectionExtRosbag2(serialization_format, []),
-                    self,
-                )
-                for (
-                    cid,
-                    topic,
-                    msgtype,
-                    msgcount,
+            query = "SELECT id, name, type, serialization_format, NULL, '' FROM topics ORDER BY id"
+
+        connections = [
+            Connection(
+                cid,
+                topic,
+                msgtype,
+                get_msgdef(msgtype),
+                digest,
+                0,
+                ConnectionExtRosbag2(
                     serialization_format,
-                ) in cast(
-                    'Iterable[tuple[int, str, str, int, str]]',
-                    cur.execute(
-                        (
-                            'SELECT topics.id, name, type, count(*), '
-                            'serialization_format '
-                            'FROM topics JOIN messages ON topics.id == messages.topic_id '
-                            'GROUP BY topics.id ORDER BY topics.id'
-                        ),
-                    ),
+                    parse_qos(offered_qos_profiles) if offered_qos_profiles is not None else [],
+                ),
+                self,
+            )
+            for (
+                cid,
+                topic,
+                msgtype,
+                serialization_format,
+                offered_qos_profiles,
+                digest,
+            ) in cast(
+                'Iterable[tuple[int, str, str, str, str | None, str]]',
+                cur.execute(query),
+            )
+        ]
+
+        for (name,) in cast(
+            'Iterable[tuple[str]]',
+            cur.execute("SELECT name FROM pragma_index_list('messages')"),
+        ):
+            columns = [
+                x
+                for (x,) in cast(
+                    'Iterable[tuple[str]]',
+                    conn.execute('SELECT name FROM pragma_index_info(?) ORDER BY seqno', (name,)),
                 )
             ]
+            if columns[:2] == ['topic_id', 'timestamp']:
+                self.topic_index = name
+                break
+        else:
+            self.topic_index = None
 
         self.schema = schema
         self.msgtypes = msgtypes
         self.connections = connections
 
-        ((start_time, end_time, msgcount),) = cast(
-            'Iterable[tuple[int, int, int]]',
-            cur.execute(
-                'SELECT MIN(timestamp), MAX(timestamp) + 1, COUNT(*) FROM messages',
-            ),
+        # Separate aggregates are answered from the timestamp index.
+        ((start_time,),) = cast(
+            'Iterable[tuple[int | None]]',
+            cur.execute('SELECT MIN(timestamp) FROM messages'),
+        )
+        ((end_time,),) = cast(
+            'Iterable[tuple[int | None]]',
+            cur.execute('SELECT MAX(timestamp) + 1 FROM messages'),
         )
         self.metadata = ReaderMetadata(
-            end_time - start_time if start_time is not None else 0,
+            end_time - start_time if start_time is not None and end_time is not None else 0,
             start_time if start_time is not None else 2**63 - 1,
             end_time if end_time is not None else 0,
-            msgcount,
+            0,
             None,
             None,
             None,
             None,
         )
 
+        if not self.lazy:
+            counts = self.count_messages()
+            if schema < 4:
+                # Older schemas list only topics with messages.
+                self.connections = [x for x in self.connections if counts.get(x.id)]
+
+    def add_topic_index(self) -> None:
+        """Add index on topic and timestamp to database.
+
+        Raises:
+            ReaderError: Index could not be created.
+
+        """
+        if not isinstance(self.path, Path):
+            msg = f'Cannot create index in non-local database {self.path}.'
+            raise ReaderError(msg)
+
+        try:
+            conn = apsw.Connection(str(self.path), flags=apsw.SQLITE_OPEN_READWRITE)
+        except apsw.Error as err:
+            msg = f'Cannot open database {self.path} for writing: {err}'
+            raise ReaderError(msg) from err
+
+        try:
+            _ = conn.execute(
+                'CREATE INDEX IF NOT EXISTS topic_timestamp_idx ON messages (topic_id, timestamp)',
+            )
+        except apsw.Error as err:
+            msg = f'Cannot create index in database {self.path}: {err}'
+            raise ReaderError(msg) from err
+        finally:
+            conn.close()
+
+    def count_messages(self) -> dict[int, int]:
+        """Count messages per topic.
+
+        Updates the message counts of connections and metadata.
+
+        Returns:
+            Message counts by connection id.
+
+        """
+        assert self.dbconn
+        counts = dict(
+            cast(
+                'Iterable[tuple[int, int]]',
+                self.dbconn.execute(
+                    'SELECT topic_id, COUNT(*) FROM messages GROUP BY topic_id',
+                ),
+            ),
+        )
+        self.connections = [x._replace(msgcount=counts.get(x.id, 0)) for x in self.connections]
+        self.metadata = self.metadata._replace(message_count=sum(counts.values()))
+        return counts
+
     def close(self) -> None:
         """Close rosbag2."""
         assert self.dbconn
@@ -330,6 +403,8 @@ class Sqlite3Reader:
         connections: Iterable[Connection],
         start: int | None = None,
         stop: int | None = None,
+        *,
+        ordered: bool = True,
     ) -> Generator[tuple[Connection, int, bytes], None, None]:
         """Read messages from bag.
 
@@ -338,6 +413,8 @@ class Sqlite3Reader:
                 iterable disables filtering on connections.
             start: Yield only messages at or after this timestamp (ns).
             stop: Yield only messages before this timestamp (ns).
+            ordered: Yield messages in timestamp order, otherwise in storage
+                order.
 
         Yields:
             tuples of connection, timestamp (ns), and rawdata.
@@ -348,34 +425,58 @@ class Sqlite3Reader:
         """
         assert self.dbconn
 
-        query = [
-            'SELECT topics.id,messages.timestamp,messages.data',
-            'FROM messages JOIN topics ON messages.topic_id=topics.id',
-        ]
-        args: list[apsw.Binding] = []
-        clause = 'WHERE'
-
-        topics = tuple({x.topic for x in connections})
-        query.append(f'{clause} topics.name IN ({",".join("?" for _ in topics)})')
-        args += topics
-        clause = 'AND'
+        connmap = {x.id: x for x in self.connections}
+        cids = sorted({x.id for x in connections})
 
+        bounds: list[str] = []
+        args: list[apsw.Binding] = []
         if start is not None:
-            query.append(f'{clause} messages.timestamp >= ?')
+            bounds.append('AND timestamp >= ?')
             args.append(start)
-            clause = 'AND'
-
         if stop is not None:
-            query.append(f'{clause} messages.timestamp < ?')
+            bounds.append('AND timestamp < ?')
             args.append(stop)
-            clause = 'AND'
 
-        query.append('ORDER BY timestamp')
+        if ordered and self.topic_index and len(cids) < len(connmap):
+            # Walk the topic index once per topic and merge in timestamp order,
+            # the rowid tie-breaker reproduces the order of the timestamp index.
+            index = self.topic_index.replace('"', '""')
+            query = [
+                'SELECT timestamp, id, topic_id, data',
+                f'FROM messages INDEXED BY "{index}"',
+                'WHERE topic_id = ?',
+                *bounds,
+                'ORDER BY timestamp, id',
+            ]
+            querystr = ' '.join(query)
+            for timestamp, _, cid, data in heapq.merge(
+                *(
+                    cast(
+                        'Iterable[tuple[int, int, int, bytes]]',
+                        self.dbconn.execute(querystr, [x, *args]),
+                    )
+                    for x in cids
+                ),
+            ):
+                yield connmap[cid], timestamp, data
+            return
+
+        # In ordered mode the unary plus keeps the planner on the timestamp
+        # index, the topic index would require sorting the result.
+        query = [
+            'SELECT topic_id, timestamp, data',
+            'FROM messages',
+            f'WHERE {"+" if ordered else ""}topic_id IN ({",".join("?" for _ in cids)})',
+            *bounds,
+        ]
+        if ordered:
+            query.append('ORDER BY timestamp')
         querystr = ' '.join(query)
 
-        connmap = {x.id: x for x in self.connections}
-
-        cur = cast('Iterable[tuple[int, int, bytes]]', self.dbconn.execute(querystr, args))
+        cur = cast(
+            'Iterable[tuple[int, int, bytes]]',
+            self.dbconn.execute(querystr, [*cids, *args]),
+        )
 
         for cid, timestamp, data in cur:
             yield connmap[cid], timestamp, data
@@ -415,21 +516,89 @@ class Sqlite3Writer:
       timestamp INTEGER NOT NULL,
       data BLOB NOT NULL
     );
-    CREATE INDEX timestamp_idx ON messages (timestamp ASC);
     INSERT INTO schema(schema_version, ros_distro) VALUES (4, 'rosbags');
     """
 
-    def __init__(self, path: Path, compression: CompressionMode) -> None:
-        """Initialize sqlite3 storage."""
+    SQLITE_INDEX = 'CREATE INDEX timestamp_idx ON messages (timestamp ASC);'
+
+    JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+
+    SYNCHRONOUS_MODES = ('off', 'normal', 'full', 'extra')
+
+    def __init__(
+        self,
+        path: Path,
+        compression: CompressionMode,
+        *,
+        bulk: bool = False,
+        batch_size: int = 10000,
+        journal_mode: str | None = None,
+        synchronous: str | None = None,
+        page_size: int | None = None,
+    ) -> None:
+        """Initialize sqlite3 storage.
+
+        By default every message is inserted on write, all within one
+        transaction that is committed on close. With ``bulk`` messages are
+        buffered and inserted in batches of ``batch_size`` rows, and the
+        timestamp index is built once on close instead of being maintained
+        during insertion.
+
+        The ``journal_mode``, ``synchronous``, and ``page_size`` pragmas are
+        passed to sqlite as given, unset values keep the sqlite defaults.
+        Disabling journal and synchronous writes speeds up writing, at the
+        cost of an unusable file if writing is interrupted.
+
+        Args:
+            path: Bag directory.
+            compression: Compression mode.
+            bulk: Buffer messages and build index on close.
+            batch_size: Number of messages buffered in bulk mode.
+            journal_mode: Sqlite journal mode.
+            synchronous: Sqlite synchronous mode.
+            page_size: Sqlite page size in bytes.
+
+        Raises:
+            WriterError: Unsupported compression or invalid option value.
+
+        """
         if compression == CompressionMode.STORAGE:
             msg = 'SQLITE3 writer does not support storage-side compression.'
             raise WriterError(msg)
 
+        if batch_size < 1:
+            msg = f'Batch size {batch_size!r} is not positive.'
+            raise WriterError(msg)
+
+        if journal_mode is not None and journal_mode.lower() not in self.JOURNAL_MODES:
+            msg = f'Unknown journal mode {journal_mode!r}.'
+            raise WriterError(msg)
+
+        if synchronous is not None and synchronous.lower() not in self.SYNCHRONOUS_MODES:
+            msg = f'Unknown synchronous mode {synchronous!r}.'
+            raise WriterError(msg)
+
+        if page_size is not None and (not 512 <= page_size <= 65536 or page_size & (page_size - 1)):
+            msg = f'Page size {page_size!r} is not a power of two between 512 and 65536.'
+            raise WriterError(msg)
+
         self.path = path / f'{path.name}.db3'
         self.conn = sqlite3.connect(f'file:{self.path}', uri=True)
+        if page_size is not None:
+            _ = self.conn.execute(f'PRAGMA page_size = {page_size}')
+        if journal_mode is not None:
+            _ = self.conn.execute(f'PRAGMA journal_mode = {journal_mode.lower()}')
+        if synchronous is not None:
+            _ = self.conn.execute(f'PRAGMA synchronous = {synchronous.lower()}')
         _ = self.conn.executescript(self.SQLITE_SCHEMA)
+        if not bulk:
+            _ = self.conn.executescript(self.SQLITE_INDEX)
         self.cursor = self.conn.cursor()
 
+        self.bulk = bulk
+        self.batch_size = batch_size
+        self.rows: list[tuple[int, int, bytes]] = []
+
     def add_msgtype(self, connection: Connection) -> None:
         """Add a msgtype.
 
@@ -479,17 +648,57 @@ class Sqlite3Writer:
             data: Serialized message data.
 
         """
+        if self.bulk:
+            # Buffered rows outlive the call, copy views of caller buffers.
+            self.rows.append((connection.id, timestamp, bytes(data)))
+            if len(self.rows) >= self.batch_size:
+                self.flush()
+            return
+
         _ = self.cursor.execute(
             'INSERT INTO messages (topic_id, timestamp, data) VALUES(?, ?, ?)',
             (connection.id, timestamp, data),
         )
 
+    def write_many(self, messages: Iterable[tuple[Connection, int, bytes | memoryview]]) -> None:
+        """Write multiple messages to rosbag2.
+
+        Args:
+            messages: Iterable of connection, timestamp (ns), and data tuples.
+
+        """
+        if self.bulk:
+            rows = ((x.id, y, bytes(z)) for x, y, z in messages)
+            while True:
+                self.rows.extend(islice(rows, self.batch_size - len(self.rows)))
+                if len(self.rows) < self.batch_size:
+                    return
+                self.flush()
+
+        _ = self.cursor.executemany(
+            'INSERT INTO messages (topic_id, timestamp, data) VALUES(?, ?, ?)',
+            ((x.id, y, z) for x, y, z in messages),
+        )
+
+    def flush(self) -> None:
+        """Insert buffered messages."""
+        if self.rows:
+            _ = self.cursor.executemany(
+                'INSERT INTO messages (topic_id, timestamp, data) VALUES(?, ?, ?)',
+                self.rows,
+            )
+            self.rows.clear()
+
     def close(self, version: int, metadata: str) -> None:
         """Close rosbag2 after writing.
 
         Closes open database transactions and writes metadata.yaml.
 
         """
+        if self.bulk:
+            self.flush()
+            _ = self.cursor.execute(self.SQLITE_INDEX)
+
         self.cursor.execute(
             'INSERT INTO metadata(metadata_version, metadata) VALUES(?, ?)',
             (version, metadata),
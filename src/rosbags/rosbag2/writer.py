@@ -27,7 +27,7 @@ from .storage_sqlite3 import Sqlite3Writer
 
 if TYPE_CHECKING:
     import sys
-    from collections.abc import Mapping, Sequence
+    from collections.abc import Iterable, Iterator, Mapping, Sequence
     from types import TracebackType
     from typing import Literal, Protocol
 
@@ -45,7 +45,12 @@ if TYPE_CHECKING:
 
         path: Path
 
-        def __init__(self, path: Path, compression: CompressionMode) -> None:
+        def __init__(
+            self,
+            path: Path,
+            compression: CompressionMode,
+            **kwargs: object,
+        ) -> None:
             """Initialize."""
             raise NotImplementedError
 
@@ -60,6 +65,12 @@ if TYPE_CHECKING:
         def write(self, connection: Connection, timestamp: int, data: bytes | memoryview) -> None:
             """Write message to rosbag2."""
 
+        def write_many(
+            self,
+            messages: Iterable[tuple[Connection, int, bytes | memoryview]],
+        ) -> None:
+            """Write messages to rosbag2."""
+
         def close(self, version: int, metadata: str) -> None:
             """Close rosbag2 after writing."""
 
@@ -85,13 +96,19 @@ class Writer:
         *,
         version: Literal[8, 9],
         storage_plugin: StoragePlugin = StoragePlugin.SQLITE3,
+        storage_options: Mapping[str, object] | None = None,
     ) -> None:
         """Initialize writer.
 
+        The ``storage_options`` are passed as keyword arguments to the
+        storage plugin, see McapWriter and Sqlite3Writer for the options
+        they support.
+
         Args:
             path: Filesystem path to bag.
             version: Rosbag2 file format version.
             storage_plugin: Storage plugin to use.
+            storage_options: Options of storage plugin.
 
         Raises:
             WriterError: Target path exists already, Writer can only create new rosbags.
@@ -106,6 +123,7 @@ class Writer:
         self.metapath = path / 'metadata.yaml'
         self.version = version
         self.storage_plugin = storage_plugin
+        self.storage_options = dict(storage_options or {})
 
         self.compression_mode = CompressionMode.NONE
         self.compression_format = ''
@@ -169,7 +187,19 @@ class Writer:
             msg = f'{self.path} exists already, not overwriting.'
             raise WriterError(msg) from None
 
-        self.storage = self.STORAGE_PLUGINS[self.storage_plugin](self.path, self.compression_mode)
+        try:
+            self.storage = self.STORAGE_PLUGINS[self.storage_plugin](
+                self.path,
+                self.compression_mode,
+                **self.storage_options,
+            )
+        except TypeError as err:
+            self.path.rmdir()
+            msg = f'Invalid storage options {self.storage_options!r}: {err}'
+            raise WriterError(msg) from err
+        except WriterError:
+            self.path.rmdir()
+            raise
 
     def add_connection(
         self,
@@ -293,6 +323,56 @@ class Writer:
         self.min_timestamp = min(timestamp, self.min_timestamp)
         self.max_timestamp = max(timestamp, self.max_timestamp)
 
+    def write_many(self, messages: Iterable[tuple[Connection, int, bytes | memoryview]]) -> None:
+        """Write messages to rosbag2.
+
+        Messages are passed on to the storage plugin as a batch, which
+        avoids per message overhead of the plugins.
+
+        Args:
+            messages: Iterable of connection, timestamp (ns), and serialized data.
+
+        Raises:
+            WriterError: Bag not open or topic not registered.
+
+        """
+        if not self.storage:
+            msg = 'Bag was not opened.'
+            raise WriterError(msg)
+
+        self.storage.write_many(self.check_messages(messages))
+
+    def check_messages(
+        self,
+        messages: Iterable[tuple[Connection, int, bytes | memoryview]],
+    ) -> Iterator[tuple[Connection, int, bytes | memoryview]]:
+        """Validate, compress, and count messages.
+
+        Args:
+            messages: Iterable of connection, timestamp (ns), and serialized data.
+
+        Yields:
+            Connection, timestamp (ns), and data as written to storage.
+
+        Raises:
+            WriterError: Topic not registered.
+
+        """
+        counts = self.counts
+        compress = (
+            self.compressor.compress
+            if self.compressor and self.compression_mode == CompressionMode.MESSAGE
+            else None
+        )
+        for connection, timestamp, data in messages:
+            if connection not in self.connections:
+                msg = f'Tried to write to unknown connection {connection!r}.'
+                raise WriterError(msg)
+            counts[connection.id] += 1
+            self.min_timestamp = min(timestamp, self.min_timestamp)
+            self.max_timestamp = max(timestamp, self.max_timestamp)
+            yield connection, timestamp, compress(data) if compress else data
+
     def close(self) -> None:
         """Close rosbag2 after writing.
 
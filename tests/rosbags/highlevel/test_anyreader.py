@@ -33,9 +33,9 @@ HEADER = b'\x00\x01\x00\x00'
 class MockReader:
     """Mock reader simulating empty typestore."""
 
-    def __init__(self, paths: list[Path]) -> None:
+    def __init__(self, paths: list[Path], *, storage_options: object = None) -> None:
         """Initialize mock."""
-        _ = paths
+        _ = paths, storage_options
         self.connections = [
             Connection(
                 1,
@@ -183,6 +183,17 @@ def test_anyreader1(bags1: Sequence[Path]) -> None:
         with pytest.raises(StopIteration):
             _ = next(gen)
 
+        unordered = [x[1] for x in reader.messages(ordered=False)]
+        assert sorted(unordered) == [1, 2, 5, 9, 15]
+        unordered = [
+            x[1]
+            for x in reader.messages(
+                connections=reader.topics['/topic1'].connections,
+                ordered=False,
+            )
+        ]
+        assert sorted(unordered) == [1, 5, 9]
+
 
 def test_anyreader2(bags2: list[Path]) -> None:
     """Test AnyReader on rosbag2."""
@@ -257,9 +268,9 @@ def test_anyreader2_autoregister(bags2: list[Path]) -> None:
     class MockReader:
         """Mock reader."""
 
-        def __init__(self, paths: list[Path]) -> None:
+        def __init__(self, paths: list[Path], *, storage_options: object = None) -> None:
             """Initialize mock."""
-            _ = paths
+            _ = paths, storage_options
             self.connections = [
                 Connection(
                     1,
@@ -345,3 +356,25 @@ def test_anyreader_raises_on_missing_typestore(bags2: list[Path]) -> None:
         pytest.raises(AnyReaderError, match='Bag contains no type definitions'),
     ):
         AnyReader([bags2[0]]).open()
+
+
+def test_anyreader_passes_storage_options(bags1: list[Path], bags2: list[Path]) -> None:
+    """Test AnyReader passes storage options to readers."""
+    with AnyReader(bags1[:1], storage_options={'use_mmap': True}) as reader:
+        assert cast('Reader1', reader.readers[0]).mmap
+        assert len(list(reader.messages())) == 3
+
+    with AnyReader(bags2[:1], storage_options={'verify': False}) as reader:
+        assert len(list(reader.messages())) == 5
+
+    with pytest.raises(AnyReaderError, match=r"Invalid storage options \['foo'\]"):
+        _ = AnyReader(bags1[:1], storage_options={'foo': 1, 'lazy': True})
+
+    with (
+        patch('rosbags.rosbag1.reader.ChunkCache', side_effect=TypeError('internal')),
+        pytest.raises(TypeError, match='internal'),
+    ):
+        _ = AnyReader(bags1[:1], storage_options={'lazy': True})
+
+    with pytest.raises(AnyReaderError, match='Invalid storage options'):
+        AnyReader(bags2[:1], storage_options={'foo': 1}).open()
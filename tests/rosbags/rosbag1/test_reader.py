@@ -9,10 +9,18 @@ from struct import pack, unpack
 from typing import TYPE_CHECKING
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 
 from rosbags.rosbag1 import Reader, ReaderError
-from rosbags.rosbag1.reader import IndexData
+from rosbags.rosbag1.reader import (
+    INDEX_DTYPE,
+    Chunk,
+    Header,
+    get_msgdata_header_offsets,
+    merge_indexes,
+    slice_index,
+)
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
@@ -164,25 +172,45 @@ def write_bag(
     _ = bag.write_bytes(b''.join([magic, header_bytes, chunks_bytes, connections, chunkinfos]))
 
 
-def test_indexdata() -> None:
-    """Test IndexData sort sorder."""
-    x42_1_0 = IndexData(42, 1, 0)
-    x42_2_0 = IndexData(42, 2, 0)
-    x43_3_0 = IndexData(43, 3, 0)
+def test_merge_indexes() -> None:
+    """Test index merge sort order."""
+    assert len(merge_indexes([])) == 0
 
-    assert not x42_1_0 < x42_2_0
-    assert x42_1_0 <= x42_2_0
-    assert x42_1_0 == x42_2_0
-    assert not x42_1_0 != x42_2_0  # noqa: SIM202
-    assert x42_1_0 >= x42_2_0
-    assert not x42_1_0 > x42_2_0
+    first = np.array([(42, 1, 0), (43, 3, 0)], dtype=INDEX_DTYPE)
+    second = np.array([(41, 2, 0), (42, 2, 0)], dtype=INDEX_DTYPE)
+    assert merge_indexes([first]) is first
 
-    assert x42_1_0 < x43_3_0
-    assert x42_1_0 <= x43_3_0
-    assert not x42_1_0 == x43_3_0  # noqa: SIM201
-    assert x42_1_0 != x43_3_0
-    assert not x42_1_0 >= x43_3_0
-    assert not x42_1_0 > x43_3_0
+    merged = merge_indexes([first, second])
+    assert merged.tolist() == [(41, 2, 0), (42, 1, 0), (42, 2, 0), (43, 3, 0)]
+
+    merged = merge_indexes([second, first])
+    assert merged.tolist() == [(41, 2, 0), (42, 2, 0), (42, 1, 0), (43, 3, 0)]
+
+    merged = merge_indexes([first[::-1]])
+    assert merged.tolist() == [(42, 1, 0), (43, 3, 0)]
+
+
+def test_slice_index() -> None:
+    """Test index slicing to time window."""
+    index = np.array([(1, 0, 0), (2, 0, 1), (2, 0, 2), (4, 0, 3)], dtype=INDEX_DTYPE)
+    assert slice_index(index, None, None).tolist() == index.tolist()
+    assert slice_index(index, 2, None)['offset'].tolist() == [1, 2, 3]
+    assert slice_index(index, None, 2)['offset'].tolist() == [0]
+    assert slice_index(index, 2, 3)['offset'].tolist() == [1, 2]
+    assert slice_index(index, 3, 4)['offset'].tolist() == []
+    assert slice_index(index, 5, None)['offset'].tolist() == []
+
+
+def test_get_msgdata_header_offsets() -> None:
+    """Test MSGDATA header layout detection."""
+    head, _ = create_message(cid=2, time=3)
+    assert get_msgdata_header_offsets(b'xx' + serialize(head), 2) == (38, 11, 21, 34)
+
+    head = {'conn': head['conn'], 'op': head['op'], 'time': head['time']}
+    assert get_msgdata_header_offsets(serialize(head), 0) == (38, 24, 13, 34)
+
+    with pytest.raises(ReaderError, match='is unexpected'):
+        _ = get_msgdata_header_offsets(serialize(create_connection()[0]), 0)
 
 
 def test_reader(tmp_path: Path) -> None:
@@ -277,6 +305,443 @@ def test_reader(tmp_path: Path) -> None:
         assert msgs[0][2] == b'MSGCONTENT5'
 
 
+def test_reader_mmap(tmp_path: Path) -> None:
+    """Test reader yields views into memory-mapped file."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=10, msg=10),
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=5, msg=5),
+            ],
+            [
+                create_message(time=7, msg=7),
+            ],
+        ],
+    )
+    with Reader(bag, use_mmap=True) as reader:
+        msgs = list(reader.messages())
+        assert all(isinstance(x[2], memoryview) for x in msgs)
+        assert [bytes(x[2]) for x in msgs] == [b'MSGCONTENT5', b'MSGCONTENT7', b'MSGCONTENT10']
+
+        msgs = list(reader.messages(start=7 * 10**9))
+        assert [bytes(x[2]) for x in msgs] == [b'MSGCONTENT7', b'MSGCONTENT10']
+    assert bytes(msgs[0][2]) == b'MSGCONTENT7'
+
+    with Reader(bag, use_mmap=True) as reader:
+        reader.chunks = {k: v._replace(datasize=2**20) for k, v in reader.chunks.items()}
+        with pytest.raises(ReaderError, match='Got only'):
+            _ = next(reader.messages())
+
+    with (
+        patch('mmap.mmap', side_effect=OSError('No such device')),
+        pytest.raises(ReaderError, match=r'Could not memory-map file .*No such device'),
+    ):
+        Reader(bag, use_mmap=True).open()
+
+    with pytest.raises(ReaderError, match='Header could not be read from buffer'):
+        _ = Header.unpack_from(memoryview(b'\x01\x00'), 0)
+
+    with pytest.raises(ReaderError, match='Header could not be read from buffer'):
+        _ = Header.unpack_from(memoryview(serialize(b'op=\x02'))[:-1], 0)
+
+
+def test_reader_index_cache(tmp_path: Path) -> None:
+    """Test reader persists and reuses index cache."""
+    bag = tmp_path / 'test.bag'
+    cache = tmp_path / 'cache'
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=10, msg=10),
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=5, msg=5),
+            ],
+        ],
+    )
+    with Reader(bag) as reader:
+        expected = [(x[0].id, *x[1:]) for x in reader.messages()]
+        topics = {k: v.msgcount for k, v in reader.topics.items()}
+
+    with Reader(bag, index_cache=cache) as reader:
+        assert [(x[0].id, *x[1:]) for x in reader.messages()] == expected
+    assert len(list(cache.iterdir())) == 1
+
+    with (
+        patch.object(Reader, 'read_index_data', side_effect=AssertionError),
+        Reader(bag, index_cache=cache) as reader,
+    ):
+        assert {k: v.msgcount for k, v in reader.topics.items()} == topics
+        msgs = list(reader.messages())
+        assert [(x[0].id, *x[1:]) for x in msgs] == expected
+        assert all(x[0].owner is reader for x in msgs)
+
+    # stale cache is replaced
+    write_bag(bag, create_default_header(), chunks=[[create_connection(), create_message()]])
+    with Reader(bag, index_cache=cache) as reader:
+        assert reader.message_count == 1
+
+    # broken cache is ignored
+    cachefile = next(cache.iterdir())
+    _ = cachefile.write_bytes(cachefile.read_bytes()[:-1])
+    with Reader(bag, index_cache=cache) as reader:
+        assert reader.message_count == 1
+    assert len(list(cache.iterdir())) == 1
+
+    # cache with trailing data is ignored
+    content = cachefile.read_bytes()
+    _ = cachefile.write_bytes(content + b'\x00')
+    with Reader(bag, index_cache=cache) as reader:
+        assert reader.message_count == 1
+    assert cachefile.read_bytes() == content
+
+    # cache with missing or truncated strings is ignored
+    topic = content.index(b'/topic0') - 4
+    compression = content.index(b'none') - 4
+    for pos, size, skip in ((topic, 2**32 - 1, 7), (topic, 2**16, 0), (compression, 2**32 - 1, 4)):
+        _ = cachefile.write_bytes(content[:pos] + pack('<L', size) + content[pos + 4 + skip :])
+        with Reader(bag, index_cache=cache) as reader:
+            assert reader.topics['/topic0'].msgcount == 1
+        assert cachefile.read_bytes() == content
+
+    # unreadable and unwritable cache locations are ignored
+    cachefile.unlink()
+    cachefile.mkdir()
+    with Reader(bag, index_cache=cache) as reader:
+        assert reader.message_count == 1
+    assert cachefile.is_dir()
+    assert list(cache.iterdir()) == [cachefile]
+
+    nodir = tmp_path / 'nodir'
+    _ = nodir.write_bytes(b'')
+    with Reader(bag, index_cache=nodir) as reader:
+        assert reader.message_count == 1
+    assert nodir.read_bytes() == b''
+
+
+def test_reader_chunk_cache(tmp_path: Path) -> None:
+    """Test reader caches decompressed chunks."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=1, msg=1),
+                create_message(time=3, msg=3),
+            ],
+            [
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=2, msg=2),
+                create_message(cid=2, time=4, msg=4),
+            ],
+        ],
+    )
+    with Reader(bag) as reader:
+        assert [bytes(x[2]) for x in reader.messages()] == [
+            b'MSGCONTENT1',
+            b'MSGCONTENT2',
+            b'MSGCONTENT3',
+            b'MSGCONTENT4',
+        ]
+        assert (reader.chunk_cache.hits, reader.chunk_cache.misses) == (0, 4)
+        assert len(reader.chunk_cache.entries) == 1
+
+    with Reader(bag, chunk_cache_size=2**20) as reader:
+        assert len(list(reader.messages())) == 4
+        assert (reader.chunk_cache.hits, reader.chunk_cache.misses) == (2, 2)
+        assert len(list(reader.messages())) == 4
+        assert (reader.chunk_cache.hits, reader.chunk_cache.misses) == (6, 2)
+        assert len(reader.chunk_cache.entries) == 2
+    assert not reader.chunk_cache.entries
+    assert not reader.chunk_cache.size
+
+
+def test_reader_file_order(tmp_path: Path) -> None:
+    """Test reader yields messages in file order."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=10, msg=10),
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=5, msg=5),
+            ],
+            [
+                create_message(time=7, msg=7),
+                create_message(cid=2, time=3, msg=3),
+            ],
+        ],
+    )
+    with Reader(bag) as reader:
+        msgs = list(reader.messages(ordered=False))
+        assert [x[1] // 10**9 for x in msgs] == [10, 5, 7, 3]
+        assert [bytes(x[2]) for x in msgs] == [
+            b'MSGCONTENT10',
+            b'MSGCONTENT5',
+            b'MSGCONTENT7',
+            b'MSGCONTENT3',
+        ]
+
+        connections = [x for x in reader.connections if x.topic == '/topic2']
+        msgs = list(reader.messages(connections, ordered=False))
+        assert [x[1] // 10**9 for x in msgs] == [5, 3]
+
+        msgs = list(reader.messages(start=6 * 10**9, stop=10 * 10**9, ordered=False))
+        assert [x[1] // 10**9 for x in msgs] == [7]
+
+
+def test_reader_msgdata_layouts(tmp_path: Path) -> None:
+    """Test reader handles MSGDATA headers with differing field order."""
+    bag = tmp_path / 'test.bag'
+    head, data = create_message(time=2, msg=2)
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=1, msg=1),
+                ({'conn': head['conn'], 'op': head['op'], 'time': head['time']}, data),
+                create_message(time=3, msg=3),
+            ],
+        ],
+    )
+    with Reader(bag) as reader:
+        expected = [(1, b'MSGCONTENT1'), (2, b'MSGCONTENT2'), (3, b'MSGCONTENT3')]
+        assert [(x[1] // 10**9, bytes(x[2])) for x in reader.messages()] == expected
+        assert [(x[1] // 10**9, bytes(x[2])) for x in reader.messages(ordered=False)] == expected
+        assert reader.msgdata_header_offsets[0] == 38
+
+
+def test_reader_validates_index(tmp_path: Path) -> None:
+    """Test reader rejects index entries not matching message data."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=1, msg=1),
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=1, msg=2),
+                create_message(time=2, msg=3),
+            ],
+        ],
+    )
+    with Reader(bag) as reader:
+        assert len(list(reader.messages())) == 3
+        indexes = reader.indexes
+        first, second = indexes[1]['offset'].tolist()
+
+        reader.indexes = {k: v.copy() for k, v in indexes.items()}
+        reader.indexes[1]['time'][0] = 5 * 10**9
+        with pytest.raises(ReaderError, match='does not match index'):
+            _ = list(reader.messages())
+
+        reader.indexes = {k: v.copy() for k, v in indexes.items()}
+        reader.indexes[1]['offset'][1] = first
+        with pytest.raises(ReaderError, match='does not match index'):
+            _ = list(reader.messages())
+
+        connections = reader.connections
+        reader.connections = connections[1:]
+        reader.indexes = {k: v.copy() for k, v in indexes.items()}
+        reader.indexes[2]['offset'][0] = first
+        with pytest.raises(ReaderError, match='does not match index'):
+            _ = list(reader.messages(reader.connections))
+
+        reader.connections = connections
+        reader.indexes = {k: v.copy() for k, v in indexes.items()}
+        reader.indexes[1]['offset'][0] = second - 1
+        with pytest.raises(ReaderError, match='Header'):
+            _ = list(reader.messages())
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_reader_truncated_chunk(tmp_path: Path, *, ordered: bool) -> None:
+    """Test reader raises on truncated chunk data."""
+    bag = tmp_path / 'test.bag'
+    write_bag(bag, create_default_header(), chunks=[[create_connection(), create_message()]])
+    with Reader(bag) as reader:
+        ((pos, chunk),) = reader.chunks.items()
+        datapos = bytes(reader.read_chunk_data(chunk)).index(b'MSGCONTENT')
+
+    for size, match in ((datapos - 2, 'Could not read uint32'), (datapos + 3, 'Got only 3 of')):
+        with Reader(bag) as reader:
+            reader.chunks[pos] = chunk._replace(datasize=size)
+            with pytest.raises(ReaderError, match=match):
+                _ = next(reader.messages(ordered=ordered))
+
+
+def test_reader_lazy(tmp_path: Path) -> None:
+    """Test lazy reader reads indexes on demand."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        create_default_header(),
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=10, msg=10),
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=5, msg=5),
+            ],
+            [
+                create_message(time=20, msg=20),
+                create_message(time=15, msg=15),
+            ],
+        ],
+    )
+    with Reader(bag) as reader:
+        expected = [(x[0].id, x[1], bytes(x[2])) for x in reader.messages()]
+
+    with Reader(bag, lazy=True) as reader:
+        assert not reader.chunks
+        assert reader.message_count == 4
+        assert reader.topics['/topic0'].msgcount == 3
+        assert [x.msgcount for x in reader.connections] == [3, 1]
+
+        msgs = list(reader.messages(start=12 * 10**9))
+        assert [bytes(x[2]) for x in msgs] == [b'MSGCONTENT15', b'MSGCONTENT20']
+        assert len(reader.chunk_indexes) == 1
+
+        connections = [x for x in reader.connections if x.topic == '/topic2']
+        msgs = list(reader.messages(connections, ordered=False))
+        assert [bytes(x[2]) for x in msgs] == [b'MSGCONTENT5']
+        assert len(reader.chunk_indexes) == 1
+
+        assert [(x[0].id, x[1], bytes(x[2])) for x in reader.messages()] == expected
+        assert len(reader.chunk_indexes) == 2
+
+
+def test_reader_recover(tmp_path: Path) -> None:
+    """Test reader recovers unindexed and truncated bags."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        {**create_default_header(), 'index_pos': pack('<Q', 0)},
+        chunks=[
+            [
+                create_connection(),
+                create_message(time=10, msg=10),
+                create_connection(cid=2, topic=2),
+                create_message(cid=2, time=5, msg=5),
+            ],
+            [
+                create_message(time=20, msg=20),
+                create_message(time=15, msg=15),
+            ],
+        ],
+    )
+    data = bag.read_bytes()
+
+    with Reader(bag, recover=True) as reader:
+        assert [x.msgcount for x in reader.connections] == [3, 1]
+        assert [x.pos for x in reader.chunk_infos] == [13 + 4096, data.find(b'op=\x05', 4200) - 8]
+        assert reader.start_time == 5 * 10**9
+        assert reader.end_time == 20 * 10**9 + 1
+        assert [bytes(x[2]) for x in reader.messages()] == [
+            b'MSGCONTENT5',
+            b'MSGCONTENT10',
+            b'MSGCONTENT15',
+            b'MSGCONTENT20',
+        ]
+        assert [bytes(x[2]) for x in reader.messages(ordered=False)] == [
+            b'MSGCONTENT10',
+            b'MSGCONTENT5',
+            b'MSGCONTENT20',
+            b'MSGCONTENT15',
+        ]
+
+    with Reader(bag, recover=True, lazy=True, use_mmap=True) as reader:
+        assert len(list(reader.messages(start=12 * 10**9))) == 2
+
+    _ = bag.write_bytes(data[: reader.chunk_infos[1].pos + 20])
+    with Reader(bag, recover=True) as reader:
+        assert [x.msgcount for x in reader.connections] == [1, 1]
+        assert [bytes(x[2]) for x in reader.messages()] == [b'MSGCONTENT5', b'MSGCONTENT10']
+
+    _ = bag.write_bytes(data[: reader.chunk_infos[0].pos + 100])
+    with Reader(bag, recover=True) as reader:
+        assert not reader.connections
+        assert not reader.chunk_infos
+        assert not list(reader.messages())
+
+    # Last chunk lacks index data, it is written together with the index.
+    _ = bag.write_bytes(data[: data.find(b'op=\x04', data.find(b'op=\x05', 4200)) - 8])
+    with Reader(bag, recover=True, write_index=True) as reader:
+        expected = [(x[0].id, x[1], bytes(x[2])) for x in reader.messages()]
+    assert len(expected) == 4
+
+    with Reader(bag) as reader:
+        assert [x.msgcount for x in reader.connections] == [3, 1]
+        assert [(x[0].id, x[1], bytes(x[2])) for x in reader.messages()] == expected
+        assert reader.start_time == 5 * 10**9
+        assert reader.end_time == 20 * 10**9 + 1
+
+    # Chunk without index data before the last chunk cannot be fixed in place.
+    first = data.find(b'op=\x04') - 8
+    second = data.find(b'op=\x05', 4200) - 8
+    _ = bag.write_bytes(data[:first] + data[second:])
+    with pytest.raises(ReaderError, match='chunks without index data'):
+        Reader(bag, recover=True, write_index=True).open()
+    with Reader(bag, recover=True) as reader:
+        assert len(list(reader.messages())) == 4
+
+
+def test_reader_recover_failures(tmp_path: Path) -> None:
+    """Test reader recovery failure cases."""
+    bag = tmp_path / 'test.bag'
+    write_bag(
+        bag,
+        {**create_default_header(), 'index_pos': pack('<Q', 0)},
+        chunks=[[create_connection(), create_message()]],
+    )
+    reader = Reader(bag)
+    chunk = Chunk(0, 0, lambda x: x)
+    record = serialize(create_message()[0])
+
+    with (
+        patch.object(reader, 'read_chunk_data', return_value=record + b'\x01\x00'),
+        pytest.raises(ReaderError, match='Could not read uint32'),
+    ):
+        _ = reader.scan_chunk(0, chunk, {})
+
+    with (
+        patch.object(reader, 'read_chunk_data', return_value=record + pack('<L', 8) + b'MSG'),
+        pytest.raises(ReaderError, match='Chunk data is incomplete'),
+    ):
+        _ = reader.scan_chunk(0, chunk, {})
+    assert not reader.chunks
+
+    data = bag.read_bytes()
+    with (
+        patch(
+            'rosbags.rosbag1.writer.Writer.write_connection',
+            side_effect=OSError(28, 'No space left on device'),
+        ),
+        pytest.raises(ReaderError, match=r'Could not write index .* No space left on device'),
+    ):
+        Reader(bag, recover=True, write_index=True).open()
+
+    _ = bag.write_bytes(data)
+    with Reader(bag, recover=True) as reader:
+        assert len(list(reader.messages())) == 1
+
+
 def test_raises_if_user_error(tmp_path: Path) -> None:
     """Test reader raises if user makes error."""
     bag = tmp_path / 'test.bag'
@@ -16,8 +16,9 @@ if TYPE_CHECKING:
     from pathlib import Path
 
 
+@pytest.mark.parametrize('use_mmap', [False, True])
 @pytest.mark.parametrize('fmt', [None, *Writer.CompressionFormat])
-def test_roundtrip(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None:
+def test_roundtrip(tmp_path: Path, fmt: Writer.CompressionFormat | None, *, use_mmap: bool) -> None:
     """Test messages stay the same between write and read."""
     store = get_typestore(Stores.ROS1_NOETIC)
 
@@ -31,7 +32,7 @@ def test_roundtrip(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None
         wconnection = wbag.add_connection('/test', float64.__msgtype__, typestore=store)
         wbag.write(wconnection, 42, store.serialize_ros1(float64, float64.__msgtype__))
 
-    rbag = Reader(path)
+    rbag = Reader(path, use_mmap=use_mmap)
     with rbag:
         gen = rbag.messages()
         rconnection, _, raw = next(gen)
@@ -42,3 +43,80 @@ def test_roundtrip(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None
         assert msg == float64
         with pytest.raises(StopIteration):
             _ = next(gen)
+
+
+@pytest.mark.parametrize('fmt', [None, *Writer.CompressionFormat])
+def test_roundtrip_prefetch(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None:
+    """Test prefetching reader yields same messages."""
+    path = tmp_path / 'test.bag'
+    wbag = Writer(path)
+    wbag.chunk_threshold = 256
+    if fmt:
+        wbag.set_compression(fmt)
+    with wbag:
+        conns = [
+            wbag.add_connection(f'/topic{x}', 'test_msgs/msg/Test', msgdef='DEF', md5sum='HASH')
+            for x in range(3)
+        ]
+        for idx in range(200):
+            wbag.write(conns[idx % 3], 100 - idx // 2, f'MSG{idx}'.encode())
+
+    with Reader(path) as rbag:
+        expected = [(x.id, y, bytes(z)) for x, y, z in rbag.messages()]
+
+    with Reader(path, prefetch=4) as rbag:
+        assert [(x.id, y, bytes(z)) for x, y, z in rbag.messages()] == expected
+        conns = [x for x in rbag.connections if x.topic == '/topic1']
+        assert [(x.id, y, bytes(z)) for x, y, z in rbag.messages(conns, 20, 80)] == [
+            x for x in expected if x[0] == 1 and 20 <= x[1] < 80
+        ]
+        gen = rbag.messages()
+        _ = next(gen)
+
+    with Reader(path, prefetch=2, chunk_cache_size=2**20, use_mmap=True) as rbag:
+        assert [(x.id, y, bytes(z)) for x, y, z in rbag.messages()] == expected
+
+
+@pytest.mark.parametrize('fmt', [None, *Writer.CompressionFormat])
+def test_roundtrip_append(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None:
+    """Test appending to existing bag."""
+    path = tmp_path / 'test.bag'
+    wbag = Writer(path, chunk_threshold=256)
+    with wbag:
+        conn = wbag.add_connection('/topic0', 'test_msgs/msg/Test', msgdef='DEF', md5sum='HASH')
+        for idx in range(20):
+            wbag.write(conn, idx, f'MSG{idx}'.encode())
+
+    wbag = Writer(path, chunk_threshold=256, append=True)
+    if fmt:
+        wbag.set_compression(fmt)
+    with wbag:
+        assert [(x.id, x.topic) for x in wbag.connections] == [(0, '/topic0')]
+        conn = wbag.connections[0]
+        new = wbag.add_connection('/topic1', 'test_msgs/msg/Test', msgdef='DEF', md5sum='HASH')
+        assert new.id == 1
+        for idx in range(20, 40):
+            wbag.write(conn, idx, f'MSG{idx}'.encode())
+            wbag.write(new, idx, f'NEW{idx}'.encode())
+
+    with Reader(path) as rbag:
+        assert [(x.topic, x.msgcount) for x in rbag.connections] == [
+            ('/topic0', 40),
+            ('/topic1', 20),
+        ]
+        assert rbag.start_time == 0
+        assert rbag.end_time == 40
+        msgs = [(x.id, y, bytes(z)) for x, y, z in rbag.messages()]
+    assert msgs[:21] == [(0, x, f'MSG{x}'.encode()) for x in range(21)]
+    assert msgs[21:23] == [(1, 20, b'NEW20'), (0, 21, b'MSG21')]
+
+    # An interrupted append leaves a bag that can be recovered.
+    wbag = Writer(path, append=True)
+    wbag.open()
+    wbag.write(wbag.connections[1], 50, b'NEW50')
+    wbag.write_chunk(wbag.chunks[-1])
+    assert wbag.bio
+    wbag.bio.close()
+
+    with Reader(path, recover=True) as rbag:
+        assert [x.msgcount for x in rbag.connections] == [40, 21]
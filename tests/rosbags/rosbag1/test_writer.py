@@ -30,6 +30,17 @@ def test_no_overwrite(tmp_path: Path) -> None:
         writer.open()
 
 
+def test_append_errors(tmp_path: Path) -> None:
+    """Test writer refuses to append to missing and unreadable bags."""
+    path = tmp_path / 'test.bag'
+    with pytest.raises(WriterError, match='does not exist'):
+        Writer(path, append=True)
+
+    _ = path.write_bytes(b'#ROSBAG V2.0\n')
+    with pytest.raises(WriterError, match='Cannot append'):
+        Writer(path, append=True).open()
+
+
 def test_empty(tmp_path: Path) -> None:
     """Test empty bag."""
     path = tmp_path / 'test.bag'
@@ -222,12 +233,45 @@ def test_write_simple(tmp_path: Path) -> None:
     path.unlink()
 
 
+def test_write_many(tmp_path: Path) -> None:
+    """Test batch writing matches single message writes."""
+    results = []
+    for batch in (False, True):
+        path = tmp_path / f'test{batch}.bag'
+        with Writer(path, chunk_threshold=256) as writer:
+            conns = [
+                writer.add_connection(f'/topic{x}', 'test_msgs/msg/Test', msgdef='D', md5sum='H')
+                for x in range(3)
+            ]
+            messages = [(conns[x % 3], 10**9 * x + 7, f'MSG{x}'.encode()) for x in range(50)]
+            if batch:
+                writer.write_many(messages)
+            else:
+                for message in messages:
+                    writer.write(*message)
+
+            other = conns[0]._replace(topic='/other')
+            with pytest.raises(WriterError, match='is no connection'):
+                writer.write_many([(conns[1], 0, b''), (other, 0, b'')])
+        results.append(path.read_bytes())
+
+    assert results[0] == results[1]
+
+
 def test_compression_errors(tmp_path: Path) -> None:
     """Test compression modes."""
     path = tmp_path / 'test.bag'
     with Writer(path) as writer, pytest.raises(WriterError, match='already open'):
         writer.set_compression(writer.CompressionFormat.BZ2)
 
+    writer = Writer(tmp_path / 'level.bag')
+    for fmt, level in ((Writer.CompressionFormat.BZ2, 0), (Writer.CompressionFormat.LZ4, 17)):
+        with pytest.raises(WriterError, match=f'level {level} of {fmt.name.lower()} is not'):
+            writer.set_compression(fmt, level)
+    assert writer.compression_format == 'none'
+    writer.set_compression(Writer.CompressionFormat.BZ2, 1)
+    writer.set_compression(Writer.CompressionFormat.LZ4, 16)
+
 
 @pytest.mark.parametrize('fmt', [None, Writer.CompressionFormat.BZ2, Writer.CompressionFormat.LZ4])
 def test_compression_modes(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None:
@@ -270,6 +314,28 @@ def test_chunksize_is_correct(tmp_path: Path, fmt: Writer.CompressionFormat | No
     assert b'size=\xf9\x00\x00\x00' in data
 
 
+@pytest.mark.parametrize('fmt', [None, Writer.CompressionFormat.BZ2, Writer.CompressionFormat.LZ4])
+def test_background_compression(tmp_path: Path, fmt: Writer.CompressionFormat | None) -> None:
+    """Test background compression writes identical bags."""
+    store = get_typestore(Stores.LATEST)
+    results = []
+    for workers in (0, 1, 3):
+        path = tmp_path / f'test{workers}.bag'
+        writer = Writer(path, chunk_threshold=256, workers=workers)
+        if fmt:
+            writer.set_compression(fmt, 1)
+        with writer:
+            conn = writer.add_connection('/foo', 'std_msgs/msg/Int8', typestore=store)
+            for idx in range(100):
+                writer.write(conn, idx, bytes([idx]) * 32)
+            assert len(writer.pending) <= 2 * workers
+        assert not writer.executor
+        results.append(path.read_bytes())
+
+    assert results[0].count(b'op=\x05') > 10
+    assert results[0] == results[1] == results[2]
+
+
 def test_deprecations(tmp_path: Path) -> None:
     """Test writer deprecations."""
     bag = Writer(tmp_path / 'bag')
@@ -195,8 +195,11 @@ def bag_with_compression(
             connections: Iterable[Connection],
             start: int | None = None,
             stop: int | None = None,
+            *,
+            ordered: bool = True,
         ) -> Generator[tuple[Connection, int, bytes], None, None]:
             """Messages."""
+            assert ordered
             if not self.index:
                 return
 
@@ -423,6 +426,36 @@ def test_reader_selects_plugins(tmp_path: Path) -> None:
             _ = Reader(dbpath)
 
 
+def test_reader_passes_storage_options(nonempty_bag: Path, mock_storage: MagicMock) -> None:
+    """Test reader passes storage options to plugins."""
+    mockdb3 = MagicMock()
+    with patch.dict('rosbags.rosbag2.reader.Reader.STORAGE_PLUGINS', {'.db3': mockdb3}):
+        dbpath = nonempty_bag / 'foo.db3'
+        dbpath.touch()
+        _ = Reader(dbpath, storage_options={'verify': False})
+        mockdb3.assert_called_once_with(dbpath, verify=False)
+
+        mockdb3.side_effect = TypeError('unexpected keyword')
+        with pytest.raises(ReaderError, match='Invalid storage options'):
+            _ = Reader(dbpath, storage_options={'foo': 1})
+
+    with patch.dict(
+        'rosbags.rosbag2.reader.DirectoryReader.STORAGE_DEFAULTS',
+        {'mock': {'lazy': True, 'verify': True}},
+    ):
+        with Reader(nonempty_bag, storage_options={'verify': False}):
+            pass
+        assert [x.kwargs for x in mock_storage.call_args_list] == [
+            {'lazy': True, 'verify': False},
+            {'lazy': True, 'verify': False},
+        ]
+
+        mock_storage.side_effect = TypeError('unexpected keyword')
+        reader = Reader(nonempty_bag, storage_options={'foo': 1})
+        with pytest.raises(ReaderError, match='Invalid storage options'):
+            reader.open()
+
+
 def test_reader_passes_messages_to_plugins(bag_with_compression: Path) -> None:
     """Test reader passes messages to plugins."""
     with Reader(bag_with_compression) as reader:
@@ -465,6 +498,131 @@ def test_reader_passes_messages_to_plugins(bag_with_compression: Path) -> None:
             _ = next(gen)
 
 
+@pytest.mark.parametrize('bag_with_compression', ['file'], indirect=True)
+def test_directory_reader_decompresses_splits_on_demand(
+    bag_with_compression: Path,
+    mock_storage: MagicMock,
+) -> None:
+    """Test directory reader decompresses only splits in requested range."""
+    metapath = bag_with_compression / 'metadata.yaml'
+    _ = metapath.write_text(
+        metapath.read_text()
+        + """\
+  files:
+  - path: db0.dat.zstd
+    starting_time:
+      nanoseconds_since_epoch: 600
+    duration:
+      nanoseconds: 10
+    message_count: 1
+  - path: db1.dat.zstd
+    starting_time:
+      nanoseconds_since_epoch: 666
+    duration:
+      nanoseconds: 42
+    message_count: 4
+""",
+    )
+
+    reader = DirectoryReader(bag_with_compression)
+    reader.open()
+    assert reader.tmpdir
+    tmpdir = Path(reader.tmpdir.name)
+    assert [x.args[0].name for x in mock_storage.call_args_list] == ['db0.dat']
+    assert not list(tmpdir.iterdir())
+
+    assert [x[1] for x in reader.messages(reader.connections, start=700)] == [708, 708, 708]
+    assert [x.args[0].name for x in mock_storage.call_args_list] == ['db0.dat', 'db1.dat']
+    assert not list(tmpdir.iterdir())
+
+    assert list(reader.messages(reader.connections, stop=650)) == []
+    assert [x.args[0].name for x in mock_storage.call_args_list] == [
+        'db0.dat',
+        'db1.dat',
+        'db0.dat',
+    ]
+
+    gen = reader.messages(reader.connections)
+    assert next(gen)[1] == 666
+    assert len(list(tmpdir.iterdir())) == 1
+    gen.close()
+    assert not list(tmpdir.iterdir())
+
+    reader.close()
+    assert not tmpdir.exists()
+
+
+@pytest.mark.parametrize('bag_with_compression', ['file'], indirect=True)
+def test_directory_reader_collects_msgdefs_from_splits(
+    bag_with_compression: Path,
+    mock_storage: MagicMock,
+) -> None:
+    """Test directory reader reads splits until message definitions are found."""
+    msgtypes = ['geometry_msgs/msg/Polygon', 'sensor_msgs/msg/MagneticField']
+
+    def make_storage(path: Path) -> MagicMock:
+        index = int(path.stem[-1])
+        storage = MagicMock()
+        storage.connections = [
+            Connection(
+                1,
+                '/topic',
+                msgtypes[index],
+                MessageDefinition(MessageDefinitionFormat.MSG, f'msgdef{index}'),
+                '',
+                0,
+                ConnectionExtRosbag2('cdr', []),
+                None,
+            ),
+        ]
+        return storage
+
+    mock_storage.side_effect = make_storage
+    reader = DirectoryReader(bag_with_compression)
+    reader.open()
+    assert [x.args[0].name for x in mock_storage.call_args_list] == ['db0.dat', 'db1.dat']
+    assert [x.msgdef.data for x in reader.connections] == ['msgdef0', 'msgdef1', '']
+    reader.close()
+
+
+@pytest.mark.parametrize('bag_with_compression', ['file'], indirect=True)
+def test_directory_reader_removes_split_on_open_failure(
+    bag_with_compression: Path,
+    mock_storage: MagicMock,
+) -> None:
+    """Test directory reader removes decompressed split that fails to open."""
+    reader = DirectoryReader(bag_with_compression)
+    reader.open()
+    assert reader.tmpdir
+    tmpdir = Path(reader.tmpdir.name)
+
+    mock_storage.side_effect = None
+    mock_storage.return_value.open.side_effect = ReaderError('broken')
+    with pytest.raises(ReaderError, match='broken'):
+        _ = list(reader.messages(reader.connections))
+    assert not list(tmpdir.iterdir())
+    reader.close()
+    assert not tmpdir.exists()
+
+
+@pytest.mark.parametrize('bag_with_compression', ['file'], indirect=True)
+def test_directory_reader_skips_cache_for_decompressed_splits(
+    bag_with_compression: Path,
+    mock_storage: MagicMock,
+) -> None:
+    """Test directory reader does not cache decompressed temporary splits."""
+    with patch.dict(
+        'rosbags.rosbag2.reader.DirectoryReader.STORAGE_CACHE_OPTIONS',
+        {'mock': 'summary_cache'},
+    ):
+        reader = DirectoryReader(bag_with_compression, summary_cache='cache')
+        reader.open()
+        _ = list(reader.messages(reader.connections))
+        reader.close()
+    assert mock_storage.call_count == 3
+    assert all(not x.kwargs for x in mock_storage.call_args_list)
+
+
 def test_reader_raises_if_closed(nonempty_bag: Path) -> None:
     """Test reader raises if methods called while closed."""
     reader = Reader(nonempty_bag)
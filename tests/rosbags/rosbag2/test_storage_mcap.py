@@ -4,10 +4,12 @@
 
 from __future__ import annotations
 
+import os
 import struct
 from io import BytesIO
 from itertools import groupby, product
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, cast
+from unittest.mock import Mock, patch
 
 import pytest
 
@@ -17,9 +19,11 @@ from rosbags.interfaces import (
     MessageDefinition,
     MessageDefinitionFormat,
 )
+from rosbags.interfaces.fileio import get_cache_location
+from rosbags.rosbag2 import Reader
 from rosbags.rosbag2.enums import CompressionMode
-from rosbags.rosbag2.errors import ReaderError
-from rosbags.rosbag2.storage_mcap import McapReader, McapWriter
+from rosbags.rosbag2.errors import ReaderError, WriterError
+from rosbags.rosbag2.storage_mcap import DECOMPRESSORS, McapReader, McapWriter
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
@@ -437,6 +441,644 @@ def test_message_filters_mcap(bag_mcap: Path) -> None:
     with pytest.raises(StopIteration):
         _ = next(gen)
 
+    ordered = list(reader.messages(reader.connections, start=667))
+    unordered = list(reader.messages(reader.connections, start=667, ordered=False))
+    assert sorted(unordered, key=lambda x: (x[1], x[0].id)) == ordered
+    unordered = list(reader.messages(magn_connections, ordered=False))
+    assert [x[0].topic for x in unordered] == ['/magn', '/magn']
+
+
+@pytest.mark.parametrize('compression', ['none', 'storage'])
+def test_reader_mcap_prefetch(tmp_path: Path, compression: str) -> None:
+    """Test prefetching reader yields same messages."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    mcap = McapWriter(bag, CompressionMode[compression.upper()])
+    connections = [
+        Connection(
+            cid,
+            f'/topic{cid}',
+            'msgtype',
+            MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+            'digest',
+            0,
+            ConnectionExtRosbag2('cdr', []),
+            None,
+        )
+        for cid in (1, 2)
+    ]
+    mcap.add_msgtype(connections[0])
+    for connection in connections:
+        mcap.add_connection(connection, 'qos')
+    for idx in range(40):
+        mcap.write(connections[idx % 2], 100 - idx, bytes([idx]) * 2**17)
+    mcap.close(0, 'metadata')
+
+    reader = McapReader(bag / 'bag.mcap')
+    reader.open()
+    assert len(reader.chunks) > 3
+    expected = [(x[0].id, x[1], x[2]) for x in reader.messages(reader.connections)]
+    unordered = [(x[0].id, x[1], x[2]) for x in reader.messages(reader.connections, ordered=False)]
+    reader.close()
+
+    for budget in (1, 2**21, 2**30):
+        reader = McapReader(bag / 'bag.mcap', prefetch=2, prefetch_budget=budget)
+        reader.open()
+        assert reader.executor
+        msgs = reader.messages(reader.connections)
+        assert [(x[0].id, x[1], x[2]) for x in msgs] == expected
+        msgs = reader.messages(reader.connections, ordered=False)
+        assert [(x[0].id, x[1], x[2]) for x in msgs] == unordered
+        msgs = reader.messages(reader.connections[1:], start=70)
+        assert [(x[0].id, x[1], x[2]) for x in msgs] == [
+            x for x in expected if x[0] == 2 and x[1] >= 70
+        ]
+        _ = next(reader.messages(reader.connections))
+        reader.close()
+        assert not reader.executor
+
+
+@pytest.mark.parametrize('compression', ['none', 'storage'])
+def test_reader_mcap_message_index(tmp_path: Path, compression: str) -> None:
+    """Test reader uses message index for selective reads."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    mcap = McapWriter(bag, CompressionMode[compression.upper()])
+    connections = [
+        Connection(
+            cid,
+            f'/topic{cid}',
+            'msgtype',
+            MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+            'digest',
+            0,
+            ConnectionExtRosbag2('cdr', []),
+            None,
+        )
+        for cid in (1, 2, 3)
+    ]
+    mcap.add_msgtype(connections[0])
+    for connection in connections:
+        mcap.add_connection(connection, 'qos')
+    for idx in range(60):
+        size = 2**16 if idx % 3 else 8
+        mcap.write(connections[idx % 3], idx if idx % 3 else 100 - idx, bytes([idx]) * size)
+    mcap.close(0, 'metadata')
+
+    reader = McapReader(bag / 'bag.mcap')
+    reader.open()
+    assert len(reader.chunks) > 2
+    expected = [(x[0].id, x[1], x[2]) for x in reader.messages(reader.connections)]
+    assert len(expected) == 60
+    reader.close()
+
+    for prefetch in (0, 1):
+        reader = McapReader(bag / 'bag.mcap', prefetch=prefetch, prefetch_budget=1)
+        reader.open()
+        with patch('rosbags.rosbag2.storage_mcap.chunk_messages', side_effect=AssertionError):
+            for conns, start, stop in [
+                (reader.connections[:1], None, None),
+                (reader.connections[1:], None, None),
+                (reader.connections[:1], 50, 60),
+                (reader.connections[:1], 20, None),
+                (reader.connections[:1], None, 40),
+            ]:
+                cids = {x.id for x in conns}
+                want = [
+                    x
+                    for x in expected
+                    if x[0] in cids
+                    and (start is None or x[1] >= start)
+                    and (stop is None or x[1] < stop)
+                ]
+                msgs = reader.messages(conns, start, stop)
+                assert [(x[0].id, x[1], x[2]) for x in msgs] == want
+                msgs = reader.messages(conns, start, stop, ordered=False)
+                assert sorted((x[1], x[0].id, x[2]) for x in msgs) == sorted(
+                    (x[1], x[0], x[2]) for x in want
+                )
+        reader.close()
+
+
+def test_reader_mcap_mmap(bag_mcap: Path) -> None:
+    """Test reader serves payloads from memory map."""
+    reader = McapReader(bag_mcap)
+    reader.open()
+    expected = [(x[0].id, x[1], bytes(x[2])) for x in reader.messages(reader.connections)]
+    reader.close()
+
+    reader = McapReader(bag_mcap, use_mmap=True)
+    reader.open()
+    assert reader.mmap
+    msgs = list(reader.messages(reader.connections))
+    assert [(x[0].id, x[1], bytes(x[2])) for x in msgs] == expected
+    msgs = list(reader.messages(reader.connections[1:2], start=700))
+    assert [(x[0].id, x[1], bytes(x[2])) for x in msgs] == [
+        x for x in expected if x[0] == 2 and x[1] >= 700
+    ]
+    del msgs
+    reader.close()
+    assert not reader.mmap
+
+
+@pytest.mark.parametrize('compression', ['none', 'storage'])
+def test_reader_mcap_mmap_payloads(tmp_path: Path, compression: str) -> None:
+    """Test reader returns memoryview payloads."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    mcap = McapWriter(bag, CompressionMode[compression.upper()])
+    connection = Connection(
+        1,
+        '/topic',
+        'msgtype',
+        MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+        'digest',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    mcap.add_msgtype(connection)
+    mcap.add_connection(connection, 'qos')
+    for idx in range(20):
+        mcap.write(connection, idx, bytes([idx]) * 2**16)
+    mcap.close(0, 'metadata')
+
+    for use_mmap in (False, True):
+        reader = McapReader(bag / 'bag.mcap', use_mmap=use_mmap)
+        reader.open()
+        for ordered in (True, False):
+            msgs = list(reader.messages(reader.connections, ordered=ordered))
+            assert sorted((x[1], bytes(x[2])) for x in msgs) == [
+                (idx, bytes([idx]) * 2**16) for idx in range(20)
+            ]
+            if use_mmap or compression == 'storage':
+                assert all(isinstance(x[2], memoryview) for x in msgs)
+            del msgs
+        reader.close()
+
+
+def test_reader_mcap_storage_options(bag_mcap: Path, tmp_path: Path) -> None:
+    """Test rosbag2 reader passes options to mcap storage."""
+    with Reader(bag_mcap) as reader:
+        expected = [(x[0].id, x[1], bytes(x[2])) for x in reader.messages()]
+
+    options = {'use_mmap': True, 'prefetch': 2, 'summary_cache': tmp_path / 'cache'}
+    with Reader(bag_mcap, storage_options=options) as reader:
+        storage = cast('McapReader', reader.storage)
+        assert storage.use_mmap
+        assert storage.prefetch == 2
+        assert storage.summary_cache == tmp_path / 'cache'
+        assert [(x[0].id, x[1], bytes(x[2])) for x in reader.messages()] == expected
+
+
+@pytest.mark.parametrize('compression', ['none', 'storage'])
+def test_reader_mcap_scan_chunks(tmp_path: Path, compression: str) -> None:
+    """Test scan rebuilds chunk index of file without summary."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    mcap = McapWriter(bag, CompressionMode[compression.upper()])
+    connections = [
+        Connection(
+            cid,
+            f'/topic{cid}',
+            'msgtype',
+            MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+            'digest',
+            0,
+            ConnectionExtRosbag2('cdr', []),
+            None,
+        )
+        for cid in (1, 2)
+    ]
+    mcap.add_msgtype(connections[0])
+    for connection in connections:
+        mcap.add_connection(connection, 'qos')
+    for idx in range(40):
+        mcap.write(connections[idx % 2], idx, bytes([idx]) * 2**16)
+    mcap.close(0, 'metadata')
+
+    path = bag / 'bag.mcap'
+    reader = McapReader(path)
+    reader.open()
+    chunks = reader.chunks
+    statistics = reader.statistics
+    expected = [(x[0].id, x[1], x[2]) for x in reader.messages(reader.connections[1:])]
+    reader.close()
+    assert len(chunks) > 2
+
+    data = path.read_bytes()
+    (summary_start,) = struct.unpack('<Q', data[-28:-20])
+    _ = path.write_bytes(data[:summary_start] + data[-37:-28] + bytes(20) + data[-8:])
+
+    reader = McapReader(path)
+    reader.open()
+    assert reader.chunks == chunks
+    assert reader.statistics
+    assert statistics
+    assert reader.statistics.channel_message_counts == statistics.channel_message_counts
+    msgs = reader.messages(reader.connections[1:])
+    assert [(x[0].id, x[1], x[2]) for x in msgs] == expected
+    reader.close()
+
+
+def test_reader_mcap_summary_cache(bag_mcap: Path, tmp_path: Path) -> None:
+    """Test reader persists scan results."""
+    cache = tmp_path / 'cache'
+
+    def read() -> tuple[object, ...]:
+        reader = McapReader(bag_mcap, summary_cache=cache)
+        reader.open()
+        res = (
+            reader.metadata,
+            [(x.id, x.topic, x.msgtype, x.msgcount) for x in reader.connections],
+            reader.chunks,
+        )
+        reader.close()
+        return res
+
+    expected = read()
+    data = bag_mcap.read_bytes()
+    (summary_start,) = struct.unpack('<Q', data[-28:-20])
+    files = list(cache.glob('*.summary')) if cache.exists() else []
+    if not summary_start:
+        assert len(files) == 1
+    if not files:
+        return
+
+    # Cache is used for unchanged file.
+    stat = bag_mcap.stat()
+    (header_size,) = struct.unpack('<Q', data[9:17])
+    data_start = 17 + header_size
+    data_end = summary_start or len(data) - 37
+    _ = bag_mcap.write_bytes(
+        data[:data_start] + b'\x00' * (data_end - data_start) + data[data_end:],
+    )
+    os.utime(bag_mcap, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert read() == expected
+
+    # Cache is rebuilt for modified file.
+    _ = bag_mcap.write_bytes(data)
+    os.utime(bag_mcap, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert read() == expected
+    assert files[0].read_bytes().startswith(b'#ROSBAGS MCAP SUMMARY V1\n')
+
+    # Damaged cache is ignored.
+    _ = files[0].write_bytes(files[0].read_bytes()[:-1])
+    assert read() == expected
+
+
+def test_reader_mcap_summary_cache_validation(tmp_path: Path) -> None:
+    """Test reader rejects damaged summary caches."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+    cache = tmp_path / 'cache'
+
+    mcap = McapWriter(bag, CompressionMode.NONE, chunk_size=1000)
+    connection = Connection(
+        1,
+        '/topic',
+        'msgtype',
+        MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+        'digest',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    mcap.add_msgtype(connection)
+    mcap.add_connection(connection, 'qos')
+    for idx in range(10):
+        mcap.write(connection, idx, bytes([idx]) * 300)
+    mcap.close(0, 'metadata')
+
+    path = bag / 'bag.mcap'
+    data = path.read_bytes()
+    (summary_start,) = struct.unpack('<Q', data[-28:-20])
+    _ = path.write_bytes(data[:summary_start] + data[-37:-28] + bytes(20) + data[-8:])
+
+    reader = McapReader(path, summary_cache=cache)
+    reader.open()
+    chunks = reader.chunks
+    reader.close()
+    assert len(chunks) > 2
+    (cachefile,) = cache.iterdir()
+    content = cachefile.read_bytes()
+
+    # Trailing data and strings extending past the end are rejected.
+    pos = content.index(b'msgtype') - 4
+    for damaged in (
+        content + b'\x00',
+        content[:pos] + struct.pack('<I', 2**16) + content[pos + 4 :],
+    ):
+        _ = cachefile.write_bytes(damaged)
+        reader = McapReader(path, summary_cache=cache)
+        with patch.object(McapReader, 'write_summary_cache', autospec=True) as write:
+            reader.open()
+        assert write.called
+        assert reader.chunks == chunks
+        reader.close()
+
+    # Chunks already read from summary are kept.
+    _ = cachefile.write_bytes(content)
+    reader = McapReader(path, summary_cache=cache)
+    reader.open()
+    reader.chunks = chunks[:1]
+    assert reader.read_summary_cache(*get_cache_location(path, cache, '.summary'))
+    assert reader.chunks == chunks[:1]
+    reader.close()
+
+
+def test_reader_mcap_write_summary(bag_mcap: Path, tmp_path: Path) -> None:
+    """Test reader writes summary section."""
+
+    def read(path: Path) -> tuple[object, ...]:
+        reader = McapReader(path)
+        reader.open()
+        res = (
+            reader.metadata,
+            [(x.id, x.topic, x.msgtype, x.msgcount) for x in reader.connections],
+            [(x[0].id, x[1], x[2]) for x in reader.messages(reader.connections)],
+        )
+        reader.close()
+        return res
+
+    expected = read(bag_mcap)
+
+    copy = tmp_path / 'copy.mcap'
+    inplace = tmp_path / 'inplace.mcap'
+    _ = inplace.write_bytes(bag_mcap.read_bytes())
+    for path in (copy, inplace):
+        reader = McapReader(bag_mcap if path == copy else inplace)
+        reader.open()
+        reader.write_summary(path if path == copy else None)
+        reader.close()
+
+        (summary_start,) = struct.unpack('<Q', path.read_bytes()[-28:-20])
+        assert summary_start
+        with patch.object(McapReader, 'meta_scan', side_effect=AssertionError):
+            assert read(path) == expected
+
+    reader = McapReader(copy)
+    reader.open()
+    assert all(x.message_index_offsets for x in reader.chunks)
+    with pytest.raises(ReaderError, match='Could not write summary'):
+        reader.write_summary(copy)
+    with pytest.raises(ReaderError, match=r'Could not write summary .*No such file'):
+        reader.write_summary(tmp_path / 'missing' / 'copy.mcap')
+    with (
+        patch(
+            'rosbags.rosbag2.storage_mcap.write_summary',
+            side_effect=OSError(28, 'No space left on device'),
+        ),
+        pytest.raises(ReaderError, match=r'Could not write summary .*No space left on device'),
+    ):
+        reader.write_summary(tmp_path / 'full.mcap')
+    reader.close()
+
+
+def test_reader_mcap_recover(tmp_path: Path) -> None:
+    """Test reader recovers truncated files."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    mcap = McapWriter(bag, CompressionMode.STORAGE)
+    connection = Connection(
+        1,
+        '/topic',
+        'msgtype',
+        MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+        'digest',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    mcap.add_msgtype(connection)
+    mcap.add_connection(connection, 'qos')
+    for idx in range(40):
+        mcap.write(connection, idx, bytes([idx]) + b'\x00' * 2**16)
+    mcap.close(0, 'metadata')
+
+    path = bag / 'bag.mcap'
+    reader = McapReader(path)
+    reader.open()
+    chunks = reader.chunks
+    expected = [(x[1], x[2]) for x in reader.messages(reader.connections)]
+    reader.close()
+    assert len(chunks) > 2
+
+    # Cut into the message index of the second chunk.
+    _ = path.write_bytes(path.read_bytes()[: chunks[1].message_index_offsets[1] + 12])
+    expected = expected[: sum(x.channel_count[1] for x in chunks[:2])]
+
+    reader = McapReader(path)
+    with pytest.raises(ReaderError, match='end magic is invalid'):
+        reader.open()
+
+    reader = McapReader(path, recover=True)
+    reader.open()
+    assert len(reader.chunks) == 2
+    assert reader.metadata.message_count == len(expected)
+    assert [(x[1], x[2]) for x in reader.messages(reader.connections)] == expected
+    reader.write_summary()
+    reader.close()
+
+    reader = McapReader(path)
+    with patch.object(McapReader, 'meta_scan', side_effect=AssertionError):
+        reader.open()
+    assert len(reader.chunks) == 2
+    assert all(x.message_index_offsets for x in reader.chunks)
+    assert [(x[1], x[2]) for x in reader.messages(reader.connections)] == expected
+    reader.close()
+
+
+def read_summary_records(data: bytes) -> list[tuple[int, bytes]]:
+    """Read records of summary section."""
+    (pos,) = struct.unpack('<Q', data[-28:-20])
+    records = []
+    while (op_ := data[pos]) not in {0x02, 0x0E}:
+        (size,) = struct.unpack('<Q', data[pos + 1 : pos + 9])
+        records.append((op_, data[pos + 9 : pos + 9 + size]))
+        pos += 9 + size
+    return records
+
+
+def test_reader_mcap_write_summary_without_chunk_index(tmp_path: Path) -> None:
+    """Test reader writes summary for files without chunk indexes."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    connection = Connection(
+        1,
+        '/topic',
+        'msgtype',
+        MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+        'digest',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    with patch('rosbags.rosbag2.storage_mcap.write_chunk_index'):
+        mcap = McapWriter(bag, CompressionMode.STORAGE, chunk_size=1000)
+        mcap.add_msgtype(connection)
+        mcap.add_connection(connection, 'qos')
+        for idx in range(20):
+            mcap.write(connection, idx, bytes([idx]) * 300)
+        mcap.close(0, 'metadata')
+
+    path = bag / 'bag.mcap'
+    reader = McapReader(path)
+    reader.open()
+    assert not reader.chunks
+    expected = [(x[1], x[2]) for x in reader.messages(reader.connections)]
+    reader.close()
+    assert len(expected) == 20
+
+    copy = tmp_path / 'copy.mcap'
+    inplace = tmp_path / 'inplace.mcap'
+    _ = inplace.write_bytes(path.read_bytes())
+    for dst in (copy, inplace):
+        reader = McapReader(path if dst == copy else inplace)
+        reader.open()
+        reader.write_summary(dst if dst == copy else None)
+        reader.close()
+
+        reader = McapReader(dst)
+        with patch.object(McapReader, 'meta_scan', side_effect=AssertionError):
+            reader.open()
+        assert len(reader.chunks) > 2
+        assert [(x[1], x[2]) for x in reader.messages(reader.connections)] == expected
+        reader.close()
+
+    data = path.read_bytes()
+    pos = data.index(b'zstd')
+    _ = path.write_bytes(data[:pos] + b'zzzz' + data[pos + 4 :])
+    reader = McapReader(path)
+    reader.open()
+    with pytest.raises(ReaderError, match='unknown reference'):
+        reader.write_summary(tmp_path / 'broken.mcap')
+    reader.close()
+
+
+def test_reader_mcap_scan_mmap(tmp_path: Path) -> None:
+    """Test reader scans memory-mapped files without chunk indexes."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    connection = Connection(
+        1,
+        '/topic',
+        'msgtype',
+        MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+        'digest',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    with patch('rosbags.rosbag2.storage_mcap.write_chunk_index'):
+        mcap = McapWriter(bag, CompressionMode.STORAGE, chunk_size=1000)
+        mcap.add_msgtype(connection)
+        mcap.add_connection(connection, 'qos')
+        for idx in range(20):
+            mcap.write(connection, idx, bytes([idx]) * 300)
+        mcap.close(0, 'metadata')
+
+    path = bag / 'bag.mcap'
+    reader = McapReader(path, use_mmap=True)
+    reader.open()
+    assert reader.mmap
+    assert not reader.chunks
+    msgs = list(reader.messages(reader.connections))
+    assert all(isinstance(x[2], memoryview) for x in msgs)
+    assert [(x[1], bytes(x[2])) for x in msgs] == [(x, bytes([x]) * 300) for x in range(20)]
+
+    decompress = Mock(side_effect=DECOMPRESSORS['zstd'])
+    with patch.dict(DECOMPRESSORS, {'zstd': decompress}):
+        msgs = list(reader.messages(reader.connections, start=18, stop=20))
+    assert [(x[1], bytes(x[2])) for x in msgs] == [(x, bytes([x]) * 300) for x in (18, 19)]
+    assert decompress.call_count == 2
+    del msgs
+    reader.write_summary(tmp_path / 'indexed.mcap')
+    reader.close()
+    assert not reader.mmap
+
+    reader = McapReader(tmp_path / 'indexed.mcap', use_mmap=True)
+    reader.open()
+    assert reader.chunks
+    msgs = list(reader.messages(reader.connections, start=18, stop=20))
+    assert [(x[1], bytes(x[2])) for x in msgs] == [(x, bytes([x]) * 300) for x in (18, 19)]
+    del msgs
+    reader.close()
+
+    reader = McapReader(path, use_mmap=True)
+    with (
+        patch('mmap.mmap', side_effect=OSError('No such device')),
+        pytest.raises(ReaderError, match=r'Could not memory-map file .*No such device'),
+    ):
+        reader.open()
+    assert not reader.bio
+    assert not reader.mmap
+
+
+def test_reader_mcap_write_summary_indexes(tmp_path: Path) -> None:
+    """Test reader writes attachment and metadata indexes."""
+    bag = tmp_path / 'bag'
+    bag.mkdir()
+
+    mcap = McapWriter(bag, CompressionMode.NONE)
+    mcap.close(0, 'metadata')
+
+    # Replace data end record and summary with an attachment.
+    path = bag / 'bag.mcap'
+    data = path.read_bytes()
+    (summary_start,) = struct.unpack('<Q', data[-28:-20])
+    bio = BytesIO()
+    _ = bio.write(data[: summary_start - 13])
+    attachment_start = bio.tell()
+    write_record(
+        bio,
+        0x09,
+        (
+            struct.pack('<QQ', 1, 2),
+            make_string('name'),
+            make_string('text/plain'),
+            struct.pack('<Q', 4),
+            b'data',
+            struct.pack('<I', 0),
+        ),
+    )
+    _ = path.write_bytes(bio.getvalue())
+
+    copy = tmp_path / 'copy.mcap'
+    reader = McapReader(path, recover=True)
+    reader.open()
+    reader.write_summary(copy)
+    reader.close()
+
+    data = copy.read_bytes()
+    records = read_summary_records(data)
+
+    attachment_indexes = [x for op_, x in records if op_ == 0x0A]
+    assert len(attachment_indexes) == 1
+    offset, length, log_time, create_time, size = struct.unpack_from(
+        '<QQQQQ', attachment_indexes[0]
+    )
+    assert data[offset] == 0x09
+    assert (length, log_time, create_time, size) == (bio.tell() - attachment_start, 1, 2, 4)
+    assert attachment_indexes[0][40:] == make_string('name') + make_string('text/plain')
+
+    metadata_indexes = [x for op_, x in records if op_ == 0x0D]
+    assert len(metadata_indexes) == 1
+    offset, length = struct.unpack_from('<QQ', metadata_indexes[0])
+    assert data[offset] == 0x0C
+    assert metadata_indexes[0][16:] == make_string('rosbag2')
+    assert data[offset + length : offset + length + 1] == b'\x09'
+
+    (statistics,) = [x for op_, x in records if op_ == 0x0B]
+    assert struct.unpack_from('<II', statistics, 14) == (1, 1)
+
 
 def test_bag_mcap_files(tmp_path: Path) -> None:
     """Test reader raises if mcap files are bad."""
@@ -613,3 +1255,99 @@ def test_write_multichunk(tmp_path: Path, compression: str) -> None:
     reader.open()
     assert len(reader.chunks) == 2
     reader.close()
+
+
+@pytest.mark.parametrize('fmt', ['zstd', 'lz4', 'none'])
+def test_write_chunk_options(tmp_path: Path, fmt: str) -> None:
+    """Test chunk size, compression, and background compression."""
+    connection = Connection(
+        1,
+        'topic',
+        'msgtype',
+        MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+        'digest',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+
+    datas = []
+    for workers in (0, 2):
+        bag = tmp_path / f'bag{workers}'
+        bag.mkdir()
+        mcap = McapWriter(
+            bag,
+            CompressionMode.STORAGE,
+            chunk_size=1000,
+            compression_format=fmt,
+            compression_level=1,
+            workers=workers,
+        )
+        mcap.add_msgtype(connection)
+        mcap.add_connection(connection, 'qos')
+        for idx in range(50):
+            mcap.write(connection, idx, bytes([idx]) * 300)
+        mcap.close(0, 'metadata')
+        assert not mcap.executor
+
+        reader = McapReader(bag / f'bag{workers}.mcap')
+        reader.open()
+        assert len(reader.chunks) == 13
+        assert {x.compression for x in reader.chunks} == {'' if fmt == 'none' else fmt}
+        msgs = [(x[1], bytes(x[2])) for x in reader.messages(reader.connections)]
+        assert msgs == [(idx, bytes([idx]) * 300) for idx in range(50)]
+        reader.close()
+        datas.append((bag / f'bag{workers}.mcap').read_bytes())
+
+    assert datas[0] == datas[1]
+
+    bag = tmp_path / 'invalid'
+    bag.mkdir()
+    with pytest.raises(WriterError, match='Unknown compression format'):
+        _ = McapWriter(bag, CompressionMode.STORAGE, compression_format='bz2')
+    assert not list(bag.iterdir())
+
+
+def test_write_many(tmp_path: Path) -> None:
+    """Test batched writes match single writes."""
+    connections = [
+        Connection(
+            cid,
+            f'/topic{cid}',
+            'msgtype',
+            MessageDefinition(MessageDefinitionFormat.MSG, 'msgdef'),
+            'digest',
+            0,
+            ConnectionExtRosbag2('cdr', []),
+            None,
+        )
+        for cid in (1, 2)
+    ]
+    messages = [(connections[idx % 2], 100 - idx, bytes([idx]) * idx) for idx in range(100)]
+
+    datas = []
+    for many in (False, True):
+        bag = tmp_path / f'bag{many}'
+        bag.mkdir()
+        mcap = McapWriter(bag, CompressionMode.NONE, chunk_size=2000)
+        mcap.add_msgtype(connections[0])
+        for connection in connections:
+            mcap.add_connection(connection, 'qos')
+        if many:
+            mcap.write_many(iter(messages))
+        else:
+            for message in messages:
+                mcap.write(*message)
+        mcap.close(0, 'metadata')
+        datas.append((bag / f'bag{many}.mcap').read_bytes())
+
+    assert datas[0] == datas[1]
+
+    reader = McapReader(tmp_path / 'bagTrue' / 'bagTrue.mcap')
+    reader.open()
+    assert len(reader.chunks) > 2
+    assert reader.metadata.start_time == 1
+    assert reader.metadata.end_time == 101
+    msgs = [(x[0].id, x[1], bytes(x[2])) for x in reader.messages(reader.connections)]
+    assert msgs == sorted(((x.id, y, z) for x, y, z in messages), key=lambda x: x[1])
+    reader.close()
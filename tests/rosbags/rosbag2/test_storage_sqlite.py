@@ -5,16 +5,29 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import TYPE_CHECKING
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, cast
+from unittest.mock import patch
 
 import pytest
 
-from rosbags.rosbag2.errors import ReaderError
-from rosbags.rosbag2.storage_sqlite3 import Sqlite3Reader
+from rosbags.interfaces import (
+    Connection,
+    ConnectionExtRosbag2,
+    MessageDefinition,
+    MessageDefinitionFormat,
+)
+from rosbags.rosbag2.enums import CompressionMode
+from rosbags.rosbag2.errors import ReaderError, WriterError
+from rosbags.rosbag2.storage_sqlite3 import Sqlite3Reader, Sqlite3Writer, get_msgdef_digest
+from rosbags.typesys.msg import get_types_from_msg
 
 if TYPE_CHECKING:
+    from collections.abc import Generator
     from pathlib import Path
 
+    from rosbags.interfaces.typing import RPath
+
 SQLITE_SCHEMA_V1 = """
 CREATE TABLE topics(
   id INTEGER PRIMARY KEY,
@@ -245,6 +258,27 @@ def test_database_with_messages_has_correct_metadata(database: Path) -> None:
     reader.close()
 
 
+@pytest.mark.usefixtures('schema', 'add_connections', 'add_messages')
+@pytest.mark.parametrize('schema', [(4, SQLITE_SCHEMA_V4)], indirect=True)
+def test_lazy_open_defers_counting(database: Path) -> None:
+    """Test lazy open defers counting messages."""
+    reader = Sqlite3Reader(database, lazy=True)
+    reader.open()
+    assert reader.metadata.duration == 667 - 42
+    assert reader.metadata.start_time == 42
+    assert reader.metadata.end_time == 667
+    assert reader.metadata.message_count == 0
+    assert [x.msgcount for x in reader.connections] == [0, 0]
+
+    assert reader.count_messages() == {1: 2}
+    assert reader.metadata.message_count == 2
+    assert [x.msgcount for x in reader.connections] == [2, 0]
+    assert list(reader.messages(reader.connections[:1], stop=100)) == [
+        (reader.connections[0], 42, b''),
+    ]
+    reader.close()
+
+
 @pytest.mark.usefixtures('add_connections')
 def test_type_definitions_are_read(database: Path, schema: int) -> None:
     """Test type definitions are read."""
@@ -254,6 +288,36 @@ def test_type_definitions_are_read(database: Path, schema: int) -> None:
     reader.close()
 
 
+@pytest.mark.usefixtures('schema', 'add_connections')
+@pytest.mark.parametrize('schema', [(4, SQLITE_SCHEMA_V4)], indirect=True)
+def test_type_definitions_verification(database: Path) -> None:
+    """Test type definitions are verified once per definition."""
+    get_msgdef_digest.cache_clear()
+    with patch(
+        'rosbags.rosbag2.storage_sqlite3.get_types_from_msg',
+        wraps=get_types_from_msg,
+    ) as mock:
+        for _ in range(2):
+            reader = Sqlite3Reader(database)
+            reader.open()
+            reader.close()
+        mock.assert_called_once_with('', 'std_msgs/msg/Empty')
+
+    con = sqlite3.connect(database)
+    with con:
+        _ = con.execute('UPDATE message_definitions SET type_description_hash = "RIHS01_00"')
+    con.close()
+
+    reader = Sqlite3Reader(database)
+    with pytest.raises(AssertionError, match='Failed to parse std_msgs/msg/Empty'):
+        reader.open()
+
+    reader = Sqlite3Reader(database, verify=False)
+    reader.open()
+    assert reader.msgtypes[0]['digest'] == 'RIHS01_00'
+    reader.close()
+
+
 @pytest.mark.parametrize('database', [(4, SQLITE_SCHEMA_V4)], indirect=True)
 def test_messages_raises_on_closed_reader(database: Path) -> None:
     """Test messages raises on closed reader."""
@@ -272,6 +336,7 @@ def test_messages_yields_data(database: Path) -> None:
     assert list(reader.messages(reader.connections, start=1000)) == []
     assert list(reader.messages(reader.connections, stop=40)) == []
     assert list(reader.messages(reader.connections, stop=100)) == [(reader.connections[0], 42, b'')]
+    assert sorted(x[1] for x in reader.messages(reader.connections, ordered=False)) == [42, 666]
     reader.close()
 
 
@@ -362,3 +427,195 @@ def test_messages_fiters(database: Path) -> None:
         _ = next(gen)
 
     reader.close()
+
+
+@pytest.mark.usefixtures('schema')
+@pytest.mark.parametrize('schema', [(4, SQLITE_SCHEMA_V4)], indirect=True)
+def test_messages_topic_index(database: Path) -> None:
+    """Test messages are read through topic index."""
+    con = sqlite3.connect(database)
+    with con:
+        _ = con.executemany(
+            'INSERT INTO topics VALUES(?, ?, ?, ?, ?, ?)',
+            [
+                (1, '/a', 'm', 'cdr', '', ''),
+                (2, '/b', 'm', 'cdr', '', ''),
+                (3, '/c', 'm', 'cdr', '', ''),
+            ],
+        )
+        _ = con.executemany(
+            'INSERT INTO messages(topic_id, timestamp, data) VALUES(?, ?, ?)',
+            [(i % 3 + 1, 100 - i // 2, f'{i}'.encode()) for i in range(20)],
+        )
+    con.close()
+
+    reader = Sqlite3Reader(database)
+    reader.open()
+    assert reader.topic_index is None
+    expected = [
+        (
+            [(x.id, y, z) for x, y, z in reader.messages(conns, start, stop)],
+            [(x.id, y, z) for x, y, z in reader.messages(conns, ordered=False)],
+        )
+        for conns in (reader.connections, reader.connections[:1], reader.connections[1:])
+        for start, stop in ((None, None), (93, 97))
+    ]
+    reader.close()
+
+    reader = Sqlite3Reader(database, create_index=True)
+    reader.open()
+    assert reader.topic_index == 'topic_timestamp_idx'
+    result = [
+        (
+            [(x.id, y, z) for x, y, z in reader.messages(conns, start, stop)],
+            [(x.id, y, z) for x, y, z in reader.messages(conns, ordered=False)],
+        )
+        for conns in (reader.connections, reader.connections[:1], reader.connections[1:])
+        for start, stop in ((None, None), (93, 97))
+    ]
+    reader.close()
+
+    assert [x for x, _ in result] == [x for x, _ in expected]
+    assert [sorted(x) for _, x in result] == [sorted(x) for _, x in expected]
+    assert [x[:2] for x in result[5][0]] == [(3, 93), (2, 94), (2, 95), (3, 95), (3, 96)]
+
+    reader = Sqlite3Reader(database)
+    reader.open()
+    assert reader.topic_index == 'topic_timestamp_idx'
+    reader.close()
+
+
+def test_create_index_raises_on_missing_tables(database: Path) -> None:
+    """Test index creation raises on missing tables."""
+    reader = Sqlite3Reader(database, create_index=True)
+    with pytest.raises(ReaderError, match='Cannot create index'):
+        reader.open()
+
+
+def test_create_index_raises_on_unwritable_database(tmp_path: Path) -> None:
+    """Test index creation raises if database cannot be written."""
+    reader = Sqlite3Reader(tmp_path / 'missing.db3', create_index=True)
+    with pytest.raises(ReaderError, match='for writing'):
+        reader.open()
+    assert not (tmp_path / 'missing.db3').exists()
+
+    reader = Sqlite3Reader(cast('RPath', PurePosixPath(tmp_path / 'remote.db3')))
+    with pytest.raises(ReaderError, match='non-local database'):
+        reader.add_topic_index()
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_writer_bulk(tmp_path: Path, *, bulk: bool) -> None:
+    """Test writer bulk mode and pragmas."""
+    connection = Connection(
+        1,
+        '/foo',
+        'std_msgs/msg/Empty',
+        MessageDefinition(MessageDefinitionFormat.MSG, ''),
+        'RIHS01_20b625256f32d5dbc0d04fee44f43c41e51c70d3502f84b4a08e7a9c26a96312',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    writer = Sqlite3Writer(
+        tmp_path,
+        CompressionMode.NONE,
+        bulk=bulk,
+        batch_size=3,
+        journal_mode='OFF',
+        synchronous='off',
+        page_size=8192,
+    )
+    writer.add_msgtype(connection)
+    writer.add_connection(connection, '')
+    writer.write(connection, 2, b'a')
+    writer.write_many([(connection, 1, b'b'), (connection, 3, b'c')])
+    writer.write(connection, 0, b'd')
+
+    indexes = writer.conn.execute("SELECT name FROM pragma_index_list('messages')").fetchall()
+    assert indexes == ([] if bulk else [('timestamp_idx',)])
+    assert writer.conn.execute('SELECT COUNT(*) FROM messages').fetchone() == (
+        (3,) if bulk else (4,)
+    )
+
+    # Buffered messages do not reference reused caller buffers.
+    buf = bytearray(b'e')
+    writer.write_many([(connection, 4, memoryview(buf))])
+    buf[0] = ord('f')
+    writer.write(connection, 5, memoryview(buf))
+    buf[0] = ord('g')
+    writer.write(connection, 6, memoryview(buf))
+    buf[0] = ord('x')
+    writer.close(9, '')
+
+    con = sqlite3.connect(writer.path)
+    assert con.execute('PRAGMA page_size').fetchone() == (8192,)
+    assert con.execute("SELECT name FROM pragma_index_list('messages')").fetchall() == [
+        ('timestamp_idx',),
+    ]
+    con.close()
+
+    reader = Sqlite3Reader(writer.path)
+    reader.open()
+    assert [(x[1], x[2]) for x in reader.messages(reader.connections)] == [
+        (0, b'd'),
+        (1, b'b'),
+        (2, b'a'),
+        (3, b'c'),
+        (4, b'e'),
+        (5, b'f'),
+        (6, b'g'),
+    ]
+    reader.close()
+
+
+def test_writer_bulk_batches(tmp_path: Path) -> None:
+    """Test writer bulk mode buffers at most one batch."""
+    connection = Connection(
+        1,
+        '/foo',
+        'std_msgs/msg/Empty',
+        MessageDefinition(MessageDefinitionFormat.MSG, ''),
+        '',
+        0,
+        ConnectionExtRosbag2('cdr', []),
+        None,
+    )
+    writer = Sqlite3Writer(tmp_path, CompressionMode.NONE, bulk=True, batch_size=100)
+    writer.add_connection(connection, '')
+
+    def count() -> int:
+        return cast('int', writer.conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0])
+
+    for idx in range(100):
+        writer.write(connection, idx, b'')
+    assert not writer.rows
+    assert count() == 100
+
+    def generate() -> Generator[tuple[Connection, int, bytes], None, None]:
+        for idx in range(100, 1050):
+            assert len(writer.rows) < 100
+            yield connection, idx, b''
+
+    writer.write_many(generate())
+    assert len(writer.rows) == 50
+    assert count() == 1000
+    writer.close(9, '')
+
+    reader = Sqlite3Reader(writer.path)
+    reader.open()
+    assert [x[1] for x in reader.messages(reader.connections)] == list(range(1050))
+    reader.close()
+
+
+def test_writer_raises_on_invalid_pragmas(tmp_path: Path) -> None:
+    """Test writer raises on invalid pragma values."""
+    with pytest.raises(WriterError, match='journal mode'):
+        _ = Sqlite3Writer(tmp_path, CompressionMode.NONE, journal_mode='fast')
+    with pytest.raises(WriterError, match='synchronous mode'):
+        _ = Sqlite3Writer(tmp_path, CompressionMode.NONE, synchronous='1; DROP TABLE messages')
+    with pytest.raises(WriterError, match='power of two'):
+        _ = Sqlite3Writer(tmp_path, CompressionMode.NONE, page_size=1000)
+    with pytest.raises(WriterError, match='not positive'):
+        _ = Sqlite3Writer(tmp_path, CompressionMode.NONE, bulk=True, batch_size=0)
+    assert not list(tmp_path.iterdir())
@@ -14,7 +14,15 @@ from rosbags.interfaces import (
     MessageDefinition,
     MessageDefinitionFormat,
 )
-from rosbags.rosbag2 import CompressionFormat, CompressionMode, Writer, WriterError
+from rosbags.rosbag2 import (
+    CompressionFormat,
+    CompressionMode,
+    Reader,
+    StoragePlugin,
+    Writer,
+    WriterError,
+)
+from rosbags.rosbag2.storage_mcap import McapReader
 from rosbags.typesys import Stores, get_typestore
 
 if TYPE_CHECKING:
@@ -182,3 +190,85 @@ def test_failure_cases(tmp_path: Path) -> None:
     bag = Writer(tmp_path / 'bag', version=Writer.VERSION_LATEST)
     with bag, pytest.raises(WriterError, match='Cannot determine message definition'):
         _ = bag.add_connection('/foo', 'std_msgs/msg/Empty')
+
+
+def test_writer_storage_options(tmp_path: Path) -> None:
+    """Test writer passes options to storage plugin."""
+    store = get_typestore(Stores.LATEST)
+    path = tmp_path / 'mcap'
+    bag = Writer(
+        path,
+        version=Writer.VERSION_LATEST,
+        storage_plugin=StoragePlugin.MCAP,
+        storage_options={'chunk_size': 1000, 'compression_format': 'lz4'},
+    )
+    bag.set_compression(CompressionMode.STORAGE, CompressionFormat.ZSTD)
+    with bag:
+        connection = bag.add_connection('/test', 'std_msgs/msg/Int8', typestore=store)
+        bag.write_many((connection, x, bytes([x]) * 300) for x in range(10))
+
+    storage = McapReader(path / 'mcap.mcap')
+    storage.open()
+    assert len(storage.chunks) > 2
+    assert {x.compression for x in storage.chunks} == {'lz4'}
+    storage.close()
+
+    with Reader(path) as reader:
+        assert reader.message_count == 10
+        assert reader.duration == 10
+        assert [(x[1], x[2]) for x in reader.messages()] == [
+            (x, bytes([x]) * 300) for x in range(10)
+        ]
+
+    bag = Writer(tmp_path / 'invalid', version=Writer.VERSION_LATEST, storage_options={'foo': 1})
+    with pytest.raises(WriterError, match='Invalid storage options'):
+        bag.open()
+    assert not (tmp_path / 'invalid').exists()
+
+    bag = Writer(
+        tmp_path / 'invalid',
+        version=Writer.VERSION_LATEST,
+        storage_plugin=StoragePlugin.MCAP,
+        storage_options={'compression_format': 'foo'},
+    )
+    with pytest.raises(WriterError, match='Unknown compression format'):
+        bag.open()
+    assert not (tmp_path / 'invalid').exists()
+
+
+def test_writer_write_many(tmp_path: Path) -> None:
+    """Test writer writes batches of messages."""
+    store = get_typestore(Stores.LATEST)
+    path = tmp_path / 'rosbag2'
+    bag = Writer(path, version=Writer.VERSION_LATEST)
+    bag.set_compression(CompressionMode.MESSAGE, CompressionFormat.ZSTD)
+    with pytest.raises(WriterError, match='was not opened'):
+        bag.write_many([])
+    with bag:
+        connection = bag.add_connection('/test', 'std_msgs/msg/Int8', typestore=store)
+        bag.write_many([(connection, 42, b'\x00'), (connection, 666, b'\x01' * 4096)])
+        unknown = connection._replace(id=2)
+        with pytest.raises(WriterError, match='unknown connection'):
+            bag.write_many([(unknown, 43, b'\x00')])
+
+    with Reader(path) as reader:
+        assert reader.message_count == 2
+        assert [(x[1], x[2]) for x in reader.messages()] == [
+            (42, b'\x00'),
+            (666, b'\x01' * 4096),
+        ]
+
+
+def test_writer_sqlite3_storage_options(tmp_path: Path) -> None:
+    """Test writer passes bulk options to sqlite3 storage."""
+    store = get_typestore(Stores.LATEST)
+    path = tmp_path / 'rosbag2'
+    options = {'bulk': True, 'batch_size': 2, 'journal_mode': 'off', 'synchronous': 'off'}
+    with Writer(path, version=Writer.VERSION_LATEST, storage_options=options) as bag:
+        connection = bag.add_connection('/test', 'std_msgs/msg/Int8', typestore=store)
+        bag.write_many((connection, x, bytes([x])) for x in range(5))
+        bag.write(connection, 5, b'\x05')
+
+    with Reader(path) as reader:
+        assert reader.message_count == 6
+        assert [(x[1], x[2]) for x in reader.messages()] == [(x, bytes([x])) for x in range(6)]